@@ -0,0 +1,115 @@
+"""
+Сравнение однопроходного экстрактора с прежней реализацией на BeautifulSoup.
+
+Запуск из корня проекта:
+    python -m benchmarks.extractor_bench [папка_с_html] [число_повторов]
+"""
+import re
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from core.article_extractor import extract_article
+
+CORPUS_DIR = Path(__file__).parent / 'corpus'
+
+
+def legacy_extract(html: bytes) -> dict:
+    """Прежний ContentFetcher._extract_title/_extract_content без изменений"""
+    soup = BeautifulSoup(html, 'lxml')
+
+    title = None
+    og_title = soup.find('meta', property='og:title')
+    if og_title and og_title.get('content'):
+        title = og_title['content']
+    if not title and soup.title:
+        title = soup.title.string
+    if not title:
+        h1 = soup.find('h1')
+        if h1:
+            title = h1.get_text(strip=True)
+    if title:
+        title = re.sub(r'\(@\w+\)', '', title)
+        title = re.sub(r'@\w+', '', title)
+        title = re.sub(r'\s*[—–-]\s*(Блог на|на)\s+[\w\.]+\s*$', '', title, flags=re.IGNORECASE)
+        title = re.sub(r'\s*[|\-–—]\s*(Новости|Статьи|Блог|Blog|News).*$', '', title, flags=re.IGNORECASE)
+        title = re.sub(r'\s+', ' ', title)
+        title = re.sub(r'\(\s*\)', '', title)
+        title = title.strip(' -–—|')
+    title = title or "Без заголовка"
+
+    for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside']):
+        element.decompose()
+
+    content_selectors = ['article', '[itemprop="articleBody"]', '.article-content',
+                         '.post-content', '.entry-content', 'main']
+    content_text = ""
+    for selector in content_selectors:
+        content_block = soup.select_one(selector)
+        if content_block:
+            paragraphs = content_block.find_all(['p', 'h2', 'h3', 'li'])
+            content_text = '\n\n'.join([p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)])
+            if len(content_text) > 200:
+                break
+    if len(content_text) < 200:
+        paragraphs = soup.find_all('p')
+        content_text = '\n\n'.join([p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)])
+
+    return {'title': title, 'content': content_text or "Не удалось извлечь контент"}
+
+
+def words(text: str) -> set:
+    return set(re.findall(r'\w+', text.lower()))
+
+
+def timed(func, html: bytes, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(html)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    corpus_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else CORPUS_DIR
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    files = sorted(corpus_dir.glob('*.html'))
+    if not files:
+        print(f"❌ В {corpus_dir} нет html-файлов")
+        return
+
+    print(f"{'Файл':<28} {'old, мс':>8} {'new, мс':>8} {'профиль':>8} "
+          f"{'old симв':>9} {'new симв':>9} {'покрытие':>9}")
+    print("-" * 85)
+
+    total_old = total_new = total_profile = 0.0
+    for path in files:
+        html = path.read_bytes()
+        old = legacy_extract(html)
+        new = extract_article(html)
+
+        old_words = words(old['content'])
+        coverage = len(old_words & words(new['content'])) / len(old_words) if old_words else 1.0
+
+        old_ms = timed(legacy_extract, html, repeat)
+        new_ms = timed(extract_article, html, repeat)
+        # Повторный разбор с выученной стратегией домена, как делает ContentFetcher
+        profile_ms = timed(lambda data: extract_article(data, strategy=new['strategy']), html, repeat)
+        total_old += old_ms
+        total_new += new_ms
+        total_profile += profile_ms
+
+        print(f"{path.name[:28]:<28} {old_ms:>8.2f} {new_ms:>8.2f} {profile_ms:>8.2f} "
+              f"{len(old['content']):>9} {len(new['content']):>9} {coverage:>9.0%}")
+        if old['title'] != new['title']:
+            print(f"   заголовок: {old['title']!r} -> {new['title']!r}")
+
+    print("-" * 85)
+    print(f"Итого: {total_old:.2f} мс -> {total_new:.2f} мс (x{total_old / max(total_new, 1e-9):.1f}), "
+          f"с профилем домена {total_profile:.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Сквозной бенчмарк обработки статей: ContentGenerator.process_article_url на локальном корпусе.
+Без сети и без квот: страницы отдает тестовый HTTP-сервер, модель - провайдер fake
+(core/providers/fake_provider.py), база - временный SQLite.
+
+Запуск из корня проекта:
+    python -m benchmarks.pipeline_bench [--articles 60] [--concurrency 8] [--ttft 0.5] [--tps 250]
+    python -m benchmarks.pipeline_bench --save baseline.json
+    python -m benchmarks.pipeline_bench --compare baseline.json   # код выхода 1 при регрессии
+
+Каждая страница корпуса раздается по многим адресам, поэтому в корпусе не должно быть
+<link rel="canonical"> - иначе копии будут отброшены как уже обработанные.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CORPUS_DIR = Path(__file__).parent / 'corpus'
+STAGES = ('prepare', 'fetch', 'analysis', 'posts', 'save')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Бенчмарк обработки статей с тестовой моделью")
+    parser.add_argument('--corpus', type=Path, default=CORPUS_DIR, help="папка с html-файлами")
+    parser.add_argument('--articles', type=int, default=60, help="сколько статей обработать")
+    parser.add_argument('--concurrency', type=int, default=8, help="статей одновременно")
+    parser.add_argument('--warmup', type=int, default=2, help="статей до начала замеров")
+    parser.add_argument('--platforms', default='telegram,vk,linkedin')
+    parser.add_argument('--fused', action='store_true', help="анализ и посты одним запросом")
+    parser.add_argument('--ttft', type=float, default=0.5, help="медиана задержки до первого токена, с")
+    parser.add_argument('--ttft-sigma', type=float, default=0.4, help="разброс задержки (логнормальный)")
+    parser.add_argument('--tps', type=float, default=250, help="скорость генерации, токенов/с")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="доля ответов 503")
+    parser.add_argument('--in-flight', type=int, default=16, help="одновременных запросов к модели")
+    parser.add_argument('--server-delay', type=float, default=0.05, help="задержка ответа сервера, с")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save', type=Path, help="сохранить результат в JSON")
+    parser.add_argument('--compare', type=Path, help="сравнить с сохраненным результатом")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="допустимое ухудшение, доля")
+    parser.add_argument('--verbose', action='store_true', help="не скрывать вывод обработки статей")
+    return parser.parse_args()
+
+
+def configure(args):
+    # Настройки читаются при импорте config.settings - окружение задаем до импорта проекта
+    workdir = tempfile.mkdtemp(prefix='newsmaker_bench_')
+    os.environ.update({
+        'AI_PROVIDER': 'fake',
+        'AI_PROVIDER_CHAIN': 'fake',
+        'AI_MODEL': 'fake-json',
+        'AI_MAX_IN_FLIGHT': str(args.in_flight),
+        'FAKE_LLM_TTFT': str(args.ttft),
+        'FAKE_LLM_TTFT_SIGMA': str(args.ttft_sigma),
+        'FAKE_LLM_TOKENS_PER_SECOND': str(args.tps),
+        'FAKE_LLM_ERROR_RATE': str(args.error_rate),
+        'FAKE_LLM_SEED': str(args.seed),
+        'FUSED_PIPELINE': str(args.fused),
+        'DATABASE_URL': f"sqlite:///{workdir}/bench.db",
+        'HTTP_CACHE_ENABLED': 'False',
+        'LLM_CACHE_ENABLED': 'False',
+        'JS_RENDER_ENABLED': 'False',
+    })
+
+
+async def start_server(corpus: Path, delay: float):
+    from aiohttp import web
+
+    pages = {path.name: path.read_bytes() for path in sorted(corpus.glob('*.html'))}
+
+    async def handle(request):
+        if delay:
+            await asyncio.sleep(delay)
+        body = pages.get(request.match_info['name'])
+        if body is None:
+            raise web.HTTPNotFound()
+        # Без charset в заголовке: кодировку страницы (windows-1251 и т.п.) определяет ContentFetcher
+        return web.Response(body=body, content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/{number}/{name}', handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}", list(pages)
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(q * len(values)) - 1))]
+
+
+def summary(values: list) -> dict:
+    return {'p50': percentile(values, 0.5), 'p95': percentile(values, 0.95), 'p99': percentile(values, 0.99)}
+
+
+async def process(generator, url: str, platforms: list) -> dict:
+    # Моменты начала этапов - из on_progress, как их видит пользователь бота
+    started = time.monotonic()
+    marks = {'prepare': started}
+
+    async def on_progress(state: dict):
+        marks.setdefault(state['stage'], time.monotonic())
+
+    result = await generator.process_article_url(url, user_id=1, platforms=platforms,
+                                                 on_duplicate='process', on_progress=on_progress)
+    finished = time.monotonic()
+
+    stages = {}
+    reached = [stage for stage in STAGES if stage in marks]
+    for stage, following in zip(reached, reached[1:] + [None]):
+        stages[stage] = (marks[following] if following else finished) - marks[stage]
+    return {'ok': bool(result.get('success')), 'message': result.get('message'),
+            'total': finished - started, 'stages': stages}
+
+
+async def run(args) -> dict:
+    from database.db import init_db
+    from core.content_generator import ContentGenerator
+    from core.content_fetcher import content_fetcher
+    from core.providers import close_providers
+    from core.telemetry import telemetry
+
+    init_db()
+    runner, base_url, names = await start_server(args.corpus, args.server_delay)
+    if not names:
+        await runner.cleanup()
+        raise SystemExit(f"❌ В {args.corpus} нет html-файлов")
+
+    generator = ContentGenerator(fused=args.fused)
+    platforms = args.platforms.split(',')
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def process_limited(number: int) -> dict:
+        async with semaphore:
+            url = f"{base_url}/{number}/{names[number % len(names)]}"
+            return await process(generator, url, platforms)
+
+    try:
+        await asyncio.gather(*(process_limited(-1 - i) for i in range(args.warmup)))
+        telemetry.reset()
+
+        started = time.monotonic()
+        results = await asyncio.gather(*(process_limited(i) for i in range(args.articles)))
+        elapsed = time.monotonic() - started
+        llm = telemetry.snapshot()
+    finally:
+        await content_fetcher.close()
+        await close_providers()
+        await runner.cleanup()
+
+    done = [result for result in results if result['ok']]
+    errors = {}
+    for result in results:
+        if not result['ok']:
+            errors[result['message']] = errors.get(result['message'], 0) + 1
+
+    return {
+        'config': {key: str(value) for key, value in vars(args).items() if key not in ('save', 'compare')},
+        'articles': len(results),
+        'succeeded': len(done),
+        'errors': errors,
+        'elapsed': elapsed,
+        'articles_per_minute': len(done) / elapsed * 60 if elapsed else 0.0,
+        'latency': summary([result['total'] for result in done]),
+        'stages': {
+            stage: summary([result['stages'][stage] for result in done if stage in result['stages']])
+            for stage in STAGES
+        },
+        'llm': [
+            {'method': row['method'], 'calls': row['counters'].get('calls', 0),
+             'errors': row['counters'].get('errors', 0), 'fallbacks': row['counters'].get('fallbacks', 0),
+             **{metric: row['histograms'].get(metric, {}).get('p50') for metric in ('queue_wait', 'ttft', 'latency')},
+             'p95': row['histograms'].get('total', {}).get('p95')}
+            for row in llm
+        ]
+    }
+
+
+def _fmt(value) -> str:
+    return '-' if value is None else f"{value:.2f}"
+
+
+def report(result: dict):
+    config = result['config']
+    print(f"Статей: {result['succeeded']} из {result['articles']}, одновременно {config['concurrency']}, "
+          f"fused={config['fused']}; модель fake: ttft {config['ttft']} с, {config['tps']} ток/с, "
+          f"ошибки {float(config['error_rate']):.0%}")
+    for message, count in result['errors'].items():
+        print(f"   ❌ {count} x {message}")
+    print(f"\nПропускная способность: {result['articles_per_minute']:.1f} статей/мин "
+          f"({result['elapsed']:.1f} с)")
+    latency = result['latency']
+    print(f"Время статьи, с: p50 {_fmt(latency['p50'])}  p95 {_fmt(latency['p95'])}  p99 {_fmt(latency['p99'])}")
+
+    print(f"\n{'Этап':<12} {'p50':>7} {'p95':>7} {'p99':>7}")
+    for stage, values in result['stages'].items():
+        if values['p50'] is not None:
+            print(f"{stage:<12} {_fmt(values['p50']):>7} {_fmt(values['p95']):>7} {_fmt(values['p99']):>7}")
+
+    print(f"\n{'Вызов LLM':<26} {'вызовов':>8} {'ошибок':>7} {'очередь':>8} {'ttft':>6} {'ответ':>6} {'p95':>6}")
+    for row in result['llm']:
+        print(f"{row['method']:<26} {row['calls']:>8g} {row['errors']:>7g} {_fmt(row['queue_wait']):>8} "
+              f"{_fmt(row['ttft']):>6} {_fmt(row['latency']):>6} {_fmt(row['p95']):>6}")
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    # Регрессия - пропускная способность ниже или хвост задержки выше базы больше чем на tolerance
+    regressions = []
+    print(f"\nСравнение с базой (допуск {tolerance:.0%}):")
+    checks = [('статей/мин', result['articles_per_minute'], baseline['articles_per_minute'], False)]
+    checks += [(f"время статьи {key}", result['latency'][key], baseline['latency'][key], True)
+               for key in ('p50', 'p95', 'p99')]
+    for name, current, base, lower_is_better in checks:
+        if current is None or not base:
+            continue
+        change = current / base - 1
+        worse = change > tolerance if lower_is_better else change < -tolerance
+        print(f"   {'❌' if worse else '✅'} {name}: {base:.2f} -> {current:.2f} ({change:+.0%})")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    args = parse_args()
+    configure(args)
+    if args.verbose:
+        result = asyncio.run(run(args))
+    else:
+        # Отладочный вывод пайплайна по каждой статье заглушил бы отчет
+        logging.disable(logging.INFO)
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = asyncio.run(run(args))
+    report(result)
+
+    if args.save:
+        args.save.write_text(json.dumps(result, ensure_ascii=False, indent=2))
+        print(f"\n💾 Результат сохранен в {args.save}")
+    if args.compare:
+        regressions = compare(result, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions:
+            print(f"\n❌ Регрессия: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
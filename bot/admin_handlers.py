@@ -0,0 +1,123 @@
+from aiogram import Router, F
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message, BufferedInputFile
+from datetime import datetime
+from html import escape
+import json
+import time
+
+from config.settings import ADMIN_IDS, LLM_CACHE_ENABLED
+from core.telemetry import telemetry
+from core.rate_limiter import limiter_stats
+from core.failover import health_stats
+from core.json_extract import extract_stats
+from core.text_budget import budget_stats
+from core.llm_cache import llm_cache
+
+admin_router = Router()
+# Не-администратор получит обычный ответ на неизвестное сообщение
+admin_router.message.filter(F.from_user.id.in_(ADMIN_IDS))
+
+MAX_MESSAGE_LENGTH = 3800
+
+
+def _seconds(value) -> str:
+    return '-' if value is None else f"{value:.2f}"
+
+
+def format_row(row: dict) -> str:
+    counters = row['counters']
+    histograms = row['histograms']
+    total = histograms.get('total', {})
+    queue = histograms.get('queue_wait', {})
+    ttft = histograms.get('ttft', {})
+    prompt_tokens = histograms.get('prompt_tokens', {})
+    completion_tokens = histograms.get('completion_tokens', {})
+
+    text = f"<b>{escape(row['method'])}</b> · {escape(row['provider'])} · {escape(str(row['model']))}\n"
+    text += (f"   вызовов {counters.get('calls', 0):g}, из кэша {counters.get('cache_hits', 0):g}, "
+             f"ошибок {counters.get('errors', 0):g}\n")
+    if total:
+        text += (f"   время p50/p95/p99: {_seconds(total['p50'])}/{_seconds(total['p95'])}/"
+                 f"{_seconds(total['p99'])} с, очередь p95 {_seconds(queue.get('p95'))} с")
+        if ttft:
+            text += f", первый текст p50 {_seconds(ttft['p50'])} с"
+        text += "\n"
+    if prompt_tokens:
+        text += (f"   токены: запрос ~{prompt_tokens['avg']:.0f}, ответ ~{completion_tokens['avg']:.0f}, "
+                 f"${counters.get('cost_usd', 0):.4f}")
+        estimated = counters.get('estimated_usage', 0)
+        if estimated:
+            text += f" (оценка по тексту в {estimated:g} из {counters.get('calls', 0):g} вызовов)"
+        text += "\n"
+    problems = {name: counters.get(name, 0) for name in ('provider_fallbacks', 'fallbacks', 'parse_failures')}
+    if any(problems.values()):
+        text += (f"   резервный провайдер {problems['provider_fallbacks']:g}, заглушка {problems['fallbacks']:g}, "
+                 f"не разобран JSON {problems['parse_failures']:g}\n")
+    return text
+
+
+def format_components() -> str:
+    text = "\n<b>Провайдеры:</b>\n"
+    health = health_stats()
+    for name, limiter in limiter_stats().items():
+        state = health.get(name, {})
+        text += (f"   {name}: в очереди {limiter['waiting']}, повторов {limiter['retries']}, "
+                 f"429 - {limiter['rate_limited']}, ожидание max {limiter['queue_wait_max']:.1f} с")
+        if state and not state['available']:
+            text += " ⛔ отключен"
+        text += "\n"
+
+    if LLM_CACHE_ENABLED:
+        cache = llm_cache.stats()
+        text += f"Кэш LLM: {cache['entries']} ответов, попаданий {cache['hit_rate']:.0%}\n"
+    budget = budget_stats()
+    text += (f"Сокращено статей: {budget['compressed']} из {budget['calls']}, "
+             f"сэкономлено ~{budget['saved_tokens']} токенов\n")
+    parsed = extract_stats()
+    text += (f"Разбор JSON: {parsed['parsed']} ок, {parsed['repaired']} исправлено, "
+             f"{parsed['truncated']} оборвано, {parsed['failed']} ошибок\n")
+    return text
+
+
+@admin_router.message(Command("stats"))
+async def cmd_stats(message: Message, command: CommandObject):
+    # /stats - сводка, /stats <метод или провайдер> - фильтр,
+    # /stats export - файл в формате Prometheus и JSON, /stats reset - сброс
+    args = (command.args or '').strip()
+
+    if args == 'reset':
+        telemetry.reset()
+        await message.answer("✅ Метрики LLM сброшены")
+        return
+
+    if args == 'export':
+        stamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        await message.answer_document(
+            BufferedInputFile(telemetry.export().encode(), filename=f"llm_metrics_{stamp}.prom")
+        )
+        await message.answer_document(
+            BufferedInputFile(
+                json.dumps(telemetry.snapshot(), ensure_ascii=False, indent=2).encode(),
+                filename=f"llm_metrics_{stamp}.json"
+            )
+        )
+        return
+
+    rows = telemetry.snapshot(method=args or None)
+    if args and not rows:
+        rows = telemetry.snapshot(provider=args)
+
+    uptime = (time.time() - telemetry.started_at) / 3600
+    text = f"📊 <b>Вызовы LLM</b> за {uptime:.1f} ч\n\n"
+    if not rows:
+        text += "Вызовов пока не было\n"
+    footer = format_components() if not args else ''
+    for row in rows:
+        part = format_row(row) + "\n"
+        # Режем по строкам таблицы, а не посередине HTML-тега
+        if len(text) + len(part) + len(footer) > MAX_MESSAGE_LENGTH:
+            text += "…\nПолностью: /stats export\n"
+            break
+        text += part
+    await message.answer(text + footer, parse_mode="HTML")
@@ -0,0 +1,89 @@
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+from html import escape
+
+from config.settings import FEED_DEFAULT_INTERVAL
+from core.feed_poller import feed_poller
+from database.db import get_db, create_feed, get_user_feeds, deactivate_feed
+
+feed_router = Router()
+
+
+@feed_router.message(Command("subscribe"))
+async def cmd_subscribe(message: Message, command: CommandObject):
+    url = (command.args or '').strip()
+    if not url.startswith(('http://', 'https://')):
+        await message.answer(
+            "❌ Укажите адрес RSS/Atom-ленты:\n<code>/subscribe https://example.com/rss</code>",
+            parse_mode="HTML"
+        )
+        return
+
+    # Обычная страница вместо ленты молча не дала бы ни одной статьи - проверяем сразу
+    probe = await feed_poller.probe(url)
+    if probe.get('error'):
+        await message.answer(f"❌ {probe['message']}")
+        return
+
+    db = get_db()
+    try:
+        feed = create_feed(db, message.from_user.id, url[:500], FEED_DEFAULT_INTERVAL)
+        feed_id = feed.id
+    finally:
+        db.close()
+
+    title = f" «{probe['title']}»" if probe['title'] else ''
+    await message.answer(
+        f"✅ Лента #{feed_id}{title} добавлена. Новые статьи из нее будут обрабатываться автоматически.\n\n"
+        f"Список подписок: /feeds"
+    )
+
+
+@feed_router.message(Command("unsubscribe"))
+async def cmd_unsubscribe(message: Message, command: CommandObject):
+    args = (command.args or '').strip()
+    if not args.isdigit():
+        await message.answer("❌ Укажите номер ленты из /feeds, например: /unsubscribe 3")
+        return
+
+    db = get_db()
+    try:
+        removed = deactivate_feed(db, message.from_user.id, int(args))
+    finally:
+        db.close()
+
+    if removed:
+        await message.answer(f"✅ Подписка на ленту #{args} отменена")
+    else:
+        await message.answer("❌ Лента не найдена")
+
+
+@feed_router.message(Command("feeds"))
+async def cmd_feeds(message: Message):
+    db = get_db()
+    try:
+        feeds = get_user_feeds(db, message.from_user.id)
+
+        if not feeds:
+            await message.answer(
+                "📭 У вас нет подписок на ленты.\n\nДобавить: <code>/subscribe https://example.com/rss</code>",
+                parse_mode="HTML"
+            )
+            return
+
+        text = "📰 <b>Ваши RSS-ленты:</b>\n\n"
+        for feed in feeds:
+            text += f"#{feed.id} <b>{escape(feed.title or feed.url)}</b>\n"
+            if feed.title:
+                text += f"   🔗 {escape(feed.url)}\n"
+            if feed.last_polled_at:
+                text += f"   🕐 Проверена: {feed.last_polled_at.strftime('%d.%m %H:%M')} UTC\n"
+            if feed.error_count:
+                text += f"   ⚠️ Ошибок подряд: {feed.error_count}\n"
+            text += "\n"
+    finally:
+        db.close()
+
+    text += "Отписаться: /unsubscribe &lt;номер&gt;"
+    await message.answer(text, parse_mode="HTML", disable_web_page_preview=True)
@@ -4,6 +4,9 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 import json
+import re
+import time
+from html import escape
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 from bot.keyboards import (
@@ -11,13 +14,17 @@ from bot.keyboards import (
     get_cancel_keyboard, get_settings_menu, get_tone_selection,
     get_post_actions
 )
-from core.content_generator import ContentGenerator
+from bot.progress import ProgressMessage, render_progress, MESSAGE_LIMIT
+from config.settings import AI_STREAMING
+from core.content_generator import ContentGenerator, unique_article_urls
 from database.db import get_db, get_user_settings, update_user_settings, get_posts_by_article
 from database.models import Article, Post
 from sqlalchemy.orm import joinedload
 
 router = Router()
 
+URL_PATTERN = re.compile(r'https?://[^\s<>"\']+')
+
 class ArticleStates(StatesGroup):
     waiting_for_url = State()
     selecting_platforms = State()
@@ -88,6 +95,11 @@ async def cmd_help(message: Message):
    • Статистика публикаций
    • Анализ эффективности
 
+7️⃣ <b>📰 RSS-ленты</b>
+   • /subscribe &lt;ссылка&gt; — подписаться на ленту
+   • /feeds — список подписок
+   • Новые статьи обрабатываются автоматически
+
 <b>Дополнительные фичи:</b>
 🖼 Генерация креативных изображений
 📤 Автопостинг в соцсети
@@ -122,13 +134,13 @@ async def process_url(message: Message, state: FSMContext):
         await message.answer("Отменено ✅", reply_markup=get_main_menu())
         return
 
-    url = message.text.strip()
+    urls = list(dict.fromkeys(URL_PATTERN.findall(message.text)))
 
-    if not url.startswith(('http://', 'https://')):
+    if not urls:
         await message.answer("❌ Это не похоже на ссылку. Попробуй еще раз:")
         return
 
-    await state.update_data(url=url)
+    await state.update_data(url=urls[0], urls=urls)
 
     await state.set_state(ArticleStates.selecting_platforms)
 
@@ -142,8 +154,10 @@ async def process_url(message: Message, state: FSMContext):
 
     await state.update_data(selected_platforms=default_platforms or ['telegram', 'vk'])
 
+    links_note = f"🔗 Ссылок в пакете: {len(urls)}\n\n" if len(urls) > 1 else ""
+
     await message.answer(
-        "📱 <b>Выбери платформы для публикации:</b>\n\n"
+        f"{links_note}📱 <b>Выбери платформы для публикации:</b>\n\n"
         "Отмечены платформы по умолчанию.\n"
         "Нажми на платформу чтобы добавить/убрать её.",
         reply_markup=get_platform_selection(),
@@ -195,19 +209,90 @@ async def platforms_selected(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Выбери хотя бы одну платформу", show_alert=True)
         return
 
-    await callback.message.edit_text("⏳ Обрабатываю статью... Это займет 10-20 секунд.")
+    urls = data.get('urls') or [url]
+    if len(urls) > 1:
+        await process_bulk_urls(callback, state, urls, platforms)
+        return
+
+    progress = ProgressMessage(callback.message)
+    await progress.update("⏳ Обрабатываю статью... Это займет 10-20 секунд.")
 
     generator = ContentGenerator()
     result = await generator.process_article_url(
         url=url,
         user_id=callback.from_user.id,
-        platforms=platforms
+        platforms=platforms,
+        on_progress=show_progress(progress)
     )
 
+    if result.get('near_duplicate'):
+        await progress.finish()
+        # Состояние не сбрасываем: url и платформы понадобятся после выбора пользователя
+        await callback.message.edit_text(
+            f"♻️ <b>Похоже, эта новость уже обрабатывалась</b>\n\n"
+            f"📰 {escape(result['duplicate_title'] or '')}\n"
+            f"Совпадение текста: {result['similarity']:.0%}\n\n"
+            "Можно взять готовый анализ и посты или обработать статью заново.",
+            parse_mode="HTML",
+            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+                [InlineKeyboardButton(text="♻️ Взять готовые посты", callback_data="duplicate_reuse")],
+                [InlineKeyboardButton(text="🔄 Обработать заново", callback_data="duplicate_process")]
+            ])
+        )
+        return
+
+    await progress.finish(finished_text(result))
     await state.clear()
+    await send_article_report(callback.message, result)
+
+
+@router.callback_query(F.data.in_({"duplicate_reuse", "duplicate_process"}))
+async def resolve_duplicate(callback: CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    url = data.get('url')
+    platforms = data.get('selected_platforms', [])
+
+    if not url:
+        await callback.answer("❌ Ссылка не найдена, отправь её еще раз", show_alert=True)
+        return
+
+    on_duplicate = 'reuse' if callback.data == "duplicate_reuse" else 'process'
+    progress = ProgressMessage(callback.message)
+    await progress.update("⏳ Обрабатываю статью...")
+
+    generator = ContentGenerator()
+    result = await generator.process_article_url(
+        url=url,
+        user_id=callback.from_user.id,
+        platforms=platforms,
+        on_duplicate=on_duplicate,
+        on_progress=show_progress(progress)
+    )
+    await progress.finish(finished_text(result))
+
+    await state.clear()
+    await send_article_report(callback.message, result)
+    await callback.answer()
+
+
+def show_progress(progress: ProgressMessage):
+    # Промежуточный результат в сообщении "Обрабатываю": краткое содержание
+    # и посты появляются, пока модель их пишет
+    if not AI_STREAMING:
+        return None
+
+    async def on_progress(state: dict):
+        await progress.update(render_progress(state))
+    return on_progress
+
 
+def finished_text(result: dict) -> str:
+    return "❌ Статья не обработана" if result.get('error') else "✅ Готово, результат ниже ⬇️"
+
+
+async def send_article_report(message: Message, result: dict):
     if result.get('error'):
-        await callback.message.answer(
+        await message.answer(
             f"❌ Ошибка: {result.get('message')}",
             reply_markup=get_main_menu()
         )
@@ -225,8 +310,10 @@ async def platforms_selected(callback: CallbackQuery, state: FSMContext):
         'neutral': 'Нейтральная'
     }
 
-    report = f"""✅ <b>Статья обработана!</b>
+    reused_note = "♻️ <i>Анализ и посты взяты у похожей статьи</i>\n" if result.get('reused_from') else ""
 
+    report = f"""✅ <b>Статья обработана!</b>
+{reused_note}
 📰 <b>Заголовок:</b> {result['title']}
 
 📝 <b>Краткое содержание:</b>
@@ -271,17 +358,73 @@ async def platforms_selected(callback: CallbackQuery, state: FSMContext):
         ]
     )
 
-    await callback.message.answer(
+    await message.answer(
         report,
         parse_mode="HTML",
         reply_markup=action_keyboard
     )
 
-    await callback.message.answer(
+    await message.answer(
         "Используй меню ниже:",
         reply_markup=get_main_menu()
     )
 
+async def process_bulk_urls(callback: CallbackQuery, state: FSMContext, urls: list, platforms: list):
+    await state.clear()
+
+    # Столько статей и будет обработано: варианты одной ссылки генератор объединяет
+    total = len(unique_article_urls(urls))
+    await callback.message.edit_text(f"⏳ Обрабатываю статьи: 0/{total}")
+
+    generator = ContentGenerator()
+    processed = []
+    failed = []
+    last_update = time.monotonic()
+
+    async for result in generator.process_article_urls(urls, callback.from_user.id, platforms):
+        if result.get('error'):
+            failed.append(result)
+        else:
+            processed.append(result)
+
+        done = len(processed) + len(failed)
+        # Telegram ограничивает частоту редактирования сообщений
+        if done < total and time.monotonic() - last_update >= 3:
+            last_update = time.monotonic()
+            await callback.message.edit_text(f"⏳ Обрабатываю статьи: {done}/{total}")
+
+    lines = [f"✅ <b>Пакет обработан:</b> {len(processed)} из {total}\n\n"]
+
+    for result in processed:
+        reused = " ♻️" if result.get('reused_from') else ""
+        lines.append(f"📰 {escape(result['title'][:60])} — постов: {result['total_posts']}{reused}\n")
+
+    if failed:
+        lines.append(f"\n❌ <b>Ошибки ({len(failed)}):</b>\n")
+        for result in failed:
+            lines.append(f"• {escape(result['url'][:60])}: {escape(str(result.get('message'))[:200])}\n")
+
+    # Длинный отчет - несколькими сообщениями, разрезанными по строкам, а не посередине HTML-тега
+    parts = _split_lines(lines, MESSAGE_LIMIT)
+    await callback.message.edit_text(parts[0], parse_mode="HTML", disable_web_page_preview=True)
+    for part in parts[1:]:
+        await callback.message.answer(part, parse_mode="HTML", disable_web_page_preview=True)
+
+    await callback.message.answer(
+        "Посты сохранены, их можно найти в разделе «📊 Мои статьи».",
+        reply_markup=get_main_menu()
+    )
+
+
+def _split_lines(lines: list, limit: int) -> list:
+    parts = ['']
+    for line in lines:
+        if parts[-1] and len(parts[-1]) + len(line) > limit:
+            parts.append('')
+        parts[-1] += line
+    return parts
+
+
 @router.message(F.text == "⚙️ Настройки")
 async def show_settings(message: Message):
     db = get_db()
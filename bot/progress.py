@@ -0,0 +1,116 @@
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message
+from html import escape
+import asyncio
+import logging
+import time
+
+from config.settings import PLATFORMS, PROGRESS_EDIT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_LIMIT = 4096
+# Запас на HTML-разметку и экранирование
+TEXT_BUDGET = 3500
+SUMMARY_LIMIT = 600
+CURSOR = '▌'
+
+STAGE_TITLES = {
+    'fetch': '⏳ Загружаю статью...',
+    'analysis': '🤖 Анализирую контент...',
+    'posts': '✍️ Пишу посты...',
+    'save': '📅 Сохраняю и планирую публикации...',
+}
+
+
+class ProgressMessage:
+    # Сообщение, которое постепенно дописывается по мере работы пайплайна.
+    # Telegram ограничивает частоту правок одного сообщения (при превышении - 429 с retry_after),
+    # поэтому update только запоминает текст, а отправляется он не чаще min_interval:
+    # промежуточные версии пропускаются, последняя всегда доходит
+
+    def __init__(self, message: Message, min_interval: float = PROGRESS_EDIT_INTERVAL):
+        self.message = message
+        self.min_interval = min_interval
+        self.edits = 0
+        self._shown = None
+        self._pending = None
+        self._next_edit_at = 0.0
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    async def update(self, text: str):
+        self._pending = text[:MESSAGE_LIMIT]
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        while self._pending is not None:
+            delay = self._next_edit_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._flush()
+
+    async def _flush(self):
+        async with self._lock:
+            text, self._pending = self._pending, None
+            if text is None or text == self._shown:
+                return
+            try:
+                await self.message.edit_text(text, parse_mode="HTML", disable_web_page_preview=True)
+            except TelegramRetryAfter as e:
+                # Не теряем текст: отправим его (или более свежий) после паузы
+                self._next_edit_at = time.monotonic() + e.retry_after
+                if self._pending is None:
+                    self._pending = text
+                return
+            except TelegramBadRequest as e:
+                # "message is not modified" и т.п. - прогресс не должен ломать обработку
+                logger.debug(f"Не удалось обновить сообщение: {e}")
+                return
+            self._shown = text
+            self.edits += 1
+            self._next_edit_at = time.monotonic() + self.min_interval
+
+    async def finish(self, text: str = None):
+        # Промежуточные правки больше не нужны; text - итоговый вид сообщения
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._pending = None
+        if text is not None:
+            self._pending = text[:MESSAGE_LIMIT]
+            delay = self._next_edit_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._flush()
+
+
+def _cut(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return text[:limit].rstrip() + '…'
+
+
+def render_progress(state: dict) -> str:
+    # state - состояние из ContentGenerator.process_article_url(on_progress=...)
+    lines = [STAGE_TITLES.get(state.get('stage'), '⏳ Обрабатываю статью...')]
+
+    if state.get('title'):
+        lines.append(f"\n📰 <b>{escape(_cut(state['title'], 200))}</b>")
+
+    summary = state.get('summary')
+    if summary:
+        cursor = CURSOR if state.get('stage') == 'analysis' else ''
+        lines.append(f"\n📝 {escape(_cut(summary, SUMMARY_LIMIT))}{cursor}")
+
+    posts = {platform: text for platform, text in (state.get('posts') or {}).items() if text}
+    if posts:
+        limit = max(200, (TEXT_BUDGET - SUMMARY_LIMIT) // len(posts))
+        last = list(posts)[-1]
+        for platform, text in posts.items():
+            name = PLATFORMS.get(platform, {}).get('name', platform)
+            cursor = CURSOR if state.get('stage') == 'posts' and platform == last else ''
+            lines.append(f"\n📍 <b>{escape(name)}</b>\n<i>{escape(_cut(text, limit))}</i>{cursor}")
+
+    return '\n'.join(lines)
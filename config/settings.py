@@ -4,6 +4,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+# Telegram ID администраторов через запятую - им доступна команда /stats
+ADMIN_IDS = {int(user_id) for user_id in os.getenv("ADMIN_IDS", "").split(",") if user_id.strip()}
 AI_PROVIDER = os.getenv("AI_PROVIDER", "gemini")
 AI_API_KEY = os.getenv("AI_API_KEY", "")
 
@@ -14,15 +16,142 @@ AI_MODELS = {
     "claude": "claude-sonnet-4-20250514",
     "gemini": "gemini-1.5-flash",
     "groq": "llama-3.3-70b-versatile",  # Быстрая бесплатная модель
-    "ollama": "llama3.1"  # Локальная модель
+    "openai": "gpt-4o-mini",
+    "ollama": "llama3.1",  # Локальная модель
+    "fake": "fake-json"  # Без сети, для бенчмарков
 }
 
 AI_MODEL = os.getenv("AI_MODEL", AI_MODELS.get(AI_PROVIDER, "gemini-1.5-flash"))
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", AI_API_KEY)
 CLAUDE_MODEL = "claude-sonnet-4-20250514"
 
+# Провайдеры по приоритету: при ошибке или долгом ответе запрос уходит следующему.
+# Ключи и модели резервных провайдеров - GROQ_API_KEY, GEMINI_API_KEY, ANTHROPIC_API_KEY, OPENAI_API_KEY и AI_MODELS
+AI_PROVIDER_CHAIN = [
+    provider.strip().lower()
+    for provider in os.getenv("AI_PROVIDER_CHAIN", AI_PROVIDER).split(",") if provider.strip()
+]
+if AI_PROVIDER.lower() not in AI_PROVIDER_CHAIN:
+    AI_PROVIDER_CHAIN.insert(0, AI_PROVIDER.lower())
+PROVIDER_API_KEYS = {
+    "groq": os.getenv("GROQ_API_KEY", ""),
+    "gemini": os.getenv("GEMINI_API_KEY", ""),
+    "claude": ANTHROPIC_API_KEY,
+    "openai": os.getenv("OPENAI_API_KEY", ""),
+    "ollama": "",
+}
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+# Дублирование запроса резервному провайдеру, если основной отвечает дольше своего p95
+AI_HEDGING = os.getenv("AI_HEDGING", "True") == "True"
+AI_HEDGE_DEFAULT_DELAY = float(os.getenv("AI_HEDGE_DEFAULT_DELAY", "20"))
+AI_HEDGE_MIN_DELAY = float(os.getenv("AI_HEDGE_MIN_DELAY", "2"))
+AI_CIRCUIT_FAILURES = int(os.getenv("AI_CIRCUIT_FAILURES", "3"))
+AI_CIRCUIT_COOLDOWN = int(os.getenv("AI_CIRCUIT_COOLDOWN", "60"))
+# Тестовый провайдер без сети (AI_PROVIDER=fake): медиана и разброс задержки до первого токена
+# (логнормальное распределение), скорость генерации и доля ошибок 503. FAKE_LLM_SEED - повторяемые задержки
+FAKE_LLM_TTFT = float(os.getenv("FAKE_LLM_TTFT", "0.5"))
+FAKE_LLM_TTFT_SIGMA = float(os.getenv("FAKE_LLM_TTFT_SIGMA", "0.4"))
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "250"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_SEED = os.getenv("FAKE_LLM_SEED")
+
+# Лимиты провайдеров: запросов и токенов в минуту (0 - без ограничения),
+# одновременных запросов. Для текущего провайдера переопределяются через AI_RPM, AI_TPM, AI_MAX_IN_FLIGHT
+AI_RATE_LIMITS = {
+    "groq": {"rpm": 30, "tpm": 6000, "in_flight": 4},
+    "gemini": {"rpm": 15, "tpm": 1000000, "in_flight": 4},
+    "claude": {"rpm": 50, "tpm": 40000, "in_flight": 8},
+    "ollama": {"rpm": 0, "tpm": 0, "in_flight": 1},
+    "fake": {"rpm": 0, "tpm": 0, "in_flight": 16},
+}
+_current_limits = AI_RATE_LIMITS.setdefault(AI_PROVIDER.lower(), {})
+for _key, _env in (("rpm", "AI_RPM"), ("tpm", "AI_TPM"), ("in_flight", "AI_MAX_IN_FLIGHT")):
+    if os.getenv(_env):
+        _current_limits[_key] = int(os.getenv(_env))
+# Какую долю max_tokens списывать из лимита токенов до ответа; после ответа
+# списание выравнивается по фактическому расходу
+AI_EXPECTED_COMPLETION_SHARE = float(os.getenv("AI_EXPECTED_COMPLETION_SHARE", "0.5"))
+# Повторы при 429/5xx и обрыве соединения
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "4"))
+# Сколько токенов текста статьи отправлять модели; длинная статья сокращается
+# до самых информативных предложений (раньше - первые 3000 символов)
+AI_INPUT_BUDGET = int(os.getenv("AI_INPUT_BUDGET", "1200"))
+# Очень длинные статьи (отчеты, лонгриды) - map-reduce: части анализируются параллельно,
+# затем итоговый анализ по их конспектам. AI_MAX_CHUNKS - сколько частей максимум
+AI_MAP_REDUCE_MIN_TOKENS = int(os.getenv("AI_MAP_REDUCE_MIN_TOKENS", "4000"))
+AI_CHUNK_TOKENS = int(os.getenv("AI_CHUNK_TOKENS", "1500"))
+AI_MAX_CHUNKS = int(os.getenv("AI_MAX_CHUNKS", "6"))
+
+# Цена за миллион токенов (запрос, ответ) в долларах - для оценки расходов в /stats
+AI_TOKEN_PRICES = {
+    "claude": (3.0, 15.0),
+    "gemini": (0.075, 0.3),
+    "groq": (0.59, 0.79),
+    "openai": (0.15, 0.6),
+    "ollama": (0.0, 0.0),
+}
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///newsmaker.db")
 
+# Общий HTTP-клиент для загрузки статей
+FETCH_TIMEOUT = int(os.getenv("FETCH_TIMEOUT", "30"))
+FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", "100"))
+FETCH_MAX_CONNECTIONS_PER_HOST = int(os.getenv("FETCH_MAX_CONNECTIONS_PER_HOST", "8"))
+FETCH_DNS_CACHE_TTL = int(os.getenv("FETCH_DNS_CACHE_TTL", "300"))
+FETCH_KEEPALIVE_TIMEOUT = int(os.getenv("FETCH_KEEPALIVE_TIMEOUT", "30"))
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(5 * 1024 * 1024)))
+
+# Пакетная обработка ссылок
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "16"))
+FETCH_PER_DOMAIN_CONCURRENCY = int(os.getenv("FETCH_PER_DOMAIN_CONCURRENCY", "2"))
+PROCESS_CONCURRENCY = int(os.getenv("PROCESS_CONCURRENCY", "4"))
+
+# Кэш загруженных страниц с условными запросами (ETag / Last-Modified)
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "True") == "True"
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "http_cache.db")
+HTTP_CACHE_TTL = int(os.getenv("HTTP_CACHE_TTL", "900"))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+# Анализ, посты и расписание одним запросом к модели; при негодном ответе - обычный путь
+FUSED_PIPELINE = os.getenv("FUSED_PIPELINE", "False") == "True"
+
+# Показ ответа модели в боте по мере генерации. Telegram ограничивает частоту
+# редактирования сообщения, поэтому правки не чаще раза в PROGRESS_EDIT_INTERVAL секунд
+AI_STREAMING = os.getenv("AI_STREAMING", "True") == "True"
+PROGRESS_EDIT_INTERVAL = float(os.getenv("PROGRESS_EDIT_INTERVAL", "1.5"))
+
+# Кэш ответов LLM: одинаковый промпт не отправляется модели повторно
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "True") == "True"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Поиск почти одинаковых статей (перепечатки одного пресс-релиза) по SimHash
+SIMHASH_MAX_DISTANCE = int(os.getenv("SIMHASH_MAX_DISTANCE", "6"))
+SIMHASH_INDEX_SIZE = int(os.getenv("SIMHASH_INDEX_SIZE", "5000"))
+
+# RSS/Atom-ленты: интервал опроса подстраивается под частоту обновлений
+FEED_MIN_INTERVAL = int(os.getenv("FEED_MIN_INTERVAL", "300"))
+FEED_MAX_INTERVAL = int(os.getenv("FEED_MAX_INTERVAL", str(6 * 3600)))
+FEED_DEFAULT_INTERVAL = int(os.getenv("FEED_DEFAULT_INTERVAL", "900"))
+FEED_TICK_SECONDS = int(os.getenv("FEED_TICK_SECONDS", "30"))
+FEED_POLL_CONCURRENCY = int(os.getenv("FEED_POLL_CONCURRENCY", "10"))
+FEED_QUEUE_SIZE = int(os.getenv("FEED_QUEUE_SIZE", "100"))
+FEED_WORKERS = int(os.getenv("FEED_WORKERS", "2"))
+# Сколько свежих записей обработать при первой подписке, остальные только отметить
+FEED_INITIAL_ITEMS = int(os.getenv("FEED_INITIAL_ITEMS", "3"))
+# После стольких неудачных попыток запись ленты отмечается прочитанной (404, не HTML и т.п.)
+FEED_MAX_ATTEMPTS = int(os.getenv("FEED_MAX_ATTEMPTS", "3"))
+
+# Рендер страниц с JavaScript через Playwright (нужен `playwright install chromium`)
+JS_RENDER_ENABLED = os.getenv("JS_RENDER_ENABLED", "False") == "True"
+# Заранее открытые контексты браузера - они же лимит одновременных рендеров
+JS_RENDER_CONTEXTS = int(os.getenv("JS_RENDER_CONTEXTS", "2"))
+JS_RENDER_TIMEOUT = int(os.getenv("JS_RENDER_TIMEOUT", "20"))
+
+# Разбор HTML в пуле процессов; 0 - разбирать в event loop
+PARSER_WORKERS = int(os.getenv("PARSER_WORKERS", str(min(os.cpu_count() or 1, 4))))
+
 PLATFORMS = {
     "telegram": {
         "name": "Telegram",
@@ -64,4 +193,10 @@ POSTING_HOURS = {
     "evening": [18, 19, 20]
 }
 
+# local - время публикации считается по правилам ниже без запросов к модели, llm - спрашиваем модель
+SCHEDULE_MODE = os.getenv("SCHEDULE_MODE", "local")
+SCHEDULE_HORIZON_DAYS = int(os.getenv("SCHEDULE_HORIZON_DAYS", "7"))
+# Сколько постов на одну платформу допускается в один час
+SCHEDULE_SLOT_CAPACITY = int(os.getenv("SCHEDULE_SLOT_CAPACITY", "1"))
+
 DEBUG = os.getenv("DEBUG", "False") == "True"
\ No newline at end of file
@@ -1,4 +1,13 @@
 from core.universal_ai_analyzer import UniversalAIAnalyzer
+from core.json_extract import extract_json, validate
+
+EDIT_SCHEMA = {
+    'type': dict,
+    'required': ('edited_post',),
+    'properties': {'edited_post': {'type': str, 'non_empty': True}, 'changes': str}
+}
+SUGGESTIONS_SCHEMA = {'type': list, 'items': str}
+VARIATION_SCHEMA = {'type': dict, 'required': ('text',), 'properties': {'text': {'type': str, 'non_empty': True}}}
 
 
 class AIEditor:
@@ -44,17 +53,9 @@ class AIEditor:
 Отвечай ТОЛЬКО JSON, без markdown."""
 
         try:
-            result_text = await self.analyzer.generate(prompt, max_tokens=1000)
-
-            result_text = result_text.strip()
-            if result_text.startswith('```'):
-                lines = result_text.split('\n')
-                result_text = '\n'.join(lines[1:-1])
-            if result_text.startswith('json'):
-                result_text = result_text[4:].strip()
-
-            import json
-            result = json.loads(result_text)
+            # Повторный запрос правки (после "Вернуть как было") ждет новый текст, а не тот же из кэша
+            result_text = await self.analyzer.generate(prompt, max_tokens=1000, use_cache=False, method='edit_post')
+            result = extract_json(result_text, EDIT_SCHEMA)
 
             return {
                 'edited_post': result.get('edited_post', original_post),
@@ -63,6 +64,7 @@ class AIEditor:
             }
 
         except Exception as e:
+            self.analyzer.count_fallback('edit_post', e)
             print(f"Ошибка редактирования: {e}")
             return {
                 'edited_post': original_post,
@@ -99,21 +101,12 @@ class AIEditor:
 Отвечай ТОЛЬКО JSON массивом."""
 
         try:
-            result_text = await self.analyzer.generate(prompt, max_tokens=500)
-
-            result_text = result_text.strip()
-            if result_text.startswith('```'):
-                lines = result_text.split('\n')
-                result_text = '\n'.join(lines[1:-1])
-            if result_text.startswith('json'):
-                result_text = result_text[4:].strip()
-
-            import json
-            suggestions = json.loads(result_text)
-
-            return suggestions if isinstance(suggestions, list) else []
+            result_text = await self.analyzer.generate(prompt, max_tokens=500, method='suggest_improvements')
+            return extract_json(result_text, SUGGESTIONS_SCHEMA)
 
         except Exception as e:
+            await self.analyzer.forget(prompt, max_tokens=500)
+            self.analyzer.count_fallback('suggest_improvements', e)
             print(f"Ошибка предложений: {e}")
             return [
                 "Добавить больше эмодзи",
@@ -151,20 +144,14 @@ class AIEditor:
 Отвечай ТОЛЬКО JSON массивом."""
 
         try:
-            result_text = await self.analyzer.generate(prompt, max_tokens=1500)
-
-            result_text = result_text.strip()
-            if result_text.startswith('```'):
-                lines = result_text.split('\n')
-                result_text = '\n'.join(lines[1:-1])
-            if result_text.startswith('json'):
-                result_text = result_text[4:].strip()
-
-            import json
-            variations = json.loads(result_text)
-
-            return variations if isinstance(variations, list) else []
+            # Каждое нажатие "Создать варианты" - новые варианты
+            result_text = await self.analyzer.generate(prompt, max_tokens=1500, use_cache=False,
+                                                       method='create_variations')
+            variations = extract_json(result_text, list)
+            # Битый вариант пропускаем, остальные показываем
+            return [variation for variation in variations if not validate(variation, VARIATION_SCHEMA)]
 
         except Exception as e:
+            self.analyzer.count_fallback('create_variations', e)
             print(f"Ошибка создания вариантов: {e}")
             return []
\ No newline at end of file
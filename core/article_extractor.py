@@ -0,0 +1,306 @@
+import lxml.html
+from lxml import etree
+import re
+
+from core.fingerprint import content_fingerprint
+
+# Модуль без состояния: функции вызываются в дочерних процессах ProcessPoolExecutor,
+# поэтому всё, что им нужно, передается аргументами и должно сериализоваться pickle
+
+MIN_CONTENT_LENGTH = 200
+NO_CONTENT = "Не удалось извлечь контент"
+NO_TITLE = "Без заголовка"
+
+TITLE_PATTERNS = [
+    (re.compile(r'\(@\w+\)'), ''),
+    (re.compile(r'@\w+'), ''),
+    (re.compile(r'\s*[—–-]\s*(Блог на|на)\s+[\w\.]+\s*$', re.IGNORECASE), ''),
+    (re.compile(r'\s*[|\-–—]\s*(Новости|Статьи|Блог|Blog|News).*$', re.IGNORECASE), ''),
+    (re.compile(r'\s+'), ' '),
+    (re.compile(r'\(\s*\)'), ''),
+]
+
+NOISE_TAGS = ('script', 'style', 'nav', 'footer', 'header', 'aside', 'noscript', 'form',
+              'iframe', 'svg', 'button', 'select', 'template')
+TEXT_TAGS = frozenset(('p', 'h2', 'h3', 'h4', 'li', 'blockquote'))
+ARTICLE_TAGS = frozenset(('article', 'main'))
+# Классы темы на body/html ("single-post right-sidebar") не говорят о шуме
+PAGE_TAGS = frozenset(('html', 'body'))
+
+DIGITS = re.compile(r'\d')
+META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+POSITIVE_HINTS = re.compile(r'article|content|entry|post|story|text|body|main', re.IGNORECASE)
+NEGATIVE_HINTS = re.compile(r'comment|related|share|social|sidebar|promo|advert|banner|subscribe|'
+                            r'footer|menu|breadcrumb|tags|popular|recommend', re.IGNORECASE)
+
+_parsers = {}
+
+
+def _parser(encoding: str = None) -> lxml.html.HTMLParser:
+    parser = _parsers.get(encoding)
+    if parser is None:
+        parser = lxml.html.HTMLParser(encoding=encoding, remove_comments=True)
+        _parsers[encoding] = parser
+    return parser
+
+
+def detect_encoding(html: bytes) -> str:
+    match = META_CHARSET.search(html[:4096])
+    if match:
+        return match.group(1).decode('ascii').lower()
+
+    # Без объявленной кодировки libxml2 считает документ latin-1
+    try:
+        html.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return None
+
+
+def extract_article(html: bytes, encoding: str = None, strategy: str = None) -> dict:
+    # strategy - XPath контейнера, который уже срабатывал на этом домене
+    try:
+        root = lxml.html.document_fromstring(html, parser=_parser(encoding or detect_encoding(html)))
+    except (etree.ParserError, LookupError, ValueError):
+        # Пустой документ или неизвестная кодировка в заголовке ответа
+        if encoding is None:
+            return {'title': NO_TITLE, 'content': NO_CONTENT, 'strategy': None,
+                    'canonical_url': None, 'fingerprint': None}
+        return extract_article(html, strategy=strategy)
+
+    title = extract_title(root)
+    canonical_url = extract_canonical_url(root)
+    content, used_strategy = extract_content(root, strategy)
+
+    return {
+        'title': title,
+        'content': content,
+        'strategy': used_strategy,
+        'canonical_url': canonical_url,
+        # Считаем здесь, в воркере пула, а не в event loop
+        'fingerprint': content_fingerprint(content) if content != NO_CONTENT else None
+    }
+
+
+def extract_canonical_url(root) -> str:
+    # Может быть относительным - ссылку относительно адреса страницы собирает ContentFetcher
+    for link in root.iterfind('.//link[@href]'):
+        if 'canonical' in link.get('rel', '').lower().split():
+            return link.get('href').strip() or None
+
+    og_url = root.find('.//meta[@property="og:url"]')
+    if og_url is not None and og_url.get('content'):
+        return og_url.get('content').strip()
+
+    return None
+
+
+def extract_title(root) -> str:
+    title = None
+
+    og_title = root.find('.//meta[@property="og:title"]')
+    if og_title is not None and og_title.get('content'):
+        title = og_title.get('content')
+
+    if not title:
+        title = root.findtext('.//title')
+
+    if not title or not title.strip():
+        h1 = root.find('.//h1')
+        if h1 is not None:
+            title = h1.text_content().strip()
+
+    if not title:
+        return NO_TITLE
+
+    return clean_title(title)
+
+
+def clean_title(title: str) -> str:
+    if not title:
+        return NO_TITLE
+
+    for pattern, replacement in TITLE_PATTERNS:
+        title = pattern.sub(replacement, title)
+    title = title.strip(' -–—|')
+
+    return title or NO_TITLE
+
+
+def extract_content(root, strategy: str = None) -> tuple:
+    etree.strip_elements(root, *NOISE_TAGS, with_tail=False)
+
+    if strategy:
+        content_text = _extract_by_strategy(root, strategy)
+        if len(content_text) >= MIN_CONTENT_LENGTH:
+            return content_text, strategy
+
+    best, paragraphs = _find_main_block(root)
+
+    content_text = ""
+    if best is not None:
+        content_text = _join_paragraphs(best, paragraphs)
+
+    if len(content_text) < MIN_CONTENT_LENGTH:
+        # Отсев шума по классам срезал саму статью - пробуем без него
+        best, paragraphs = _find_main_block(root, prune=False)
+        if best is not None:
+            content_text = _join_paragraphs(best, paragraphs)
+
+    if len(content_text) < MIN_CONTENT_LENGTH:
+        return _join_paragraphs(root, paragraphs) or NO_CONTENT, None
+
+    return content_text, strategy_for(best)
+
+
+def strategy_for(element) -> str:
+    # XPath, который найдет такой же контейнер на других страницах того же сайта.
+    # id и классы с цифрами обычно уникальны для статьи (post-12345) - их не берем.
+    # Общие классы (container, wrapper) первым находят меню или шапку, поэтому класс
+    # годится, только если похож на контейнер статьи и встречается на странице один раз
+    tag = element.tag
+    candidates = []
+
+    if element.get('itemprop') == 'articleBody':
+        candidates.append(('//*[@itemprop="articleBody"]', False))
+
+    element_id = element.get('id', '')
+    if element_id and not DIGITS.search(element_id) and '"' not in element_id:
+        candidates.append((f'//{tag}[@id="{element_id}"]', False))
+
+    if tag in ARTICLE_TAGS:
+        candidates.append((f'//{tag}', False))
+
+    for css_class in element.get('class', '').split():
+        if not DIGITS.search(css_class) and '"' not in css_class and POSITIVE_HINTS.search(css_class):
+            xpath = f'//{tag}[contains(concat(" ", normalize-space(@class), " "), " {css_class} ")]'
+            candidates.append((xpath, True))
+
+    root = element.getroottree().getroot()
+    for xpath, unique in candidates:
+        found = root.xpath(xpath)
+        # Сохраняем, только если XPath первым находит именно этот контейнер
+        if found and found[0] is element and (not unique or len(found) == 1):
+            return xpath
+
+    return None
+
+
+def _extract_by_strategy(root, strategy: str) -> str:
+    try:
+        found = root.xpath(strategy)
+    except etree.XPathError:
+        return ""
+    if not found or not isinstance(found[0], etree.ElementBase):
+        return ""
+
+    # Та же оценка абзацев, что и при полном проходе, но только внутри контейнера:
+    # комментарии и "читайте также" внутри него отбрасываются так же
+    block = found[0]
+    _, paragraphs = _find_main_block(block)
+    return _join_paragraphs(block, paragraphs)
+
+
+def _find_main_block(root, prune: bool = True):
+    # Один обход дерева в post-order: для каждого узла считаем длину всего текста,
+    # текста ссылок и текста абзацев, а по ним - оценку узла как контейнера статьи
+    stats = {}
+    paragraphs = {}
+    best = None
+    best_score = 0.0
+    best_len = 0
+
+    stack = [(root, False)]
+    while stack:
+        element, visited = stack.pop()
+
+        if not visited:
+            stack.append((element, True))
+            stack.extend((child, False) for child in reversed(element) if isinstance(child.tag, str))
+            continue
+
+        text_len = len(element.text.strip()) if element.text else 0
+        link_len = 0
+        para_len = 0
+        para_link_len = 0
+
+        for child in element:
+            if child.tail:
+                text_len += len(child.tail.strip())
+            child_stats = stats.get(child)
+            if child_stats is None:
+                continue
+            text_len += child_stats[0]
+            link_len += child_stats[1]
+            para_len += child_stats[2]
+            para_link_len += child_stats[3]
+
+        tag = element.tag
+        if tag == 'a':
+            link_len = text_len
+
+        if tag in TEXT_TAGS and para_len == 0 and text_len:
+            # Абзац без вложенных абзацев: li с <p> внутри не считаем дважды
+            paragraphs[element] = link_len / text_len
+            para_len = text_len
+            para_link_len = link_len
+
+        hints = f"{element.get('class', '')} {element.get('id', '')}"
+        if prune and para_len and NEGATIVE_HINTS.search(hints) and _is_noise(element, text_len, link_len,
+                                                                             para_len - para_link_len,
+                                                                             best, best_len):
+            # Комментарии, "читайте также" и т.п. - это шум, а не текст статьи
+            para_len = 0
+            para_link_len = 0
+            for paragraph in element.iter(*TEXT_TAGS):
+                paragraphs.pop(paragraph, None)
+
+        stats[element] = (text_len, link_len, para_len, para_link_len)
+
+        clean_len = para_len - para_link_len
+        if clean_len <= 0 or tag in TEXT_TAGS:
+            continue
+
+        weight = 1.0
+        if tag in ARTICLE_TAGS or element.get('itemprop') == 'articleBody':
+            weight = 1.5
+        elif POSITIVE_HINTS.search(hints):
+            weight = 1.2
+
+        density = para_len / text_len
+        link_density = link_len / text_len
+        score = clean_len * (1 - link_density) * density ** 0.5 * weight
+
+        # Строгое сравнение: при равной оценке остается более глубокий узел
+        if score > best_score:
+            best = element
+            best_score = score
+            best_len = clean_len
+
+    return best, paragraphs
+
+
+def _is_noise(element, text_len: int, link_len: int, clean_len: int, best, best_len: int) -> bool:
+    # Блок с "шумным" классом, который оборачивает лучший найденный контейнер и держит
+    # большую часть своего текста в нем, - обертка страницы (id="main-menu-wrapper"
+    # class="has-comments"), а не комментарии. Ссылочный блок - шум в любом случае
+    if element.tag in ARTICLE_TAGS or element.tag in PAGE_TAGS:
+        return False
+    if link_len * 2 > text_len:
+        return True
+    if best is None or best_len * 2 < clean_len:
+        return True
+    return not any(ancestor is element for ancestor in best.iterancestors())
+
+
+def _join_paragraphs(block, paragraphs: dict) -> str:
+    texts = []
+    for element in block.iter(*TEXT_TAGS):
+        link_density = paragraphs.get(element)
+        if link_density is None or link_density > 0.5:
+            continue
+        text = ' '.join(element.text_content().split())
+        if text:
+            texts.append(text)
+    return '\n\n'.join(texts)
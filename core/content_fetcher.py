@@ -1,118 +1,294 @@
 import aiohttp
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlparse, urljoin
 import asyncio
-import re
+
+from config.settings import (FETCH_TIMEOUT, FETCH_MAX_CONNECTIONS, FETCH_MAX_CONNECTIONS_PER_HOST,
+                             FETCH_DNS_CACHE_TTL, FETCH_KEEPALIVE_TIMEOUT, FETCH_MAX_BYTES, FETCH_CONCURRENCY,
+                             FETCH_PER_DOMAIN_CONCURRENCY, PARSER_WORKERS, HTTP_CACHE_ENABLED, JS_RENDER_ENABLED)
+from core.article_extractor import extract_article, MIN_CONTENT_LENGTH
+from core.http_cache import HttpCache
+from core.js_renderer import JsRenderer
+from core.url_canonicalizer import canonicalize_url, is_plausible_canonical
+from database.db import get_db, get_domain_profiles, save_domain_profile
+import logging
+
+logger = logging.getLogger(__name__)
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+CHUNK_SIZE = 64 * 1024
 
 
 class ContentFetcher:
 
-    def __init__(self):
+    def __init__(self, parser_workers: int = PARSER_WORKERS, cache: HttpCache = None,
+                 renderer: JsRenderer = None):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
+        self._session = None
+        self._domain_limits = {}
+        # parser_workers=0 - разбор HTML прямо в event loop (удобно для тестов)
+        self.parser_workers = parser_workers
+        self._executor = None
+        # domain -> XPath контейнера, который последним дал годный текст
+        self._profiles = None
+        # Домены, где текст статьи появляется только после выполнения JavaScript
+        self._js_domains = set()
+        self.cache = cache if cache is not None else (HttpCache() if HTTP_CACHE_ENABLED else None)
+        if renderer is None and JS_RENDER_ENABLED:
+            renderer = JsRenderer(user_agent=self.headers['User-Agent'])
+        self.renderer = renderer
 
-    async def fetch_article(self, url: str) -> dict:
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # Одна сессия на процесс: keep-alive, кэш DNS и лимиты соединений общие для всех запросов
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=FETCH_MAX_CONNECTIONS,
+                limit_per_host=FETCH_MAX_CONNECTIONS_PER_HOST,
+                ttl_dns_cache=FETCH_DNS_CACHE_TTL,
+                keepalive_timeout=FETCH_KEEPALIVE_TIMEOUT
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=FETCH_TIMEOUT)
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+        if self.cache is not None:
+            self.cache.close()
+
+        if self.renderer is not None:
+            await self.renderer.close()
+
+    def _load_profiles(self):
+        if self._profiles is not None:
+            return
+
+        self._profiles = {}
+        db = get_db()
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=self.headers, timeout=30) as response:
-                    if response.status != 200:
-                        raise Exception(f"HTTP {response.status}")
+            for profile in get_domain_profiles(db):
+                self._profiles[profile.domain] = profile.strategy
+                if profile.needs_js:
+                    self._js_domains.add(profile.domain)
+        except Exception as e:
+            logger.warning(f"Не удалось загрузить профили доменов: {e}")
+        finally:
+            db.close()
 
-                    html = await response.text()
+    def _domain_strategy(self, domain: str) -> str:
+        self._load_profiles()
+        return self._profiles.get(domain)
 
-            soup = BeautifulSoup(html, 'lxml')
-            domain = urlparse(url).netloc
-            title = self._extract_title(soup)
-            content = self._extract_content(soup)
+    def _needs_js(self, domain: str) -> bool:
+        self._load_profiles()
+        return domain in self._js_domains
 
-            return {
-                'title': title,
-                'content': content,
-                'url': url,
-                'domain': domain
-            }
+    def _remember_strategy(self, domain: str, strategy: str):
+        if self._profiles.get(domain) == strategy:
+            return
+
+        self._profiles[domain] = strategy
+        self._save_profile(domain, strategy)
 
+    def _remember_needs_js(self, domain: str, strategy: str):
+        self._js_domains.add(domain)
+        self._profiles[domain] = strategy
+        logger.info(f"Домен {domain} отмечен как требующий JS-рендера")
+        self._save_profile(domain, strategy, needs_js=True)
+
+    def _save_profile(self, domain: str, strategy: str, needs_js: bool = None):
+        db = get_db()
+        try:
+            save_domain_profile(db, domain, strategy, needs_js)
         except Exception as e:
-            raise Exception(f"Ошибка при загрузке статьи: {str(e)}")
+            logger.warning(f"Не удалось сохранить профиль домена {domain}: {e}")
+        finally:
+            db.close()
+
+    async def _render(self, url: str, domain: str, strategy: str = None) -> dict:
+        renderer = self.renderer
+        try:
+            await renderer.start()
+        except Exception as e:
+            # Нет playwright или браузера - дальше работаем только со статикой
+            logger.warning(f"JS-рендер недоступен: {e}")
+            self.renderer = None
+            return None
+
+        try:
+            async with self._domain_limit(domain):
+                html = await renderer.render(url)
+        except Exception as e:
+            logger.warning(f"Не удалось отрендерить {url}: {e}")
+            return None
 
-    def _extract_title(self, soup: BeautifulSoup) -> str:
-        title = None
+        return await self._parse(html, 'utf-8', strategy)
 
-        og_title = soup.find('meta', property='og:title')
-        if og_title and og_title.get('content'):
-            title = og_title['content']
+    async def _parse(self, html: bytes, encoding: str = None, strategy: str = None) -> dict:
+        if self.parser_workers <= 0:
+            return extract_article(html, encoding, strategy)
 
-        if not title and soup.title:
-            title = soup.title.string
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.parser_workers)
 
-        if not title:
-            h1 = soup.find('h1')
-            if h1:
-                title = h1.get_text(strip=True)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, extract_article, html, encoding, strategy)
+        except BrokenProcessPool:
+            # Упавший воркер ломает весь пул - пересоздадим его при следующем вызове
+            self._executor = None
+            raise
+
+    def _domain_limit(self, domain: str) -> asyncio.Semaphore:
+        semaphore = self._domain_limits.get(domain)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(FETCH_PER_DOMAIN_CONCURRENCY)
+            self._domain_limits[domain] = semaphore
+        return semaphore
+
+    async def _download(self, url: str, domain: str) -> tuple:
+        cached = await self.cache.get(url) if self.cache is not None else None
+        if cached and cached['fresh']:
+            return cached['body'], cached['encoding']
+
+        headers = {}
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        async with self._domain_limit(domain):
+            async with self.session.get(url, headers=headers) as response:
+                if response.status == 304 and cached:
+                    await self.cache.touch(url)
+                    return cached['body'], cached['encoding']
+
+                if response.status != 200:
+                    raise Exception(f"HTTP {response.status}")
+
+                html = await self._read_html(response)
+                encoding = response.charset
+
+                if self.cache is not None:
+                    await self.cache.put(url, html, encoding,
+                                         etag=response.headers.get('ETag'),
+                                         last_modified=response.headers.get('Last-Modified'))
+
+        return html, encoding
+
+    async def _read_html(self, response: aiohttp.ClientResponse) -> bytes:
+        # Проверяем заголовки до чтения тела: PDF, видео и огромные страницы не скачиваем
+        if 'Content-Type' in response.headers and response.content_type not in HTML_CONTENT_TYPES:
+            raise Exception(f"Ссылка ведет не на HTML-страницу ({response.content_type})")
+
+        if response.content_length and response.content_length > FETCH_MAX_BYTES:
+            raise Exception(f"Страница слишком большая ({response.content_length // 1024} КБ)")
+
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+            size += len(chunk)
+            if size > FETCH_MAX_BYTES:
+                raise Exception(f"Страница больше {FETCH_MAX_BYTES // 1024} КБ")
+            chunks.append(chunk)
+
+        return b''.join(chunks)
 
-        if not title:
-            return "Без заголовка"
+    async def fetch_article(self, url: str) -> dict:
+        try:
+            domain = urlparse(url).netloc
 
-        title = self._clean_title(title)
-        return title
+            strategy = self._domain_strategy(domain)
+            needs_js = self.renderer is not None and self._needs_js(domain)
 
-    def _clean_title(self, title: str) -> str:
-        if not title:
-            return "Без заголовка"
+            extracted = None
+            if needs_js:
+                extracted = await self._render(url, domain, strategy)
 
-        title = re.sub(r'\(@\w+\)', '', title)
-        title = re.sub(r'@\w+', '', title)
-        title = re.sub(r'\s*[—–-]\s*(Блог на|на)\s+[\w\.]+\s*$', '', title, flags=re.IGNORECASE)
-        title = re.sub(r'\s*[|\-–—]\s*(Новости|Статьи|Блог|Blog|News).*$', '', title, flags=re.IGNORECASE)
-        title = re.sub(r'\s+', ' ', title)
-        title = re.sub(r'\(\s*\)', '', title)
-        title = title.strip(' -–—|')
+            if extracted is None:
+                html, encoding = await self._download(url, domain)
+                extracted = await self._parse(html, encoding, strategy)
 
-        return title or "Без заголовка"
+                # Пустая SPA-оболочка: пробуем браузер и запоминаем домен, если это помогло
+                if self.renderer is not None and not needs_js and len(extracted['content']) < MIN_CONTENT_LENGTH:
+                    rendered = await self._render(url, domain, strategy)
+                    if rendered and len(rendered['content']) >= MIN_CONTENT_LENGTH:
+                        extracted = rendered
+                        self._remember_needs_js(domain, rendered['strategy'])
 
-    def _extract_content(self, soup: BeautifulSoup) -> str:
-        for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside']):
-            element.decompose()
+            if extracted['strategy']:
+                self._remember_strategy(domain, extracted['strategy'])
 
-        content_selectors = [
-            'article',
-            '[itemprop="articleBody"]',
-            '.article-content',
-            '.post-content',
-            '.entry-content',
-            'main'
-        ]
+            canonical_url = url
+            if extracted['canonical_url']:
+                candidate = urljoin(url, extracted['canonical_url'])
+                if is_plausible_canonical(candidate, url):
+                    canonical_url = candidate
 
-        content_text = ""
+            return {
+                'title': extracted['title'],
+                'content': extracted['content'],
+                'url': url,
+                'canonical_url': canonicalize_url(canonical_url),
+                'fingerprint': extracted['fingerprint'],
+                'domain': domain
+            }
 
-        for selector in content_selectors:
-            content_block = soup.select_one(selector)
-            if content_block:
-                paragraphs = content_block.find_all(['p', 'h2', 'h3', 'li'])
-                content_text = '\n\n'.join([p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)])
-                if len(content_text) > 200:
-                    break
+        except Exception as e:
+            raise Exception(f"Ошибка при загрузке статьи: {str(e)}")
+
+    async def fetch_articles(self, urls: list, concurrency: int = FETCH_CONCURRENCY):
+        # Отдает результаты по мере готовности, а не после загрузки всех ссылок
+        semaphore = asyncio.Semaphore(concurrency)
 
-        if len(content_text) < 200:
-            paragraphs = soup.find_all('p')
-            content_text = '\n\n'.join([p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)])
+        async def fetch_one(url: str) -> dict:
+            async with semaphore:
+                try:
+                    article = await self.fetch_article(url)
+                    return {'success': True, 'url': url, 'article': article}
+                except Exception as e:
+                    return {'error': True, 'url': url, 'message': str(e)}
 
-        return content_text or "Не удалось извлечь контент"
+        tasks = [asyncio.create_task(fetch_one(url)) for url in dict.fromkeys(urls)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
 
     async def test_url(self, url: str) -> bool:
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.head(url, headers=self.headers, timeout=10) as response:
-                    return response.status == 200
+            async with self.session.head(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                return response.status == 200
         except:
             return False
 
 
+content_fetcher = ContentFetcher()
+
+
 async def main():
-    fetcher = ContentFetcher()
-    article = await fetcher.fetch_article("https://example.com/article")
-    print(article)
+    try:
+        article = await content_fetcher.fetch_article("https://example.com/article")
+        print(article)
+    finally:
+        await content_fetcher.close()
 
 
 if __name__ == "__main__":
@@ -1,27 +1,121 @@
-from core.content_fetcher import ContentFetcher
+from core.content_fetcher import content_fetcher
 from core.universal_ai_analyzer import UniversalAIAnalyzer
-from database.db import (create_article, create_post, get_article_by_url,
-                         get_user_settings, get_db)
-from database.models import SentimentType
+from core.json_extract import StreamingJSONParser
+from core.url_canonicalizer import canonicalize_url, url_hash
+from core.fingerprint import duplicate_index
+from core.schedule_planner import plan_schedule
+from database.db import (create_article, create_post, get_article_by_url, get_article_by_canonical_hash,
+                         get_user_settings, get_db, get_posts_by_article, get_recent_fingerprints,
+                         get_schedule_load)
+from database.models import SentimentType, Article
+from config.settings import PROCESS_CONCURRENCY, FUSED_PIPELINE, SCHEDULE_MODE, SCHEDULE_HORIZON_DAYS
 from datetime import datetime, timedelta
+import asyncio
 import json
 
 
+class PipelineProgress:
+    # Состояние для on_progress из process_article_url: переводит накопленный
+    # текст JSON-ответа модели в краткое содержание и посты, пока ответ еще пишется
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.state = {'stage': None, 'title': None, 'summary': None, 'posts': {}}
+
+    async def update(self, **changes):
+        if self.callback is None:
+            return
+        posts = changes.pop('posts', None)
+        self.state.update(changes)
+        if posts:
+            self.state['posts'].update(posts)
+        await self.callback(self.state)
+
+    @staticmethod
+    def _field(value, *path) -> str:
+        for key in path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value if isinstance(value, str) and value else None
+
+    def watch_analysis(self):
+        # None - стриминг не нужен, генерация идет обычным запросом
+        if self.callback is None:
+            return None
+        parser = StreamingJSONParser()
+
+        async def on_text(text: str):
+            summary = self._field(parser.update(text), 'summary')
+            if summary:
+                await self.update(summary=summary)
+        return on_text
+
+    def watch_posts(self, platforms: list):
+        if self.callback is None:
+            return None
+        parser = StreamingJSONParser()
+
+        async def on_text(text: str):
+            value = parser.update(text)
+            posts = {platform: self._field(value, platform, 'content') for platform in platforms}
+            await self.update(posts={platform: post for platform, post in posts.items() if post})
+        return on_text
+
+    def watch_fused(self, platforms: list):
+        if self.callback is None:
+            return None
+        parser = StreamingJSONParser()
+
+        async def on_text(text: str):
+            value = parser.update(text)
+            posts = {platform: self._field(value, 'posts', platform, 'content') for platform in platforms}
+            posts = {platform: post for platform, post in posts.items() if post}
+            summary = self._field(value, 'summary')
+            if posts:
+                await self.update(stage='posts', summary=summary, posts=posts)
+            elif summary:
+                await self.update(summary=summary)
+        return on_text
+
+
+def unique_article_urls(urls: list) -> list:
+    # Варианты одной ссылки (utm-метки, m.-версия) обрабатываем один раз
+    unique_urls = {}
+    for url in urls:
+        unique_urls.setdefault(canonicalize_url(url), url)
+    return list(unique_urls.values())
+
+
 class ContentGenerator:
 
-    def __init__(self):
-        self.fetcher = ContentFetcher()
+    def __init__(self, fused: bool = FUSED_PIPELINE, schedule_mode: str = SCHEDULE_MODE):
+        self.fetcher = content_fetcher
         self.analyzer = UniversalAIAnalyzer()
+        self.fused = fused
+        # local - расписание по правилам без запросов к модели, llm - спрашиваем модель
+        self.schedule_mode = schedule_mode
 
-    async def process_article_url(self, url: str, user_id: int, platforms: list = None) -> dict:
+    async def process_article_url(self, url: str, user_id: int, platforms: list = None,
+                                  on_duplicate: str = 'ask', on_progress=None) -> dict:
+        # on_duplicate - что делать с перепечаткой уже обработанной статьи:
+        # 'ask' - вернуть near_duplicate, чтобы бот спросил пользователя,
+        # 'reuse' - взять готовый анализ и посты, 'process' - обработать заново.
+        # on_progress(state) - async-функция: этап, заголовок, краткое содержание и посты,
+        # пока модель их пишет (state - один и тот же dict, дополняемый по ходу)
 
         db = get_db()
+        progress = PipelineProgress(on_progress)
 
         try:
-            existing = get_article_by_url(db, url)
+            # utm-метки, m./amp-версии и т.п. отсекаем до сети и AI
+            canonical_hash = url_hash(url)
+            existing = get_article_by_canonical_hash(db, canonical_hash) or get_article_by_url(db, url)
             if existing:
+                db.close()
                 return {
                     'error': True,
+                    'already_processed': True,
                     'message': 'Эта статья уже была обработана ранее'
                 }
 
@@ -40,14 +134,69 @@ class ContentGenerator:
                 platforms = ['telegram', 'vk', 'linkedin']
 
             print(f"📥 Загружаю статью: {url}")
+            await progress.update(stage='fetch')
             article_data = await self.fetcher.fetch_article(url)
+            await progress.update(stage='analysis', title=article_data['title'])
 
-            print(f"🤖 Анализирую контент...")
-            analysis = await self.analyzer.analyze_article(
-                title=article_data['title'],
-                content=article_data['content'],
-                brand_info=brand_info
-            )
+            # Страница может указать другой канонический адрес через <link rel="canonical">
+            page_hash = url_hash(article_data['canonical_url'])
+            if page_hash != canonical_hash:
+                if get_article_by_canonical_hash(db, page_hash):
+                    db.close()
+                    return {
+                        'error': True,
+                        'already_processed': True,
+                        'message': 'Эта статья уже была обработана ранее'
+                    }
+                canonical_hash = page_hash
+
+            auto_schedule_enabled = user_settings.auto_schedule if user_settings else True
+
+            fingerprint = article_data.get('fingerprint')
+            if on_duplicate != 'process':
+                duplicate = self._find_duplicate(db, fingerprint, user_id)
+                if duplicate and on_duplicate == 'reuse':
+                    print(f"♻️ Перепечатка статьи {duplicate['article'].id}, беру готовые посты")
+                    result = await self._reuse_article(
+                        db, url, canonical_hash, fingerprint, user_id, article_data,
+                        duplicate['article'], platforms, brand_info, auto_schedule_enabled
+                    )
+                    db.close()
+                    return result
+                if duplicate:
+                    source = duplicate['article']
+                    db.close()
+                    return {
+                        'near_duplicate': True,
+                        'duplicate_article_id': source.id,
+                        'duplicate_title': source.title,
+                        'similarity': duplicate['similarity']
+                    }
+
+            fused = None
+            if self.fused:
+                print(f"🤖 Анализирую контент и генерирую посты одним запросом...")
+                fused = await self.analyzer.analyze_and_generate(
+                    title=article_data['title'],
+                    content=article_data['content'],
+                    platforms=platforms,
+                    brand_info=brand_info,
+                    with_schedule=auto_schedule_enabled and self.schedule_mode == 'llm',
+                    on_text=progress.watch_fused(platforms)
+                )
+                if fused is None:
+                    print(f"⚠️ Ответ не прошел проверку, перехожу к пошаговой обработке")
+
+            if fused:
+                analysis = fused['analysis']
+            else:
+                print(f"🤖 Анализирую контент...")
+                analysis = await self.analyzer.analyze_article(
+                    title=article_data['title'],
+                    content=article_data['content'],
+                    brand_info=brand_info,
+                    on_text=progress.watch_analysis()
+                )
 
             sentiment_map = {
                 'positive': SentimentType.POSITIVE,
@@ -58,64 +207,43 @@ class ContentGenerator:
             article = create_article(
                 db=db,
                 url=url,
+                canonical_hash=canonical_hash,
+                content_simhash=fingerprint,
                 user_id=user_id,
                 title=article_data['title'],
                 content=article_data['content'],
                 summary=analysis['summary'],
                 sentiment=sentiment_map.get(analysis['sentiment'], SentimentType.NEUTRAL)
             )
+            duplicate_index.add(article.id, user_id, fingerprint)
 
-            print(f"✍️ Генерирую посты для платформ: {', '.join(platforms)}")
-            post_data = {
-                'title': article_data['title'],
-                'summary': analysis['summary'],
-                'sentiment': analysis['sentiment'],
-                'key_points': analysis['key_points']
-            }
-
-            posts = await self.analyzer.generate_posts(
-                article_data=post_data,
-                platforms=platforms,
-                brand_info=brand_info
+            posts = dict(fused['posts']) if fused else {}
+            missing = [platform for platform in platforms if platform not in posts]
+            await progress.update(
+                stage='posts' if missing else 'save',
+                summary=analysis['summary'],
+                posts={platform: post['content'] for platform, post in posts.items()}
             )
+            if missing:
+                print(f"✍️ Генерирую посты для платформ: {', '.join(missing)}")
+                post_data = {
+                    'title': article_data['title'],
+                    'summary': analysis['summary'],
+                    'sentiment': analysis['sentiment'],
+                    'key_points': analysis['key_points']
+                }
 
-            auto_schedule_enabled = user_settings.auto_schedule if user_settings else True
+                posts.update(await self.analyzer.generate_posts(
+                    article_data=post_data,
+                    platforms=missing,
+                    brand_info=brand_info,
+                    on_text=progress.watch_posts(missing)
+                ))
+                await progress.update(stage='save')
 
-            saved_posts = {}
-            for platform, post_content in posts.items():
-                scheduled_time = None
-                schedule_info = {}
-
-                if auto_schedule_enabled:
-                    print(f"📅 Автоматически планирую расписание для {platform}...")
-                    schedule = await self.analyzer.suggest_posting_schedule(
-                        posts={platform: post_content},
-                        sentiment=analysis['sentiment']
-                    )
-                    scheduled_time = self._parse_schedule_time(
-                        schedule.get(platform, {}).get('time_slot', 'сегодня 14:00')
-                    )
-                    schedule_info = schedule.get(platform, {})
-                else:
-                    print(f"📝 Автопланирование выключено, время публикации не установлено")
-
-                post = create_post(
-                    db=db,
-                    article_id=article.id,
-                    platform=platform,
-                    content=post_content.get('content', ''),
-                    hashtags=post_content.get('hashtags', ''),
-                    scheduled_time=scheduled_time
-                )
-
-                saved_posts[platform] = {
-                    'post_id': post.id,
-                    'content': post.content,
-                    'hashtags': post.hashtags,
-                    'scheduled': scheduled_time.strftime('%Y-%m-%d %H:%M') if scheduled_time else None,
-                    'schedule_info': schedule_info,
-                    'auto_scheduled': auto_schedule_enabled
-                }
+            saved_posts = await self._save_posts(db, article.id, user_id, posts, analysis['sentiment'],
+                                                 auto_schedule_enabled,
+                                                 schedule=fused['schedule'] if fused else None)
 
             article_id = article.id
             article_title = article.title
@@ -140,6 +268,148 @@ class ContentGenerator:
                 'message': f'Ошибка обработки: {str(e)}'
             }
 
+    async def _save_posts(self, db, article_id: int, user_id: int, posts: dict, sentiment: str,
+                          auto_schedule_enabled: bool, schedule: dict = None) -> dict:
+        # schedule - время, уже предложенное моделью вместе с постами
+        schedule = dict(schedule or {})
+
+        if auto_schedule_enabled and self.schedule_mode != 'llm':
+            now = datetime.now()
+            load = get_schedule_load(db, user_id, now, now + timedelta(days=SCHEDULE_HORIZON_DAYS + 1))
+            unplanned = [platform for platform in posts if platform not in schedule]
+            schedule.update(plan_schedule(unplanned, sentiment, load, now))
+
+        saved_posts = {}
+        for platform, post_content in posts.items():
+            scheduled_time = None
+            schedule_info = {}
+
+            if auto_schedule_enabled:
+                slot = schedule.get(platform)
+                if slot is None:
+                    print(f"📅 Автоматически планирую расписание для {platform}...")
+                    suggested = await self.analyzer.suggest_posting_schedule(
+                        posts={platform: post_content},
+                        sentiment=sentiment
+                    )
+                    slot = suggested.get(platform, {})
+                scheduled_time = slot.get('scheduled_time') or \
+                    self._parse_schedule_time(slot.get('time_slot', 'сегодня 14:00'))
+                schedule_info = {key: value for key, value in slot.items() if key != 'scheduled_time'}
+            else:
+                print(f"📝 Автопланирование выключено, время публикации не установлено")
+
+            post = create_post(
+                db=db,
+                article_id=article_id,
+                platform=platform,
+                content=post_content.get('content', ''),
+                hashtags=post_content.get('hashtags', ''),
+                scheduled_time=scheduled_time
+            )
+
+            saved_posts[platform] = {
+                'post_id': post.id,
+                'content': post.content,
+                'hashtags': post.hashtags,
+                'scheduled': scheduled_time.strftime('%Y-%m-%d %H:%M') if scheduled_time else None,
+                'schedule_info': schedule_info,
+                'auto_scheduled': auto_schedule_enabled
+            }
+
+        return saved_posts
+
+    def _find_duplicate(self, db, fingerprint: str, user_id: int) -> dict:
+        if not fingerprint:
+            return None
+
+        if not duplicate_index.loaded:
+            duplicate_index.load(get_recent_fingerprints(db, duplicate_index.capacity))
+
+        match = duplicate_index.find(fingerprint, user_id)
+        if not match:
+            return None
+
+        source = db.get(Article, match['article_id'])
+        if source is None:
+            duplicate_index.remove(match['article_id'])
+            return None
+
+        return {'article': source, 'similarity': match['similarity']}
+
+    async def _reuse_article(self, db, url: str, canonical_hash: str, fingerprint: str, user_id: int,
+                             article_data: dict, source: Article, platforms: list, brand_info: dict,
+                             auto_schedule_enabled: bool) -> dict:
+        sentiment = source.sentiment.value if source.sentiment else 'neutral'
+
+        article = create_article(
+            db=db,
+            url=url,
+            canonical_hash=canonical_hash,
+            content_simhash=fingerprint,
+            user_id=user_id,
+            title=article_data['title'],
+            content=article_data['content'],
+            summary=source.summary,
+            sentiment=source.sentiment
+        )
+        duplicate_index.add(article.id, user_id, fingerprint)
+
+        source_posts = {
+            post.platform: {'content': post.content, 'hashtags': post.hashtags}
+            for post in get_posts_by_article(db, source.id)
+        }
+        posts = {platform: source_posts[platform] for platform in platforms if platform in source_posts}
+
+        # Для платформ, которых не было у исходной статьи, генерируем посты по готовому анализу
+        missing = [platform for platform in platforms if platform not in posts]
+        if missing:
+            print(f"✍️ Генерирую посты для платформ: {', '.join(missing)}")
+            posts.update(await self.analyzer.generate_posts(
+                article_data={
+                    'title': article_data['title'],
+                    'summary': source.summary,
+                    'sentiment': sentiment,
+                    'key_points': []
+                },
+                platforms=missing,
+                brand_info=brand_info
+            ))
+
+        saved_posts = await self._save_posts(db, article.id, user_id, posts, sentiment, auto_schedule_enabled)
+
+        return {
+            'success': True,
+            'article_id': article.id,
+            'title': article.title,
+            'summary': source.summary,
+            'sentiment': sentiment,
+            'relevance_score': 5,
+            'posts': saved_posts,
+            'total_posts': len(saved_posts),
+            'reused_from': source.id
+        }
+
+    async def process_article_urls(self, urls: list, user_id: int, platforms: list = None,
+                                   concurrency: int = PROCESS_CONCURRENCY):
+        # Пакетная обработка: загрузка ограничена по доменам в ContentFetcher,
+        # здесь ограничиваем число статей, одновременно проходящих через AI
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def process_one(url: str) -> dict:
+            async with semaphore:
+                result = await self.process_article_url(url, user_id, platforms, on_duplicate='reuse')
+                result['url'] = url
+                return result
+
+        tasks = [asyncio.create_task(process_one(url)) for url in unique_article_urls(urls)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
     def _parse_schedule_time(self, time_slot: str) -> datetime:
         now = datetime.now()
 
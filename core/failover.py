@@ -0,0 +1,185 @@
+from collections import deque
+import asyncio
+import logging
+import time
+
+from config.settings import (AI_HEDGING, AI_HEDGE_DEFAULT_DELAY, AI_HEDGE_MIN_DELAY, AI_CIRCUIT_FAILURES,
+                             AI_CIRCUIT_COOLDOWN)
+from core.rate_limiter import is_retryable, error_status
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 100
+# Пока замеров меньше, p95 ненадежен - используем AI_HEDGE_DEFAULT_DELAY
+MIN_LATENCY_SAMPLES = 10
+
+
+def is_provider_failure(error: Exception) -> bool:
+    # В счетчик ошибок подряд идут только сбои провайдера: 5xx, 429, таймауты, обрывы.
+    # 400/401/404 - ошибка самого запроса, провайдер из-за нее не отключаем
+    status = error_status(error)
+    return is_retryable(error) or (status is not None and status >= 500)
+
+
+class ProviderHealth:
+    # Скользящие окна задержек и счетчик ошибок подряд.
+    # После AI_CIRCUIT_FAILURES ошибок подряд провайдер пропускается AI_CIRCUIT_COOLDOWN секунд.
+    # Задержка - одна попытка от отправки запроса до ответа, без очереди ProviderLimiter и пауз
+    # между повторами (record_latency вызывает тот, кто отправляет запрос). Для потоков -
+    # отдельное окно времени до первого куска: длительность всего потока с ответом не сравнима
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.stream_latencies = deque(maxlen=LATENCY_WINDOW)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.successes = 0
+        self.failures = 0
+        self.hedged = 0
+        self.cancelled = 0
+
+    def available(self) -> bool:
+        return time.monotonic() >= self.open_until
+
+    def record_latency(self, latency: float, streaming: bool = False):
+        (self.stream_latencies if streaming else self.latencies).append(latency)
+
+    def record_success(self):
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def record_failure(self, error: Exception):
+        self.failures += 1
+        if not is_provider_failure(error):
+            return
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= AI_CIRCUIT_FAILURES:
+            self.open_until = time.monotonic() + AI_CIRCUIT_COOLDOWN
+            logger.warning(f"{self.name}: {self.consecutive_failures} ошибок подряд, "
+                           f"провайдер отключен на {AI_CIRCUIT_COOLDOWN} с")
+
+    def percentile(self, q: float, streaming: bool = False) -> float:
+        latencies = self.stream_latencies if streaming else self.latencies
+        if not latencies:
+            return None
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def hedge_delay(self) -> float:
+        # Сколько ждать ответа, прежде чем параллельно спросить следующего провайдера
+        if len(self.latencies) < MIN_LATENCY_SAMPLES:
+            return AI_HEDGE_DEFAULT_DELAY
+        return max(AI_HEDGE_MIN_DELAY, self.percentile(0.95))
+
+    def stats(self) -> dict:
+        return {
+            'available': self.available(),
+            'successes': self.successes,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'hedged': self.hedged,
+            'cancelled': self.cancelled,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'stream_ttft_p95': self.percentile(0.95, streaming=True)
+        }
+
+
+_health = {}
+
+
+def get_health(name: str) -> ProviderHealth:
+    health = _health.get(name)
+    if health is None:
+        health = ProviderHealth(name)
+        _health[name] = health
+    return health
+
+
+def health_stats() -> dict:
+    return {name: health.stats() for name, health in _health.items()}
+
+
+async def call_with_failover(targets: list, attempt, hedging: bool = AI_HEDGING):
+    # targets - провайдеры по приоритету (у каждого 'name'), attempt(target) - корутина запроса.
+    # Ошибка - сразу идем к следующему; нет ответа дольше p95 провайдера - параллельно
+    # спрашиваем следующего, берем первый успешный ответ, остальные запросы отменяем
+    healthy = [target for target in targets if get_health(target['name']).available()]
+    queue = deque(healthy or targets)
+
+    pending = {}
+    errors = []
+
+    def launch():
+        target = queue.popleft()
+        pending[asyncio.create_task(attempt(target))] = target
+        return target
+
+    last = launch()
+    try:
+        while pending:
+            timeout = get_health(last['name']).hedge_delay() if hedging and queue else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                get_health(last['name']).hedged += 1
+                logger.info(f"{last['name']} не ответил за {timeout:.1f} с, дублирую запрос")
+                last = launch()
+                continue
+
+            for task in done:
+                target = pending.pop(task)
+                health = get_health(target['name'])
+                error = task.exception()
+                if error is None:
+                    health.record_success()
+                    return task.result()
+
+                health.record_failure(error)
+                errors.append((target['name'], error))
+                logger.warning(f"Ошибка провайдера {target['name']}: {error}")
+
+            if not pending and queue:
+                last = launch()
+    finally:
+        for task, target in pending.items():
+            task.cancel()
+            get_health(target['name']).cancelled += 1
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    if len(errors) == 1:
+        raise errors[0][1]
+    raise Exception('; '.join(f"{name}: {error}" for name, error in errors))
+
+
+async def stream_with_failover(targets: list, open_stream):
+    # Потоковый вариант: open_stream(target) - async-генератор кусков текста.
+    # Без дублирования - два потока одновременно пользователю не покажешь;
+    # к следующему провайдеру переходим, только если текущий не прислал ни одного куска
+    healthy = [target for target in targets if get_health(target['name']).available()]
+    errors = []
+
+    for target in healthy or targets:
+        health = get_health(target['name'])
+        received = False
+        try:
+            async for chunk in open_stream(target):
+                received = True
+                yield chunk
+        except Exception as e:
+            health.record_failure(e)
+            if received:
+                raise
+            errors.append((target['name'], e))
+            logger.warning(f"Ошибка провайдера {target['name']}: {e}")
+            continue
+
+        health.record_success()
+        return
+
+    if len(errors) == 1:
+        raise errors[0][1]
+    raise Exception('; '.join(f"{name}: {error}" for name, error in errors))
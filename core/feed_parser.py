@@ -0,0 +1,124 @@
+from lxml import etree
+
+# RSS 2.0 (<item>), RSS 1.0/RDF (<item rdf:about>) и Atom (<entry>).
+# Разбор потоковый: документ подается кусками, записи отдаются по мере закрытия
+# тегов и сразу удаляются из дерева, так что большая лента не держится в памяти целиком
+
+ENTRY_TAGS = frozenset(('item', 'entry'))
+FEED_TAGS = frozenset(('channel', 'feed'))
+# Корневой элемент ленты: RSS 2.0, Atom, RSS 1.0
+ROOT_TAGS = frozenset(('rss', 'feed', 'RDF'))
+RDF_ABOUT = '{http://www.w3.org/1999/02/22-rdf-syntax-ns#}about'
+
+
+class NotAFeedError(ValueError):
+    # Документ - не RSS/Atom (обычно HTML-страница сайта вместо адреса ленты)
+    pass
+
+
+def _local(tag) -> str:
+    return etree.QName(tag).localname if isinstance(tag, str) else ''
+
+
+def _child_text(element, name: str) -> str:
+    for child in element:
+        if _local(child.tag) == name and child.text and child.text.strip():
+            return child.text.strip()
+    return None
+
+
+def _entry_link(element) -> str:
+    fallback = None
+    for child in element:
+        if _local(child.tag) != 'link':
+            continue
+        # Atom: <link rel="alternate" href="..."/>, RSS: <link>...</link>
+        href = child.get('href')
+        if href:
+            rel = child.get('rel', 'alternate')
+            if rel == 'alternate':
+                return href.strip()
+            fallback = fallback or href.strip()
+        elif child.text and child.text.strip():
+            return child.text.strip()
+    return fallback
+
+
+def parse_entry(element) -> dict:
+    link = _entry_link(element) or element.get(RDF_ABOUT)
+    guid = _child_text(element, 'guid') or _child_text(element, 'id') or link
+    if not link and guid and guid.startswith(('http://', 'https://')):
+        link = guid
+    if not link:
+        return None
+
+    return {
+        'guid': guid[:500],
+        'url': link,
+        'title': _child_text(element, 'title'),
+        'published': (_child_text(element, 'pubDate') or _child_text(element, 'published')
+                      or _child_text(element, 'updated') or _child_text(element, 'date'))
+    }
+
+
+class FeedParser:
+
+    def __init__(self):
+        self.title = None
+        self.root = None
+        self._parser = etree.XMLPullParser(events=('end',), recover=True, resolve_entities=False,
+                                           no_network=True, huge_tree=False)
+
+    def feed(self, chunk: bytes) -> list:
+        self._parser.feed(chunk)
+        return self._read_events()
+
+    def close(self) -> list:
+        try:
+            self._parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        return self._read_events()
+
+    def _read_events(self) -> list:
+        entries = []
+        for _, element in self._parser.read_events():
+            name = _local(element.tag)
+            if self.root is None:
+                self.root = _local(element.getroottree().getroot().tag)
+
+            if name in ENTRY_TAGS:
+                entry = parse_entry(element)
+                if entry:
+                    entries.append(entry)
+                # Уже разобранные записи и всё, что шло до них, больше не нужны
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+
+            elif name == 'title' and self.title is None:
+                parent = element.getparent()
+                if parent is not None and _local(parent.tag) in FEED_TAGS and element.text:
+                    self.title = element.text.strip()[:500] or None
+
+        return entries
+
+
+def parse_feed(chunks) -> tuple:
+    # NotAFeedError - корень документа не rss/feed/RDF; HTML отсекается на первых кусках
+    parser = FeedParser()
+    entries = []
+    for chunk in chunks:
+        entries.extend(parser.feed(chunk))
+        if parser.root is not None:
+            _check_root(parser.root)
+    entries.extend(parser.close())
+    _check_root(parser.root)
+    return parser.title, entries
+
+
+def _check_root(root: str):
+    if root is None:
+        raise NotAFeedError("пустой документ или не XML")
+    if root not in ROOT_TAGS:
+        raise NotAFeedError(f"корневой элемент <{root}>, а не rss или feed")
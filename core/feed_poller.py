@@ -0,0 +1,295 @@
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import logging
+
+from config.settings import (FEED_MIN_INTERVAL, FEED_MAX_INTERVAL, FEED_DEFAULT_INTERVAL, FEED_TICK_SECONDS,
+                             FEED_POLL_CONCURRENCY, FEED_QUEUE_SIZE, FEED_WORKERS, FEED_INITIAL_ITEMS,
+                             FEED_MAX_ATTEMPTS, FETCH_MAX_BYTES)
+from core.content_fetcher import content_fetcher, CHUNK_SIZE
+from core.feed_parser import parse_feed, NotAFeedError
+from core.url_canonicalizer import url_hash
+from database.db import get_db, get_due_feeds, feed_entry_seen, create_feed_entry, create_feed_entries
+from database.models import Feed
+
+logger = logging.getLogger(__name__)
+
+
+class FeedPoller:
+    # Опрос RSS/Atom-лент по расписанию с условными запросами (ETag/Last-Modified).
+    # Интервал у каждой ленты свой: сокращается, когда появляются новые записи,
+    # и растет, когда лента молчит или отвечает ошибками.
+    # Новые статьи уходят в ContentGenerator через ограниченную очередь - если
+    # обработка не успевает, опрос лент ждет, а не копит задачи в памяти.
+    # Запись отмечается прочитанной после успешной обработки статьи или если статью уже
+    # обработали (в том числе для другого пользователя). Упавшая обработка повторится при
+    # следующем обновлении ленты, но не больше FEED_MAX_ATTEMPTS раз.
+    # Разбор XML и работа с базой идут в потоках (asyncio.to_thread), event loop занят только сетью
+
+    def __init__(self, fetcher=content_fetcher, generator=None):
+        self.fetcher = fetcher
+        self.generator = generator
+        self.scheduler = AsyncIOScheduler()
+        self.queue = None
+        self._workers = []
+        self._poll_limit = None
+        self._polling = set()
+        # (user_id, canonical_hash) записей, которые в очереди или в обработке
+        self._pending = set()
+        # (feed_id, canonical_hash) -> число неудачных попыток
+        self._attempts = {}
+
+    def start(self):
+        if self.generator is None:
+            from core.content_generator import ContentGenerator
+            self.generator = ContentGenerator()
+
+        self.queue = asyncio.Queue(maxsize=FEED_QUEUE_SIZE)
+        self._poll_limit = asyncio.Semaphore(FEED_POLL_CONCURRENCY)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(FEED_WORKERS)]
+
+        self.scheduler.add_job(
+            self.poll_due_feeds,
+            'interval',
+            seconds=FEED_TICK_SECONDS,
+            id='poll_feeds',
+            max_instances=1,
+            next_run_time=datetime.now()
+        )
+        self.scheduler.start()
+        logger.info("✅ Опрос RSS-лент запущен")
+
+    async def stop(self):
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Опрос RSS-лент остановлен")
+
+    async def poll_due_feeds(self):
+        try:
+            feed_ids = await asyncio.to_thread(self._due_feed_ids)
+        except Exception as e:
+            logger.error(f"Ошибка при выборке лент: {e}")
+            return
+
+        # Лента, которая еще опрашивается с прошлого тика, ждет своей очереди
+        feed_ids = [feed_id for feed_id in feed_ids if feed_id not in self._polling]
+        await asyncio.gather(*(self._poll_limited(feed_id) for feed_id in feed_ids))
+
+    async def _poll_limited(self, feed_id: int):
+        self._polling.add(feed_id)
+        try:
+            async with self._poll_limit:
+                await self.poll_feed(feed_id)
+        finally:
+            self._polling.discard(feed_id)
+
+    def _due_feed_ids(self) -> list:
+        db = get_db()
+        try:
+            return [feed.id for feed in get_due_feeds(db, datetime.utcnow(), FEED_POLL_CONCURRENCY * 5)]
+        finally:
+            db.close()
+
+    async def poll_feed(self, feed_id: int) -> int:
+        state = await asyncio.to_thread(self._load_feed, feed_id)
+        if state is None:
+            return 0
+
+        try:
+            body = await self._download(state['url'], state['etag'], state['last_modified'], state['content_hash'])
+            parsed = await asyncio.to_thread(parse_feed, body['chunks']) if body is not None else None
+        except Exception as e:
+            await asyncio.to_thread(self._save_failure, feed_id)
+            logger.warning(f"Лента {state['url']}: {e}")
+            return 0
+
+        queued = await asyncio.to_thread(self._save_poll, feed_id, body, parsed)
+        for entry in queued:
+            self._pending.add((entry['user_id'], entry['canonical_hash']))
+            await self.queue.put(entry)
+
+        if queued:
+            logger.info(f"📰 Лента {feed_id}: {len(queued)} новых статей в очереди")
+        return len(queued)
+
+    async def probe(self, url: str) -> dict:
+        # Проверка адреса перед подпиской: это RSS/Atom и он загружается
+        try:
+            body = await self._download(url)
+            title, entries = await asyncio.to_thread(parse_feed, body['chunks'])
+        except NotAFeedError:
+            return {'error': True, 'message': "По этой ссылке не RSS/Atom-лента, а обычная страница. "
+                                              "Адрес ленты обычно заканчивается на /rss, /feed или .xml"}
+        except Exception as e:
+            return {'error': True, 'message': f"Не удалось загрузить ленту: {e}"}
+        return {'success': True, 'title': title, 'entries': len(entries)}
+
+    def _load_feed(self, feed_id: int) -> dict:
+        db = get_db()
+        try:
+            feed = db.get(Feed, feed_id)
+            if feed is None or not feed.active:
+                return None
+            return {'url': feed.url, 'etag': feed.etag, 'last_modified': feed.last_modified,
+                    'content_hash': feed.content_hash}
+        finally:
+            db.close()
+
+    def _save_failure(self, feed_id: int):
+        db = get_db()
+        try:
+            feed = db.get(Feed, feed_id)
+            if feed is None:
+                return
+            now = datetime.utcnow()
+            feed.error_count = (feed.error_count or 0) + 1
+            feed.poll_interval = min(FEED_MAX_INTERVAL, (feed.poll_interval or FEED_DEFAULT_INTERVAL) * 2)
+            feed.last_polled_at = now
+            feed.next_poll_at = now + timedelta(seconds=feed.poll_interval)
+            db.commit()
+        finally:
+            db.close()
+
+    def _save_poll(self, feed_id: int, body: dict, parsed: tuple) -> list:
+        # Одна транзакция на опрос: валидаторы, интервал и записи, которые в работу не пойдут
+        db = get_db()
+        try:
+            feed = db.get(Feed, feed_id)
+            if feed is None:
+                return []
+
+            now = datetime.utcnow()
+            interval = feed.poll_interval or FEED_DEFAULT_INTERVAL
+            first_poll = feed.last_polled_at is None
+
+            new_entries = []
+            if body is not None:
+                feed.etag = body['etag']
+                feed.last_modified = body['last_modified']
+                feed.content_hash = body['content_hash']
+                title, entries = parsed
+                if title and not feed.title:
+                    feed.title = title
+                new_entries = self._new_entries(db, feed, entries)
+
+            # Первый опрос: в работу берем самые свежие, старые записи сразу отмечаем прочитанными
+            queued = new_entries[:FEED_INITIAL_ITEMS] if first_poll else new_entries
+            create_feed_entries(db, feed.id, new_entries[len(queued):])
+
+            if new_entries and not first_poll:
+                feed.poll_interval = max(FEED_MIN_INTERVAL, interval // 2)
+            elif not new_entries:
+                feed.poll_interval = min(FEED_MAX_INTERVAL, int(interval * 1.5))
+            feed.error_count = 0
+            feed.last_polled_at = now
+            feed.next_poll_at = now + timedelta(seconds=feed.poll_interval)
+            db.commit()
+
+            return [{**entry, 'feed_id': feed.id, 'user_id': feed.user_id} for entry in queued]
+        finally:
+            db.close()
+
+    async def _download(self, url: str, etag: str = None, last_modified: str = None,
+                        content_hash: str = None) -> dict:
+        # None - лента не изменилась (304 или то же тело), иначе - куски тела для разбора
+        # и новые валидаторы
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        async with self.fetcher.session.get(url, headers=headers) as response:
+            if response.status == 304:
+                return None
+            if response.status != 200:
+                raise Exception(f"HTTP {response.status}")
+
+            chunks = []
+            size = 0
+            digest = hashlib.sha256()
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                size += len(chunk)
+                if size > FETCH_MAX_BYTES:
+                    raise Exception(f"Лента больше {FETCH_MAX_BYTES // 1024} КБ")
+                digest.update(chunk)
+                chunks.append(chunk)
+
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+
+        # Не все серверы поддерживают валидаторы - тогда сравниваем хэш тела
+        new_hash = digest.hexdigest()
+        if new_hash == content_hash:
+            return None
+        return {'chunks': chunks, 'etag': etag, 'last_modified': last_modified, 'content_hash': new_hash}
+
+    def _new_entries(self, db, feed, entries: list) -> list:
+        # Новые - не отмеченные в базе и не стоящие уже в очереди
+        new_entries = []
+        seen = set()
+        for entry in entries:
+            canonical_hash = url_hash(entry['url'])
+            if canonical_hash in seen or (feed.user_id, canonical_hash) in self._pending:
+                continue
+            seen.add(canonical_hash)
+            if feed_entry_seen(db, feed, entry['guid'], canonical_hash):
+                continue
+            new_entries.append({'guid': entry['guid'], 'url': entry['url'], 'canonical_hash': canonical_hash})
+        return new_entries
+
+    def _mark_seen(self, entry: dict):
+        db = get_db()
+        try:
+            create_feed_entry(db, entry['feed_id'], entry['guid'], entry['url'][:500], entry['canonical_hash'])
+        except Exception as e:
+            # Та же запись могла появиться параллельно - второй раз не нужна
+            db.rollback()
+            logger.debug(f"Запись ленты {entry['url']} уже отмечена: {e}")
+        finally:
+            db.close()
+
+    async def _worker(self):
+        while True:
+            entry = await self.queue.get()
+            try:
+                await self._process(entry)
+            except Exception as e:
+                logger.error(f"Ошибка при обработке статьи из ленты {entry['url']}: {e}")
+            finally:
+                self._pending.discard((entry['user_id'], entry['canonical_hash']))
+                self.queue.task_done()
+
+    async def _process(self, entry: dict):
+        try:
+            result = await self.generator.process_article_url(entry['url'], entry['user_id'], on_duplicate='reuse')
+        except Exception as e:
+            result = {'error': True, 'message': str(e)}
+
+        if result.get('error') and not result.get('already_processed'):
+            await self._entry_failed(entry, result['message'])
+            return
+
+        self._attempts.pop((entry['feed_id'], entry['canonical_hash']), None)
+        await asyncio.to_thread(self._mark_seen, entry)
+
+    async def _entry_failed(self, entry: dict, reason: str):
+        key = (entry['feed_id'], entry['canonical_hash'])
+        attempts = self._attempts.get(key, 0) + 1
+        if attempts < FEED_MAX_ATTEMPTS:
+            self._attempts[key] = attempts
+            logger.info(f"Статья из ленты {entry['url']} не обработана (попытка {attempts} из "
+                        f"{FEED_MAX_ATTEMPTS}), повторим при обновлении ленты: {reason}")
+            return
+
+        self._attempts.pop(key, None)
+        logger.warning(f"Статья из ленты {entry['url']} пропущена после {attempts} попыток: {reason}")
+        await asyncio.to_thread(self._mark_seen, entry)
+
+
+feed_poller = FeedPoller()
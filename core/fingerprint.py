@@ -0,0 +1,126 @@
+from collections import OrderedDict
+import hashlib
+import re
+
+from config.settings import SIMHASH_MAX_DISTANCE, SIMHASH_INDEX_SIZE
+
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 3
+MIN_FINGERPRINT_TEXT = 200
+# 8 полос по 8 бит: при расстоянии < 8 хотя бы одна полоса совпадет целиком
+BANDS = 8
+BAND_BITS = FINGERPRINT_BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+DIGEST_SIZE = FINGERPRINT_BITS // 8
+# Таблицы для bytes.translate: байт -> 1, если в нем установлен бит с этим номером, иначе 0
+BIT_TABLES = tuple(bytes(value >> bit & 1 for value in range(256)) for bit in range(8))
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def simhash(text: str) -> int:
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return None
+
+    shingles = [' '.join(shingle) for shingle in zip(*(words[i:] for i in range(SHINGLE_SIZE)))]
+    blake2b = hashlib.blake2b
+    digests = b''.join(blake2b(shingle.encode('utf-8'), digest_size=DIGEST_SIZE).digest()
+                       for shingle in shingles)
+
+    # Бит отпечатка установлен, если у большинства шинглов (с повторами) он установлен в хеше.
+    # Биты считаем не в цикле по шинглам, а в C: translate оставляет от каждого байта
+    # нужный бит, срез [byte::8] - один байт хеша всех шинглов, count(1) - сумма.
+    # Хеш читается как big-endian: байт 0 - старшие биты отпечатка
+    fingerprint = 0
+    for bit, table in enumerate(BIT_TABLES):
+        bits = digests.translate(table)
+        for byte in range(DIGEST_SIZE):
+            if bits[byte::DIGEST_SIZE].count(1) * 2 > len(shingles):
+                fingerprint |= 1 << ((DIGEST_SIZE - 1 - byte) * 8 + bit)
+    return fingerprint
+
+
+def content_fingerprint(text: str) -> str:
+    # 64-битный SimHash в hex; для слишком коротких текстов отпечаток не считаем
+    if not text or len(text) < MIN_FINGERPRINT_TEXT:
+        return None
+    fingerprint = simhash(text)
+    return f"{fingerprint:016x}" if fingerprint is not None else None
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class NearDuplicateIndex:
+    # Последние статьи в памяти: отпечаток -> (article_id, user_id).
+    # Кандидаты ищутся по совпадению одной из полос, расстояние проверяется точно.
+
+    def __init__(self, max_distance: int = SIMHASH_MAX_DISTANCE, capacity: int = SIMHASH_INDEX_SIZE):
+        self.max_distance = min(max_distance, BANDS - 1)
+        self.capacity = capacity
+        self.loaded = False
+        self._entries = OrderedDict()
+        self._bands = [{} for _ in range(BANDS)]
+
+    def _band_keys(self, fingerprint: int):
+        for band in range(BANDS):
+            yield band, fingerprint >> (band * BAND_BITS) & BAND_MASK
+
+    def add(self, article_id: int, user_id: int, fingerprint: str):
+        if not fingerprint:
+            return
+        value = int(fingerprint, 16)
+
+        self.remove(article_id)
+        self._entries[article_id] = (value, user_id)
+        for band, key in self._band_keys(value):
+            self._bands[band].setdefault(key, set()).add(article_id)
+
+        while len(self._entries) > self.capacity:
+            self.remove(next(iter(self._entries)))
+
+    def remove(self, article_id: int):
+        entry = self._entries.pop(article_id, None)
+        if entry is None:
+            return
+        for band, key in self._band_keys(entry[0]):
+            bucket = self._bands[band].get(key)
+            if bucket:
+                bucket.discard(article_id)
+                if not bucket:
+                    del self._bands[band][key]
+
+    def find(self, fingerprint: str, user_id: int = None) -> dict:
+        if not fingerprint:
+            return None
+        value = int(fingerprint, 16)
+
+        candidates = set()
+        for band, key in self._band_keys(value):
+            candidates.update(self._bands[band].get(key, ()))
+
+        best = None
+        for article_id in candidates:
+            other, owner = self._entries[article_id]
+            if user_id is not None and owner != user_id:
+                continue
+            distance = hamming_distance(value, other)
+            if distance <= self.max_distance and (best is None or distance < best['distance']):
+                best = {
+                    'article_id': article_id,
+                    'distance': distance,
+                    'similarity': 1 - distance / FINGERPRINT_BITS
+                }
+        return best
+
+    def load(self, articles):
+        # articles - (id, user_id, content_simhash) от старых к новым
+        for article_id, user_id, fingerprint in articles:
+            self.add(article_id, user_id, fingerprint)
+        self.loaded = True
+
+
+duplicate_index = NearDuplicateIndex()
@@ -0,0 +1,172 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from urllib.parse import urldefrag
+
+from config.settings import HTTP_CACHE_PATH, HTTP_CACHE_TTL, HTTP_CACHE_MAX_BYTES
+
+# Сколько отметок о чтении копить в памяти, прежде чем записать их одним UPDATE
+ACCESS_BATCH_SIZE = 100
+
+
+def cache_key(url: str) -> str:
+    # Ключ - ровно тот URL, который запрашивается: разные параметры могут отдавать
+    # разные страницы. Отбрасывается только #фрагмент, он на сервер не уходит
+    return urldefrag(url).url
+
+
+class HttpCache:
+    # Тело ответа + валидаторы (ETag/Last-Modified) в отдельном SQLite-файле.
+    # Свежие записи (моложе ttl) отдаются без сети, устаревшие перепроверяются
+    # условным запросом. Общий размер ограничен, вытесняются давно не читанные.
+    # Работа с SQLite идет в потоке (asyncio.to_thread), чтобы не останавливать
+    # event loop; время чтения копится в памяти и пишется пачкой вместе с записями
+
+    def __init__(self, path: str = HTTP_CACHE_PATH, ttl: int = HTTP_CACHE_TTL,
+                 max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._accessed = {}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    encoding TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_accessed ON responses (accessed_at)")
+            self._conn.commit()
+        return self._conn
+
+    async def get(self, url: str) -> dict:
+        return await asyncio.to_thread(self._get, cache_key(url))
+
+    async def put(self, url: str, body: bytes, encoding: str = None, etag: str = None,
+                  last_modified: str = None):
+        if len(body) > self.max_bytes:
+            return
+        await asyncio.to_thread(self._put, cache_key(url), body, encoding, etag, last_modified)
+
+    async def touch(self, url: str):
+        # Сервер ответил 304 - тело прежнее, продлеваем свежесть
+        self.revalidated += 1
+        await asyncio.to_thread(self._touch, cache_key(url))
+
+    def _get(self, key: str) -> dict:
+        now = time.time()
+
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT body, encoding, etag, last_modified, fetched_at FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._accessed[key] = now
+            if len(self._accessed) >= ACCESS_BATCH_SIZE:
+                self._flush_accessed()
+                self.conn.commit()
+
+        body, encoding, etag, last_modified, fetched_at = row
+        fresh = now - fetched_at < self.ttl
+        if fresh:
+            self.hits += 1
+
+        return {
+            'body': body,
+            'encoding': encoding,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fresh': fresh
+        }
+
+    def _put(self, key: str, body: bytes, encoding: str, etag: str, last_modified: str):
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, body, encoding, etag, last_modified, size, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, body, encoding, etag, last_modified, len(body), now, now)
+            )
+            self._accessed.pop(key, None)
+            # Перед вытеснением время чтения должно быть актуальным
+            self._flush_accessed()
+            self._evict()
+            self.conn.commit()
+
+    def _touch(self, key: str):
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, key)
+            )
+            self._accessed.pop(key, None)
+            self._flush_accessed()
+            self.conn.commit()
+
+    def _flush_accessed(self):
+        if self._accessed:
+            self.conn.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()]
+            )
+            self._accessed.clear()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Освобождаем с запасом, чтобы не чистить кэш на каждой записи
+        target = self.max_bytes * 0.9
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= target:
+                break
+            evicted.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            'entries': entries,
+            'bytes': size,
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses
+        }
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._flush_accessed()
+                self._conn.commit()
+            self._conn.close()
+            self._conn = None
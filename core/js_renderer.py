@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from urllib.parse import urlparse
+
+from config.settings import JS_RENDER_CONTEXTS, JS_RENDER_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# Для текста статьи картинки, шрифты, видео и реклама не нужны - не грузим их вовсе
+BLOCKED_RESOURCE_TYPES = frozenset(('image', 'media', 'font', 'imageset', 'texttrack', 'object'))
+BLOCKED_HOSTS = (
+    'doubleclick.net', 'googlesyndication.com', 'google-analytics.com', 'googletagmanager.com',
+    'googleadservices.com', 'adservice.google.com', 'mc.yandex.ru', 'an.yandex.ru', 'yandexadexchange.net',
+    'adfox.ru', 'adriver.ru', 'top-fwz1.mail.ru', 'ad.mail.ru', 'criteo.com', 'criteo.net',
+    'facebook.net', 'connect.facebook.net', 'tiktok.com', 'hotjar.com', 'scorecardresearch.com',
+)
+
+
+def is_blocked(resource_type: str, url: str) -> bool:
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    host = (urlparse(url).hostname or '').lower()
+    return any(host == blocked or host.endswith('.' + blocked) for blocked in BLOCKED_HOSTS)
+
+
+class JsRenderer:
+    # Один браузер на процесс и пул заранее созданных контекстов.
+    # Контекст берется из пула на время рендера одной страницы, так что размер пула
+    # ограничивает и число одновременных рендеров - браузер не запускается на каждый URL
+
+    def __init__(self, contexts: int = JS_RENDER_CONTEXTS, timeout: int = JS_RENDER_TIMEOUT,
+                 user_agent: str = None):
+        self.size = contexts
+        self.timeout = timeout * 1000
+        self.user_agent = user_agent
+        self.rendered = 0
+        self.blocked = 0
+        self.recreated = 0
+        self._playwright = None
+        self._browser = None
+        self._pool = None
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._browser is not None
+
+    async def start(self):
+        async with self._start_lock:
+            if self._browser is not None:
+                return
+
+            # Необязательная зависимость: без нее ContentFetcher работает только со статикой
+            from playwright.async_api import async_playwright
+
+            self._playwright = await async_playwright().start()
+            try:
+                self._browser = await self._playwright.chromium.launch(headless=True)
+                self._pool = asyncio.Queue()
+                for _ in range(self.size):
+                    self._pool.put_nowait(await self._new_context())
+            except Exception:
+                await self.close()
+                raise
+
+            logger.info(f"✅ Браузер для JS-рендера запущен ({self.size} контекстов)")
+
+    async def _new_context(self):
+        if not self._browser.is_connected():
+            # Браузер упал - поднимаем новый, контексты старого заменятся по мере использования
+            logger.warning("Браузер для JS-рендера отключился, перезапускаем")
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = await self._playwright.chromium.launch(headless=True)
+
+        context = await self._browser.new_context(
+            user_agent=self.user_agent,
+            java_script_enabled=True,
+            service_workers='block'
+        )
+        await context.route('**/*', self._route)
+        return context
+
+    async def _route(self, route):
+        request = route.request
+        if is_blocked(request.resource_type, request.url):
+            self.blocked += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def render(self, url: str) -> bytes:
+        if self._browser is None:
+            await self.start()
+
+        context = await self._pool.get()
+        page = None
+        failed = False
+        try:
+            if context is None:
+                context = await self._new_context()
+            page = await context.new_page()
+            await page.goto(url, wait_until='domcontentloaded', timeout=self.timeout)
+            try:
+                # SPA догружает текст запросами к API - ждем, пока сеть утихнет, но недолго
+                await page.wait_for_load_state('networkidle', timeout=min(self.timeout, 5000))
+            except Exception:
+                pass
+            html = await page.content()
+            self.rendered += 1
+            return html.encode('utf-8')
+        except Exception:
+            failed = True
+            raise
+        finally:
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+            if failed and context is not None:
+                # После сбоя (упала вкладка, закрылся контекст) контекст в пул не возвращаем:
+                # закрываем, а вместо него кладем None - новый создаст следующий рендер
+                self.recreated += 1
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+                context = None
+            self._pool.put_nowait(context)
+
+    def stats(self) -> dict:
+        return {
+            'started': self.started,
+            'contexts': self.size,
+            'idle': self._pool.qsize() if self._pool is not None else 0,
+            'rendered': self.rendered,
+            'blocked_requests': self.blocked,
+            'recreated_contexts': self.recreated
+        }
+
+    async def close(self):
+        if self._pool is not None:
+            while not self._pool.empty():
+                context = self._pool.get_nowait()
+                if context is not None:
+                    await context.close()
+        self._pool = None
+
+        if self._browser is not None:
+            await self._browser.close()
+        self._browser = None
+
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._playwright = None
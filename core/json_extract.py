@@ -0,0 +1,355 @@
+import json
+import re
+
+# Разбор JSON из ответов моделей. Модели оборачивают JSON в ```json, пишут вступление
+# "Вот результат:", оставляют запятую перед скобкой, обрываются на max_tokens -
+# раньше любая такая мелочь выбрасывала весь ответ
+
+
+class JSONExtractError(ValueError):
+    pass
+
+
+_stats = {'parsed': 0, 'repaired': 0, 'truncated': 0, 'failed': 0}
+
+_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+_CLOSERS = {'{': '}', '[': ']'}
+_WORD = re.compile(r'\w+')
+_BRACKET = re.compile(r'[{\[]')
+
+
+def extract_stats() -> dict:
+    return dict(_stats)
+
+
+def find_json(text: str, start: int = 0) -> str:
+    # Первый сбалансированный объект или массив с первой скобки от позиции start.
+    # None - скобка открыта, но не закрыта
+    start = _next_bracket(text, start)
+    if start is None:
+        return None
+
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            depth += 1
+        elif char in '}]':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def _next_bracket(text: str, start: int = 0) -> int:
+    match = _BRACKET.search(text, start)
+    return match.start() if match else None
+
+
+def repair_json(text: str) -> str:
+    # Исправляет вне строк: запятые перед } и ], комментарии // и /* */,
+    # True/False/None из Python. Внутри строк ничего не трогаем
+    result = []
+    i = 0
+    length = len(text)
+    while i < length:
+        char = text[i]
+        if char == '"':
+            end = _string_end(text, i)
+            result.append(text[i:end])
+            i = end
+            continue
+        if text.startswith('//', i):
+            newline = text.find('\n', i)
+            i = length if newline == -1 else newline
+            continue
+        if text.startswith('/*', i):
+            close = text.find('*/', i + 2)
+            i = length if close == -1 else close + 2
+            continue
+        if char == ',':
+            following = text[i + 1:].lstrip()
+            if following[:1] in ('}', ']'):
+                i += 1
+                continue
+        if char.isalpha():
+            word = _WORD.match(text, i).group()
+            result.append(_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        result.append(char)
+        i += 1
+    return ''.join(result)
+
+
+def _string_end(text: str, start: int) -> int:
+    i = start + 1
+    while i < len(text):
+        if text[i] == '\\':
+            i += 2
+            continue
+        if text[i] == '"':
+            return i + 1
+        i += 1
+    return len(text)
+
+
+def _loads(text: str):
+    # strict=False - переводы строк прямо внутри строк, модели пишут их постоянно
+    return json.loads(text, strict=False)
+
+
+def extract_json(text: str, schema=None):
+    # Достает JSON из ответа модели и проверяет по схеме (см. validate).
+    # JSONExtractError - JSON не найден, не чинится или не подходит под схему
+    if text is None:
+        _stats['failed'] += 1
+        raise JSONExtractError('пустой ответ модели')
+    return _parse(text, schema)
+
+
+def _schema_errors(data, schema) -> list:
+    return validate(data, schema) if schema is not None else []
+
+
+def _parse(text: str, schema=None):
+    stripped = text.strip()
+    errors = []
+    try:
+        data = _loads(stripped)
+    except ValueError:
+        pass
+    else:
+        errors = _schema_errors(data, schema)
+        if not errors:
+            _stats['parsed'] += 1
+            return data
+
+    # До JSON модель может написать свои скобки: "[JSON]:", "(см. [1])", "{curly}".
+    # Если кандидат не разбирается или не подходит под схему - пробуем следующую скобку
+    unclosed = []
+    position = 0
+    while True:
+        start = _next_bracket(stripped, position)
+        if start is None:
+            break
+        position = start + 1
+        candidate = find_json(stripped, start)
+        if candidate is None:
+            # Ответ оборван (max_tokens): все следующие скобки вложены в эту, поэтому сначала
+            # чиним корень - иначе вместо постов всех платформ вернулся бы первый целый пост
+            data = _truncated(stripped, start)
+            if data and not _schema_errors(data, schema):
+                _stats['truncated'] += 1
+                return data
+            unclosed.append(start)
+            continue
+        for attempt, counter in ((candidate, 'parsed'), (repair_json(candidate), 'repaired')):
+            try:
+                data = _loads(attempt)
+            except ValueError:
+                continue
+            errors = _schema_errors(data, schema)
+            if not errors:
+                _stats[counter] += 1
+                return data
+            # Разобрался, но не тот: вложенные в него скобки не проверяем
+            position = start + len(candidate)
+            break
+
+    # Целого подходящего кандидата нет - годится и пустой оборванный корень
+    for start in unclosed:
+        data = _truncated(stripped, start)
+        if data is None:
+            continue
+        errors = _schema_errors(data, schema)
+        if not errors:
+            _stats['truncated'] += 1
+            return data
+
+    _stats['failed'] += 1
+    if errors:
+        raise JSONExtractError('ответ не подходит под схему: ' + '; '.join(errors[:5]))
+    raise JSONExtractError(f"JSON не найден в ответе: {stripped[:100]!r}")
+
+
+def _truncated(text: str, start: int):
+    # То, что успело прийти целиком из оборванного JSON с позиции start
+    parser = StreamingJSONParser()
+    parser.feed(repair_json(text[start:]))
+    return parser.value
+
+
+def validate(data, schema, path: str = '$') -> list:
+    # Схема - тип Python (или кортеж типов) либо dict:
+    # type, required (обязательные ключи), properties (схемы ключей), values (схема
+    # любого значения объекта), items (схема элементов списка), enum, non_empty.
+    # Возвращает список ошибок, пустой - все в порядке
+    if not isinstance(schema, dict):
+        schema = {'type': schema}
+
+    expected = schema.get('type')
+    if expected is not None and not isinstance(data, expected):
+        return [f"{path}: ожидался {_type_name(expected)}, получен {type(data).__name__}"]
+
+    errors = []
+    if 'enum' in schema and data not in schema['enum']:
+        errors.append(f"{path}: {data!r} не из {list(schema['enum'])}")
+    if schema.get('non_empty') and not (data.strip() if isinstance(data, str) else data):
+        errors.append(f"{path}: пусто")
+
+    if isinstance(data, dict):
+        for key in schema.get('required', ()):
+            if key not in data:
+                errors.append(f"{path}: нет поля {key}")
+        for key, value in data.items():
+            field = schema.get('properties', {}).get(key, schema.get('values'))
+            if field is not None:
+                errors.extend(validate(value, field, f"{path}.{key}"))
+    elif isinstance(data, list) and 'items' in schema:
+        for i, item in enumerate(data):
+            errors.extend(validate(item, schema['items'], f"{path}[{i}]"))
+    return errors
+
+
+def _type_name(expected) -> str:
+    if isinstance(expected, tuple):
+        return ' или '.join(item.__name__ for item in expected)
+    return expected.__name__
+
+
+class StreamingJSONParser:
+    # Разбор JSON по мере генерации: feed(кусок) -> value - все, что уже можно показать.
+    # Недописанная строка-значение обрезается на текущем символе, недописанные ключи,
+    # числа и литералы отбрасываются, открытые скобки закрываются.
+    # Каждый символ сканируется один раз, json.loads - только на снимке при изменении
+
+    def __init__(self):
+        self.text = ''
+        self.value = None
+        self.complete = False
+        self._pos = 0
+        self._started = False
+        self._root = 0
+        self._stack = []
+        # Для объекта - чего ждем: key, colon, value, comma
+        self._expect = []
+        self._in_string = False
+        self._string_is_key = False
+        self._string_start = 0
+        self._escaped = False
+        self._safe = 0
+
+    def update(self, text: str):
+        # text - весь накопленный ответ, как его передает generate(on_text=...)
+        if len(text) > len(self.text):
+            self.feed(text[len(self.text):])
+        return self.value
+
+    def feed(self, chunk: str):
+        self.text += chunk
+        if not self.complete:
+            self._scan()
+            snapshot = self._snapshot()
+            if snapshot is not None:
+                try:
+                    self.value = _loads(snapshot)
+                except ValueError:
+                    pass
+        return self.value
+
+    def _scan(self):
+        text = self.text
+        while self._pos < len(text) and not self.complete:
+            i = self._pos
+            char = text[i]
+            self._pos += 1
+
+            if not self._started:
+                if char in '{[':
+                    self._started = True
+                    self._root = i
+                    self._open(char, i)
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._string_is_key:
+                        self._expect[-1] = 'colon'
+                    else:
+                        self._value_done(i + 1)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+                self._string_is_key = self._stack[-1] == '{' and self._expect[-1] == 'key'
+            elif char in '{[':
+                self._open(char, i)
+            elif char in '}]':
+                self._stack.pop()
+                self._expect.pop()
+                if not self._stack:
+                    self.complete = True
+                    self._safe = i + 1
+                else:
+                    self._value_done(i + 1)
+            elif char == ':':
+                self._expect[-1] = 'value'
+            elif char == ',':
+                if self._stack[-1] == '{':
+                    self._expect[-1] = 'key'
+            elif not char.isspace():
+                # Число или литерал: готов, когда за ним идет разделитель
+                end = i + 1
+                while end < len(text) and text[end] not in ',}] \n\r\t':
+                    end += 1
+                if end == len(text):
+                    self._pos = i
+                    break
+                self._pos = end
+                self._value_done(end)
+
+    def _open(self, char: str, position: int):
+        if self._stack and self._stack[-1] == '{':
+            self._expect[-1] = 'comma'
+        self._stack.append(char)
+        self._expect.append('key' if char == '{' else 'value')
+        self._safe = position + 1
+
+    def _value_done(self, position: int):
+        if self._stack[-1] == '{':
+            self._expect[-1] = 'comma'
+        self._safe = position
+
+    def _snapshot(self) -> str:
+        if not self._started:
+            return None
+        if self.complete:
+            return self.text[self._root:self._safe]
+
+        closers = ''.join(_CLOSERS[bracket] for bracket in reversed(self._stack))
+        if self._in_string and not self._string_is_key:
+            partial = self.text[self._string_start:]
+            # Не обрываем escape-последовательность посередине
+            if self._escaped:
+                partial = partial[:-1]
+            partial = re.sub(r'\\u[0-9a-fA-F]{0,3}$', '', partial)
+            return self.text[self._root:self._string_start] + partial + '"' + closers
+        return self.text[self._root:self._safe] + closers
@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+
+from config.settings import LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES
+
+# Сколько отметок о чтении и просроченных ключей копить, прежде чем записать их в базу
+ACCESS_BATCH_SIZE = 100
+
+
+def normalize_prompt(prompt: str) -> str:
+    # Лишние пробелы и переносы в шаблонах промптов не меняют ответ модели
+    return ' '.join(prompt.split())
+
+
+def cache_key(provider: str, model: str, prompt: str, max_tokens: int) -> str:
+    raw = f"{provider}\n{model}\n{max_tokens}\n{normalize_prompt(prompt)}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    # Ответы модели в SQLite: один и тот же промпт (повторное открытие поста
+    # в редакторе, перепечатка статьи) не стоит ни времени, ни токенов.
+    # Записи живут ttl секунд, общий размер ограничен, вытесняются давно не читанные.
+    # SQLite - в потоке (asyncio.to_thread), а не в event loop. Попадание ничего не пишет:
+    # время чтения и просроченные ключи копятся в памяти и пишутся пачкой
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: int = LLM_CACHE_TTL,
+                 max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._accessed = {}
+        self._expired = set()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT,
+                    model TEXT,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_accessed ON responses (accessed_at)")
+            self._conn.commit()
+        return self._conn
+
+    async def get(self, key: str) -> str:
+        return await asyncio.to_thread(self._get, key)
+
+    async def put(self, key: str, response: str, provider: str = None, model: str = None):
+        size = len(response.encode('utf-8'))
+        if not response or size > self.max_bytes:
+            return
+        await asyncio.to_thread(self._put, key, response, size, provider, model)
+
+    async def discard(self, key: str):
+        # Ответ оказался негодным (битый JSON) - не отдаем его повторно
+        await asyncio.to_thread(self._discard, key)
+
+    def _get(self, key: str) -> str:
+        now = time.time()
+        with self._lock:
+            row = None
+            if key not in self._expired:
+                row = self.conn.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+
+            if row is None or now - row[1] >= self.ttl:
+                if row is not None:
+                    self._expired.add(key)
+                    self._accessed.pop(key, None)
+                self.misses += 1
+                hit = None
+            else:
+                self._accessed[key] = now
+                hit = row[0]
+
+            if len(self._accessed) + len(self._expired) >= ACCESS_BATCH_SIZE:
+                self._flush()
+                self.conn.commit()
+
+        if hit is not None:
+            self.hits += 1
+        return hit
+
+    def _put(self, key: str, response: str, size: int, provider: str, model: str):
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, provider, model, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, response, size, now, now)
+            )
+            self._accessed.pop(key, None)
+            self._expired.discard(key)
+            # Перед вытеснением время чтения должно быть актуальным
+            self._flush()
+            self._evict()
+            self.conn.commit()
+
+    def _discard(self, key: str):
+        with self._lock:
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._accessed.pop(key, None)
+            self._expired.discard(key)
+            self._flush()
+            self.conn.commit()
+
+    def _flush(self):
+        if self._accessed:
+            self.conn.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()]
+            )
+            self._accessed.clear()
+        if self._expired:
+            self.conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key in self._expired])
+            self._expired.clear()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * 0.9
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= target:
+                break
+            evicted.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        requests = self.hits + self.misses
+        return {
+            'entries': entries,
+            'bytes': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requests if requests else 0.0
+        }
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._flush()
+                self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+
+llm_cache = LLMCache()
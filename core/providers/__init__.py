@@ -0,0 +1,80 @@
+from importlib import import_module
+import logging
+
+from config.settings import AI_PROVIDER, AI_API_KEY, AI_MODEL, AI_MODELS, AI_PROVIDER_CHAIN, PROVIDER_API_KEYS
+
+logger = logging.getLogger(__name__)
+
+# Реализации провайдеров: имя -> "модуль:класс". Модуль с SDK импортируется только
+# при первом обращении к провайдеру, поэтому при старте грузится лишь SDK из AI_PROVIDER_CHAIN.
+# Свой провайдер подключается через register_provider
+PROVIDERS = {
+    'claude': 'core.providers.anthropic_provider:AnthropicProvider',
+    'gemini': 'core.providers.gemini_provider:GeminiProvider',
+    'groq': 'core.providers.groq_provider:GroqProvider',
+    'openai': 'core.providers.openai_provider:OpenAIProvider',
+    'ollama': 'core.providers.ollama_provider:OllamaProvider',
+    'fake': 'core.providers.fake_provider:FakeProvider',
+}
+ALIASES = {'anthropic': 'claude'}
+
+# Экземпляры общие на процесс: пул HTTP-соединений, TLS-сессии и keep-alive
+# переиспользуются всеми анализаторами, а создание анализатора ничего не стоит
+_instances = {}
+
+
+def register_provider(name: str, path: str):
+    PROVIDERS[name.lower()] = path
+
+
+def provider_name(name: str) -> str:
+    name = name.lower()
+    return ALIASES.get(name, name)
+
+
+def provider_class(name: str):
+    path = PROVIDERS.get(provider_name(name))
+    if path is None:
+        raise ValueError(f"Неизвестный провайдер: {name}")
+    module, _, cls = path.partition(':')
+    return getattr(import_module(module), cls)
+
+
+def provider_config(name: str) -> dict:
+    # Ключ и модель: для основного провайдера - AI_API_KEY и AI_MODEL, для резервных - свои
+    name = provider_name(name)
+    if name == provider_name(AI_PROVIDER):
+        return {'api_key': AI_API_KEY, 'model': AI_MODEL}
+    return {'api_key': PROVIDER_API_KEYS.get(name, ''), 'model': AI_MODELS.get(name)}
+
+
+def get_provider(name: str, api_key: str = None, model: str = None):
+    name = provider_name(name)
+    config = provider_config(name)
+    api_key = config['api_key'] if api_key is None else api_key
+    model = model or config['model']
+
+    key = (name, api_key, model)
+    provider = _instances.get(key)
+    if provider is None:
+        provider = provider_class(name)(api_key=api_key, model=model)
+        _instances[key] = provider
+        logger.info(f"Создан клиент AI провайдера {name} ({model})")
+    return provider
+
+
+def warm_up():
+    # При старте бота, чтобы первый пользователь не ждал создания клиентов -
+    # и резервных тоже: переключение на них должно быть быстрым
+    for name in AI_PROVIDER_CHAIN:
+        get_provider(name)
+
+
+def provider_stats() -> dict:
+    return {f"{name}:{model}": provider.stats() for (name, _, model), provider in _instances.items()}
+
+
+async def close_providers():
+    for provider in _instances.values():
+        await provider.close()
+    _instances.clear()
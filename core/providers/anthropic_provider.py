@@ -0,0 +1,43 @@
+from anthropic import AsyncAnthropic
+
+from core.providers.base import BaseProvider, usage
+
+
+class AnthropicProvider(BaseProvider):
+    name = 'claude'
+
+    def _create_client(self):
+        return AsyncAnthropic(api_key=self.api_key, max_retries=0)
+
+    async def complete(self, prompt: str, max_tokens: int = 1000) -> dict:
+        response = await self.client.messages.create(
+            model=self.model,
+            max_tokens=max_tokens,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return {
+            'text': response.content[0].text,
+            'usage': usage(response.usage.input_tokens, response.usage.output_tokens)
+        }
+
+    async def stream(self, prompt: str, max_tokens: int = 1000):
+        stream = await self.client.messages.create(
+            model=self.model,
+            max_tokens=max_tokens,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True
+        )
+        # Токены запроса приходят в message_start, ответа - в message_delta в конце
+        input_tokens = output_tokens = None
+        async for event in stream:
+            if event.type == 'content_block_delta':
+                text = getattr(event.delta, 'text', None)
+                if text:
+                    yield text
+            elif event.type == 'message_start':
+                input_tokens = event.message.usage.input_tokens
+            elif event.type == 'message_delta':
+                output_tokens = event.usage.output_tokens
+        reported = usage(input_tokens, output_tokens)
+        if reported is not None:
+            yield {'usage': reported}
@@ -0,0 +1,102 @@
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def usage(prompt_tokens, completion_tokens) -> dict:
+    # Токены из ответа API. None - провайдер их не сообщил, тогда telemetry оценит сама
+    if prompt_tokens is None and completion_tokens is None:
+        return None
+    return {'prompt_tokens': prompt_tokens or 0, 'completion_tokens': completion_tokens or 0}
+
+
+class BaseProvider:
+    # Общий интерфейс провайдера LLM. Каждая реализация импортирует свой SDK на уровне модуля,
+    # а модуль загружается реестром (core/providers/__init__.py) только когда провайдер выбран.
+    # Встроенные повторы SDK выключены - повторами управляет core/rate_limiter.py.
+    # complete возвращает {'text': ответ, 'usage': usage(...) или None}; stream отдает куски
+    # текста, а последним - {'usage': ...}, если API сообщает расход токенов в потоке
+    name = None
+
+    def __init__(self, api_key: str = '', model: str = None):
+        self.api_key = api_key
+        self.model = model
+        self.created_at = datetime.utcnow()
+        self.client = self._create_client()
+
+    def _create_client(self):
+        return None
+
+    async def complete(self, prompt: str, max_tokens: int = 1000) -> dict:
+        raise NotImplementedError
+
+    async def stream(self, prompt: str, max_tokens: int = 1000):
+        # Провайдер без потоковой генерации отдает ответ одним куском
+        result = await self.complete(prompt, max_tokens)
+        yield result['text']
+        if result['usage'] is not None:
+            yield {'usage': result['usage']}
+
+    def _pool_stats(self) -> dict:
+        # Внутренности httpx/httpcore, поэтому без гарантий - только для диагностики
+        try:
+            connections = self.client._client._transport._pool.connections
+        except AttributeError:
+            return {}
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {'connections': len(connections), 'idle': idle}
+
+    def stats(self) -> dict:
+        return {
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            **self._pool_stats()
+        }
+
+    async def close(self):
+        close = getattr(self.client, 'close', None)
+        if close is not None:
+            try:
+                await close()
+            except Exception as e:
+                logger.warning(f"Ошибка при закрытии клиента {self.name}: {e}")
+
+
+class ChatCompletionsProvider(BaseProvider):
+    # API в формате OpenAI chat.completions (OpenAI, Groq).
+    # stream_params - дополнительные параметры потока, у OpenAI без них нет usage
+    stream_params = {}
+
+    async def complete(self, prompt: str, max_tokens: int = 1000) -> dict:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=0.7
+        )
+        return {'text': response.choices[0].message.content, 'usage': self._usage(response)}
+
+    async def stream(self, prompt: str, max_tokens: int = 1000):
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=0.7,
+            stream=True,
+            **self.stream_params
+        )
+        reported = None
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            reported = self._usage(chunk) or reported
+        if reported is not None:
+            yield {'usage': reported}
+
+    @staticmethod
+    def _usage(response) -> dict:
+        # OpenAI - response.usage (в потоке - в последнем куске), Groq в потоке - x_groq.usage
+        data = getattr(response, 'usage', None) or getattr(getattr(response, 'x_groq', None), 'usage', None)
+        if data is None:
+            return None
+        return usage(data.prompt_tokens, data.completion_tokens)
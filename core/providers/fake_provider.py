@@ -0,0 +1,141 @@
+import asyncio
+import json
+import math
+import random
+import re
+import zlib
+
+from config.settings import (PLATFORMS, FAKE_LLM_TTFT, FAKE_LLM_TTFT_SIGMA, FAKE_LLM_TOKENS_PER_SECOND,
+                             FAKE_LLM_ERROR_RATE, FAKE_LLM_SEED)
+from core.providers.base import BaseProvider, usage
+from core.text_budget import estimate_tokens
+
+# Сколько токенов в одном куске потокового ответа
+CHUNK_TOKENS = 4
+
+_TITLE = re.compile(r'(?:Заголовок|статьи «)[:\s]*([^\n»]+)')
+_SENTIMENTS = ('positive', 'neutral', 'negative')
+
+
+class FakeProviderError(Exception):
+    # Как ответ сервера с ошибкой: rate_limiter и failover обрабатывают его по status_code
+    def __init__(self, status_code: int = 503):
+        super().__init__(f"fake: HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FakeProvider(BaseProvider):
+    # Провайдер без сети для бенчмарков и проверок (AI_PROVIDER=fake). Задержка до первого
+    # токена - логнормальная с медианой ttft, дальше ответ идет со скоростью tokens_per_second.
+    # С вероятностью error_rate - ошибка 503. Ответ - правдоподобный JSON под тип промпта
+    name = 'fake'
+
+    def __init__(self, api_key: str = '', model: str = None):
+        super().__init__(api_key, model)
+        self.ttft = FAKE_LLM_TTFT
+        self.ttft_sigma = FAKE_LLM_TTFT_SIGMA
+        self.tokens_per_second = FAKE_LLM_TOKENS_PER_SECOND
+        self.error_rate = FAKE_LLM_ERROR_RATE
+        self.random = random.Random(FAKE_LLM_SEED)
+        self.calls = 0
+        self.errors = 0
+
+    def _first_token_delay(self) -> float:
+        if self.ttft <= 0:
+            return 0.0
+        return self.ttft * math.exp(self.random.gauss(0, self.ttft_sigma))
+
+    async def _start(self):
+        self.calls += 1
+        await asyncio.sleep(self._first_token_delay())
+        if self.random.random() < self.error_rate:
+            self.errors += 1
+            raise FakeProviderError()
+
+    async def complete(self, prompt: str, max_tokens: int = 1000) -> dict:
+        await self._start()
+        text = fake_response(prompt)
+        if self.tokens_per_second > 0:
+            await asyncio.sleep(estimate_tokens(text) / self.tokens_per_second)
+        return {'text': text, 'usage': self._usage(prompt, text)}
+
+    async def stream(self, prompt: str, max_tokens: int = 1000):
+        await self._start()
+        text = fake_response(prompt)
+        # Куски примерно по CHUNK_TOKENS токенов, задержка пропорциональна их размеру
+        step = max(1, len(text) * CHUNK_TOKENS // max(estimate_tokens(text), 1))
+        for i in range(0, len(text), step):
+            chunk = text[i:i + step]
+            if self.tokens_per_second > 0:
+                await asyncio.sleep(estimate_tokens(chunk) / self.tokens_per_second)
+            yield chunk
+        yield {'usage': self._usage(prompt, text)}
+
+    def _usage(self, prompt: str, text: str) -> dict:
+        # Как у настоящего API: "модель" сообщает, сколько токенов посчитала
+        return usage(estimate_tokens(prompt), estimate_tokens(text))
+
+    def stats(self) -> dict:
+        return {**super().stats(), 'calls': self.calls, 'errors': self.errors}
+
+
+def _title(prompt: str) -> str:
+    match = _TITLE.search(prompt)
+    return match.group(1).strip() if match else 'Новость'
+
+
+def _analysis(title: str) -> dict:
+    # Одна и та же статья - один и тот же ответ
+    seed = zlib.crc32(title.encode())
+    return {
+        "summary": f"{title}. Компания сообщила о новых результатах и планах на следующий год.",
+        "sentiment": _SENTIMENTS[seed % len(_SENTIMENTS)],
+        "key_points": [f"{title}: главное", "рост показателей", "планы на год"],
+        "relevance_score": seed % 10 + 1,
+        "main_theme": "бизнес"
+    }
+
+
+def _posts(title: str) -> dict:
+    return {
+        platform: {
+            "content": f"{title}. Коротко о главном для {info['name']}.",
+            "hashtags": "#новости #бизнес"
+        }
+        for platform, info in PLATFORMS.items()
+    }
+
+
+def _schedule() -> dict:
+    return {
+        platform: {"time_slot": f"сегодня {10 + i}:00", "priority": i + 1, "reason": "активная аудитория"}
+        for i, platform in enumerate(PLATFORMS)
+    }
+
+
+def fake_response(prompt: str) -> str:
+    # Тип запроса - по характерным фразам промптов UniversalAIAnalyzer и AIEditor.
+    # Посты и расписание - для всех платформ, лишние вызывающий отбрасывает сам
+    title = _title(prompt)
+    if 'Кратко законспектируй' in prompt:
+        data = {"summary": f"Часть статьи «{title}».", "key_points": ["факт из части"]}
+    elif 'сразу подготовь посты' in prompt:
+        data = {**_analysis(title), "posts": _posts(title)}
+        if 'поле schedule' in prompt:
+            data["schedule"] = _schedule()
+    elif 'Проанализируй эту статью' in prompt:
+        data = _analysis(title)
+    elif 'Создай посты' in prompt:
+        data = _posts(title)
+    elif 'расписание публикации' in prompt:
+        data = _schedule()
+    elif 'ИСХОДНЫЙ ПОСТ' in prompt and 'варианта' in prompt:
+        data = [{"text": f"Вариант {i + 1}: {title}", "style": style}
+                for i, style in enumerate(("краткий", "подробный", "с юмором"))]
+    elif 'ИСХОДНЫЙ ПОСТ' in prompt:
+        data = {"edited_post": "Отредактированный пост.", "changes": "Текст сокращен"}
+    elif 'предложи 3-5' in prompt:
+        data = ["Добавить эмодзи", "Сократить текст", "Добавить призыв к действию"]
+    else:
+        data = _analysis(title)
+    return json.dumps(data, ensure_ascii=False)
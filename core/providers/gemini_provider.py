@@ -0,0 +1,39 @@
+import google.generativeai as genai
+
+from core.providers.base import BaseProvider, usage
+
+# Ключ Gemini задается глобально для всего SDK
+_configured_key = None
+
+
+class GeminiProvider(BaseProvider):
+    name = 'gemini'
+
+    def _create_client(self):
+        global _configured_key
+        if _configured_key != self.api_key:
+            genai.configure(api_key=self.api_key)
+            _configured_key = self.api_key
+        return genai.GenerativeModel(self.model)
+
+    async def complete(self, prompt: str, max_tokens: int = 1000) -> dict:
+        response = await self.client.generate_content_async(prompt)
+        return {'text': response.text, 'usage': _usage(response)}
+
+    async def stream(self, prompt: str, max_tokens: int = 1000):
+        response = await self.client.generate_content_async(prompt, stream=True)
+        # usage_metadata есть в каждом куске, итоговое - в последнем
+        reported = None
+        async for chunk in response:
+            if chunk.parts:
+                yield chunk.text
+            reported = _usage(chunk) or reported
+        if reported is not None:
+            yield {'usage': reported}
+
+
+def _usage(response) -> dict:
+    metadata = getattr(response, 'usage_metadata', None)
+    if not metadata or not metadata.prompt_token_count:
+        return None
+    return usage(metadata.prompt_token_count, metadata.candidates_token_count)
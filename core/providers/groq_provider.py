@@ -0,0 +1,10 @@
+from groq import AsyncGroq
+
+from core.providers.base import ChatCompletionsProvider
+
+
+class GroqProvider(ChatCompletionsProvider):
+    name = 'groq'
+
+    def _create_client(self):
+        return AsyncGroq(api_key=self.api_key, max_retries=0)
@@ -0,0 +1,79 @@
+import json
+
+import aiohttp
+
+from config.settings import OLLAMA_URL
+from core.providers.base import BaseProvider, usage
+
+
+class OllamaProvider(BaseProvider):
+    name = 'ollama'
+
+    def __init__(self, api_key: str = '', model: str = None):
+        self._session = None
+        super().__init__(api_key, model)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # Сессия создается внутри event loop, при первом запросе
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=10, keepalive_timeout=60),
+                # Локальная модель может отвечать минутами
+                timeout=aiohttp.ClientTimeout(total=300)
+            )
+        return self._session
+
+    async def complete(self, prompt: str, max_tokens: int = 1000) -> dict:
+        async with self.session.post(
+                f"{OLLAMA_URL}/api/generate",
+                json={
+                    "model": self.model,
+                    "prompt": prompt,
+                    "stream": False
+                }
+        ) as response:
+            response.raise_for_status()
+            result = await response.json()
+            return {'text': result['response'], 'usage': _usage(result)}
+
+    async def stream(self, prompt: str, max_tokens: int = 1000):
+        # Ollama отдает поток как JSON-объект на строку
+        async with self.session.post(
+                f"{OLLAMA_URL}/api/generate",
+                json={
+                    "model": self.model,
+                    "prompt": prompt,
+                    "stream": True
+                }
+        ) as response:
+            response.raise_for_status()
+            async for line in response.content:
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if data.get('response'):
+                    yield data['response']
+                if data.get('done'):
+                    reported = _usage(data)
+                    if reported is not None:
+                        yield {'usage': reported}
+                    break
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        session = self._session
+        if session is not None and not session.closed:
+            idle = sum(len(conns) for conns in session.connector._conns.values())
+            stats.update(connections=idle + len(session.connector._acquired), idle=idle)
+        return stats
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+def _usage(data: dict) -> dict:
+    # Счетчики токенов Ollama приходят в последнем объекте ответа (done: true)
+    return usage(data.get('prompt_eval_count'), data.get('eval_count'))
@@ -0,0 +1,11 @@
+from openai import AsyncOpenAI
+
+from core.providers.base import ChatCompletionsProvider
+
+
+class OpenAIProvider(ChatCompletionsProvider):
+    name = 'openai'
+    stream_params = {'stream_options': {'include_usage': True}}
+
+    def _create_client(self):
+        return AsyncOpenAI(api_key=self.api_key, max_retries=0)
@@ -0,0 +1,280 @@
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import asyncio
+import logging
+import random
+import time
+
+from config.settings import AI_RATE_LIMITS, AI_MAX_RETRIES, AI_EXPECTED_COMPLETION_SHARE
+from core.text_budget import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# 529 - Anthropic "overloaded"
+RETRYABLE_STATUSES = frozenset((408, 409, 429, 500, 502, 503, 504, 529))
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+
+
+def estimate_cost(prompt: str, max_tokens: int, provider: str = None) -> int:
+    # Лимит токенов в минуту считается по запросу и ответу вместе. Ответ обычно
+    # короче max_tokens - списываем ожидаемую долю, а после ответа выравниваем (settle)
+    return estimate_tokens(prompt, provider) + int(max_tokens * AI_EXPECTED_COMPLETION_SHARE)
+
+
+def actual_cost(prompt: str, text: str, usage: dict = None, provider: str = None) -> int:
+    # Расход по данным API, без них - оценка по тексту запроса и ответа
+    if usage is not None:
+        return usage['prompt_tokens'] + usage['completion_tokens']
+    return estimate_tokens(prompt, provider) + estimate_tokens(text, provider)
+
+
+def error_status(error: Exception) -> int:
+    # SDK Groq/Anthropic/OpenAI - status_code, google.api_core - code, aiohttp - status
+    for attr in ('status_code', 'status', 'code'):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def retry_after(error: Exception) -> float:
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or getattr(error, 'headers', None)
+    if not headers:
+        return None
+
+    value = headers.get('retry-after') or headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+        return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    # Обрыв соединения и таймаут без HTTP-ответа
+    name = type(error).__name__
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError)) or \
+        name in ('APIConnectionError', 'APITimeoutError', 'ClientConnectionError', 'ServerDisconnectedError')
+
+
+class TokenBucket:
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        # Запрос больше всего ведра все равно должен пройти - ждем полного ведра
+        amount = min(amount, self.capacity)
+        # Под замком ждет только первый в очереди - остальные встают за ним по порядку
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, amount: float):
+        # Доплата (amount > 0) или возврат (amount < 0) после того, как стал известен
+        # фактический расход. Долг (tokens < 0) задержит следующие запросы
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+    def drain(self):
+        # Провайдер ответил 429 - наш учет разошелся с его, начинаем копить заново
+        self._refill()
+        self.tokens = 0
+
+
+class ProviderLimiter:
+    # Лимиты одного провайдера: запросы и токены в минуту, число одновременных
+    # запросов и повтор с экспоненциальной задержкой при 429/5xx.
+    # После 429 с Retry-After пауза распространяется на все запросы к провайдеру
+
+    def __init__(self, name: str, rpm: int = 0, tpm: int = 0, in_flight: int = 4,
+                 max_retries: int = AI_MAX_RETRIES):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.in_flight = asyncio.Semaphore(in_flight) if in_flight else None
+        self.max_retries = max_retries
+        self._paused_until = 0.0
+
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+        self.waiting = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    async def _wait_turn(self, cost: int):
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+        if self.requests is not None:
+            await self.requests.acquire(1)
+        if self.tokens is not None:
+            await self.tokens.acquire(cost)
+
+    async def _acquire(self, cost: int):
+        # Сначала лимиты в минуту, потом место среди одновременных запросов: ожидающий
+        # своей минуты запрос не держит слот, который мог бы занять уже допущенный
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            await self._wait_turn(cost)
+            if self.in_flight is not None:
+                try:
+                    await self.in_flight.acquire()
+                except BaseException:
+                    # Запрос отменен до отправки - токены возвращаем
+                    self._refund(cost)
+                    raise
+        finally:
+            self.waiting -= 1
+        self._record_wait(time.monotonic() - started)
+
+    def _refund(self, cost: int):
+        if self.tokens is not None and cost:
+            self.tokens.adjust(-cost)
+
+    def settle(self, cost: int, actual: int):
+        # Списано cost по оценке до ответа, фактически ушло actual
+        if self.tokens is not None and actual != cost:
+            self.tokens.adjust(actual - cost)
+
+    def _release(self):
+        if self.in_flight is not None:
+            self.in_flight.release()
+
+    async def run(self, call, cost: int = 0):
+        # call - функция без аргументов, возвращающая новую корутину на каждую попытку
+        attempt = 0
+        while True:
+            await self._acquire(cost)
+            try:
+                self.calls += 1
+                return await call()
+            except Exception as e:
+                # Ответа нет - списанное за попытку возвращаем: повтор спишет заново, и без
+                # возврата запрос с повторами занял бы лимит в (retries + 1) раз больше
+                self._refund(cost)
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    self.failures += 1
+                    raise
+                attempt += 1
+                self._log_retry(e, attempt, delay)
+            finally:
+                self._release()
+
+            await asyncio.sleep(delay)
+
+    async def stream(self, open_stream, cost: int = 0):
+        # open_stream - функция без аргументов, возвращающая новый async-генератор кусков текста.
+        # Повторяем только пока не пришел первый кусок: начатый ответ пользователь уже видит.
+        # Место в очереди занято, пока поток не дочитан
+        attempt = 0
+        while True:
+            await self._acquire(cost)
+            received = False
+            try:
+                self.calls += 1
+                async for chunk in open_stream():
+                    received = True
+                    yield chunk
+                return
+            except Exception as e:
+                # Начатый ответ токены уже потратил, settle до него не дошел - списание оставляем
+                if not received:
+                    self._refund(cost)
+                delay = None if received else self._retry_delay(e, attempt)
+                if delay is None:
+                    self.failures += 1
+                    raise
+                attempt += 1
+                self._log_retry(e, attempt, delay)
+            finally:
+                self._release()
+
+            await asyncio.sleep(delay)
+
+    def _log_retry(self, error: Exception, attempt: int, delay: float):
+        self.retries += 1
+        logger.warning(f"{self.name}: {type(error).__name__}, повтор {attempt}/{self.max_retries} "
+                       f"через {delay:.1f} с")
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+
+        # Экспоненциальная задержка с полным джиттером, чтобы повторы не шли волной
+        delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+        if error_status(error) == 429:
+            self.rate_limited += 1
+            if self.requests is not None:
+                self.requests.drain()
+            server_delay = retry_after(error)
+            if server_delay is not None:
+                delay = min(RETRY_MAX_DELAY, server_delay) + random.uniform(0, 0.5)
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    def _record_wait(self, waited: float):
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+
+    def stats(self) -> dict:
+        attempts = self.calls or 1
+        return {
+            'calls': self.calls,
+            'retries': self.retries,
+            'rate_limited': self.rate_limited,
+            'failures': self.failures,
+            'waiting': self.waiting,
+            'queue_wait_avg': self.wait_total / attempts,
+            'queue_wait_max': self.wait_max
+        }
+
+
+_limiters = {}
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        limits = AI_RATE_LIMITS.get(provider, {})
+        limiter = ProviderLimiter(
+            provider,
+            rpm=limits.get('rpm', 0),
+            tpm=limits.get('tpm', 0),
+            in_flight=limits.get('in_flight', 4)
+        )
+        _limiters[provider] = limiter
+    return limiter
+
+
+def limiter_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+
+from config.settings import POSTING_HOURS, SCHEDULE_HORIZON_DAYS, SCHEDULE_SLOT_CAPACITY
+
+# Те же правила, что раньше описывались модели в промпте suggest_posting_schedule:
+# позитив - утром и днем, негатив - вечером, LinkedIn - в рабочие часы,
+# пресс-релизы - утром рабочего дня, Telegram и VK - можно сразу
+SENTIMENT_WINDOWS = {
+    'positive': ('morning', 'day'),
+    'negative': ('evening',),
+    'neutral': ('morning', 'day', 'evening'),
+}
+
+PLATFORM_RULES = {
+    'telegram': {'asap': True},
+    'vk': {'asap': True},
+    'twitter': {},
+    'linkedin': {'hours': range(10, 17), 'weekdays': True},
+    'press': {'windows': ('morning',), 'weekdays': True},
+}
+
+WINDOW_NAMES = {'morning': 'утро', 'day': 'день', 'evening': 'вечер'}
+SENTIMENT_NAMES = {'positive': 'позитивная', 'negative': 'негативная', 'neutral': 'нейтральная'}
+
+# Не ставим публикацию ближе, чем через столько минут: пользователь успеет поправить пост
+MIN_LEAD_MINUTES = 15
+
+
+def slot_key(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def allowed_hours(platform: str, sentiment: str) -> list:
+    rules = PLATFORM_RULES.get(platform, {})
+    windows = SENTIMENT_WINDOWS.get(sentiment, SENTIMENT_WINDOWS['neutral'])
+    if rules.get('windows'):
+        # Ограничение платформы сильнее тональности: пресс-релиз уходит утром в любом случае
+        windows = [window for window in windows if window in rules['windows']] or list(rules['windows'])
+
+    hours = sorted({hour for window in windows for hour in POSTING_HOURS.get(window, [])})
+    if rules.get('hours'):
+        limited = [hour for hour in hours if hour in rules['hours']]
+        hours = limited or [hour for window in POSTING_HOURS.values() for hour in window if hour in rules['hours']]
+    return sorted(set(hours))
+
+
+def window_of(hour: int) -> str:
+    for window, hours in POSTING_HOURS.items():
+        if hour in hours:
+            return window
+    return None
+
+
+def format_slot(moment: datetime, now: datetime) -> str:
+    days = (moment.date() - now.date()).days
+    if days == 0:
+        day = 'сегодня'
+    elif days == 1:
+        day = 'завтра'
+    else:
+        day = moment.strftime('%d.%m')
+    return f"{day} {moment.strftime('%H:%M')}"
+
+
+def plan_post(platform: str, sentiment: str, now: datetime, busy: dict = None) -> dict:
+    # busy - {час (slot_key): число постов} уже запланированных на эту платформу
+    busy = busy or {}
+    rules = PLATFORM_RULES.get(platform, {})
+    hours = allowed_hours(platform, sentiment)
+    earliest = now + timedelta(minutes=MIN_LEAD_MINUTES)
+
+    # Telegram и VK: если сейчас подходящее окно и этот час свободен - публикуем сразу
+    if rules.get('asap') and earliest.hour in hours and busy.get(slot_key(earliest), 0) < SCHEDULE_SLOT_CAPACITY:
+        moment = earliest.replace(second=0, microsecond=0)
+        return {
+            'scheduled_time': moment,
+            'time_slot': format_slot(moment, now),
+            'reason': f"{SENTIMENT_NAMES.get(sentiment, 'нейтральная')} новость, подходящее окно уже открыто"
+        }
+
+    fallback = None
+    for day in range(SCHEDULE_HORIZON_DAYS + 1):
+        date = now.date() + timedelta(days=day)
+        if rules.get('weekdays') and date.weekday() >= 5:
+            continue
+        for hour in hours:
+            moment = datetime(date.year, date.month, date.day, hour)
+            if moment < earliest:
+                continue
+            load = busy.get(moment, 0)
+            if load < SCHEDULE_SLOT_CAPACITY:
+                return {
+                    'scheduled_time': moment,
+                    'time_slot': format_slot(moment, now),
+                    'reason': _reason(platform, sentiment, hour, rules)
+                }
+            if fallback is None or load < busy.get(fallback, 0):
+                fallback = moment
+
+    # Все слоты на горизонте заняты - берем наименее загруженный
+    moment = fallback or slot_key(earliest) + timedelta(hours=1)
+    return {
+        'scheduled_time': moment,
+        'time_slot': format_slot(moment, now),
+        'reason': 'все подходящие слоты заняты, выбран наименее загруженный'
+    }
+
+
+def _reason(platform: str, sentiment: str, hour: int, rules: dict) -> str:
+    parts = [f"{SENTIMENT_NAMES.get(sentiment, 'нейтральная')} новость"]
+    window = window_of(hour)
+    if window:
+        parts.append(f"окно «{WINDOW_NAMES[window]}»")
+    if rules.get('weekdays'):
+        parts.append('рабочий день')
+    if rules.get('hours'):
+        parts.append('рабочие часы')
+    return ', '.join(parts)
+
+
+def plan_schedule(platforms: list, sentiment: str, busy: dict = None, now: datetime = None) -> dict:
+    # busy - {platform: {час: число постов}} из базы
+    now = now or datetime.now()
+    busy = {platform: dict(slots) for platform, slots in (busy or {}).items()}
+
+    schedule = {}
+    for platform in platforms:
+        platform_busy = busy.setdefault(platform, {})
+        slot = plan_post(platform, sentiment, now, platform_busy)
+        key = slot_key(slot['scheduled_time'])
+        platform_busy[key] = platform_busy.get(key, 0) + 1
+        schedule[platform] = slot
+    return schedule
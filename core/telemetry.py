@@ -0,0 +1,220 @@
+from bisect import bisect_left
+from collections import defaultdict
+import time
+
+from config.settings import AI_TOKEN_PRICES
+from core.json_extract import JSONExtractError
+from core.text_budget import estimate_tokens
+
+# Границы корзин гистограмм: секунды и токены
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60, 120)
+TOKEN_BUCKETS = (50, 100, 200, 400, 800, 1200, 2000, 3000, 5000, 8000, 16000)
+
+# queue_wait - от вызова generate до отправки провайдеру (очередь ProviderLimiter),
+# ttft - до первого куска ответа (только потоковые вызовы), latency - ответ провайдера,
+# total - весь вызов с очередью и повторами
+METRICS = {
+    'queue_wait': LATENCY_BUCKETS,
+    'ttft': LATENCY_BUCKETS,
+    'latency': LATENCY_BUCKETS,
+    'total': LATENCY_BUCKETS,
+    'prompt_tokens': TOKEN_BUCKETS,
+    'completion_tokens': TOKEN_BUCKETS,
+}
+
+
+class Histogram:
+    # Фиксированные корзины, как в Prometheus: память не растет с числом вызовов
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        # Линейная интерполяция внутри корзины (как histogram_quantile в Prometheus),
+        # ограниченная реальными min/max
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            if count and seen + count >= rank:
+                lower = self.bounds[i - 1] if i else self.min
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                value = lower + (upper - lower) * (rank - seen) / count
+                return min(max(value, self.min), self.max)
+            seen += count
+        return self.max
+
+    def stats(self) -> dict:
+        return {
+            'count': self.count,
+            'avg': self.sum / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+        }
+
+
+class LLMCall:
+    # Замеры одного вызова generate. Попыток может быть несколько (повторы, резервный
+    # провайдер, дублирование запроса) - в метрики идет та, что дала ответ
+
+    def __init__(self, telemetry: 'Telemetry', method: str, provider: str, model: str, prompt: str):
+        self.telemetry = telemetry
+        self.method = method
+        self.primary = provider
+        self.provider = provider
+        self.model = model
+        self.prompt = prompt
+        self.started = time.monotonic()
+        self.sent = None
+        self.answer_started = None
+        self.first_chunk = None
+        self.usage = None
+
+    def attempt(self) -> float:
+        now = time.monotonic()
+        if self.sent is None:
+            self.sent = now
+        return now
+
+    def answered(self, target: dict, attempt_started: float, streaming: bool = False):
+        if self.answer_started is not None:
+            return
+        self.answer_started = attempt_started
+        self.provider = target['name']
+        self.model = target['model']
+        if streaming:
+            self.first_chunk = time.monotonic()
+
+    def report_usage(self, usage: dict):
+        # Расход токенов из ответа API (см. core/providers/base.py)
+        if usage is not None:
+            self.usage = usage
+
+    def finish(self, text: str):
+        now = time.monotonic()
+        labels = (self.method, self.provider, self.model)
+        observe = self.telemetry.observe
+        sent = self.sent or now
+        observe('queue_wait', sent - self.started, *labels)
+        if self.answer_started is not None:
+            observe('latency', now - self.answer_started, *labels)
+            if self.first_chunk is not None:
+                observe('ttft', self.first_chunk - self.answer_started, *labels)
+        observe('total', now - self.started, *labels)
+
+        count = self.telemetry.count
+        if self.usage is not None:
+            prompt_tokens = self.usage['prompt_tokens']
+            completion_tokens = self.usage['completion_tokens']
+        else:
+            # API не сообщил расход - оцениваем по тексту и считаем такие вызовы отдельно
+            prompt_tokens = estimate_tokens(self.prompt, self.provider)
+            completion_tokens = estimate_tokens(text, self.provider)
+            count('estimated_usage', *labels)
+        observe('prompt_tokens', prompt_tokens, *labels)
+        observe('completion_tokens', completion_tokens, *labels)
+
+        count('calls', *labels)
+        if self.provider != self.primary:
+            count('provider_fallbacks', *labels)
+        input_price, output_price = AI_TOKEN_PRICES.get(self.provider, (0.0, 0.0))
+        count('cost_usd', *labels, value=(prompt_tokens * input_price + completion_tokens * output_price) / 1e6)
+
+    def fail(self):
+        self.telemetry.count('errors', self.method, self.primary, self.model)
+
+
+class Telemetry:
+    # Метрики вызовов LLM в памяти процесса по (метод, провайдер, модель):
+    # гистограммы времени и токенов, счетчики вызовов, ошибок, разборов и запасных ответов
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._histograms = {}
+        self._counters = defaultdict(float)
+
+    def start(self, method: str, provider: str, model: str, prompt: str) -> LLMCall:
+        return LLMCall(self, method, provider, model, prompt)
+
+    def observe(self, metric: str, value: float, method: str, provider: str, model: str):
+        key = (metric, method, provider, model)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(METRICS[metric])
+        histogram.observe(value)
+
+    def count(self, name: str, method: str, provider: str, model: str, value: float = 1):
+        self._counters[(name, method, provider, model)] += value
+
+    def fallback(self, method: str, provider: str, model: str, error: Exception = None):
+        # Вместо ответа модели использована заглушка; отдельно - ответ не разобран как JSON
+        self.count('fallbacks', method, provider, model)
+        if isinstance(error, JSONExtractError):
+            self.count('parse_failures', method, provider, model)
+
+    def snapshot(self, method: str = None, provider: str = None) -> list:
+        rows = {}
+
+        def row(labels):
+            if labels not in rows:
+                rows[labels] = {'method': labels[0], 'provider': labels[1], 'model': labels[2],
+                                'counters': {}, 'histograms': {}}
+            return rows[labels]
+
+        for (metric, *labels), histogram in self._histograms.items():
+            row(tuple(labels))['histograms'][metric] = histogram.stats()
+        for (name, *labels), value in self._counters.items():
+            row(tuple(labels))['counters'][name] = value
+
+        return [
+            data for labels, data in sorted(rows.items(), key=lambda item: tuple(map(str, item[0])))
+            if (method is None or data['method'] == method) and (provider is None or data['provider'] == provider)
+        ]
+
+    def export(self) -> str:
+        # Текстовый формат Prometheus - для выгрузки и сравнения между запусками
+        lines = []
+        for metric in METRICS:
+            lines.append(f"# TYPE newsmaker_llm_{metric} histogram")
+            for (name, method, provider, model), histogram in self._histograms.items():
+                if name != metric:
+                    continue
+                labels = f'method="{method}",provider="{provider}",model="{model}"'
+                cumulative = 0
+                for bound, count in zip(histogram.bounds + ('+Inf',), histogram.buckets):
+                    cumulative += count
+                    lines.append(f'newsmaker_llm_{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"newsmaker_llm_{metric}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"newsmaker_llm_{metric}_count{{{labels}}} {histogram.count}")
+
+        for counter in sorted({key[0] for key in self._counters}):
+            lines.append(f"# TYPE newsmaker_llm_{counter}_total counter")
+            for (name, method, provider, model), value in self._counters.items():
+                if name == counter:
+                    labels = f'method="{method}",provider="{provider}",model="{model}"'
+                    lines.append(f"newsmaker_llm_{counter}_total{{{labels}}} {value:g}")
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        self.started_at = time.time()
+        self._histograms.clear()
+        self._counters.clear()
+
+
+telemetry = Telemetry()
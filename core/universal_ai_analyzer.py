@@ -1,79 +1,227 @@
-from config.settings import AI_PROVIDER, AI_API_KEY, AI_MODEL
+from config.settings import (AI_PROVIDER_CHAIN, LLM_CACHE_ENABLED, PLATFORMS, AI_MAP_REDUCE_MIN_TOKENS,
+                             AI_CHUNK_TOKENS, AI_MAX_CHUNKS)
+from core.providers import get_provider, provider_name
+from core.llm_cache import llm_cache, cache_key
+from core.rate_limiter import get_limiter, estimate_cost, actual_cost
+from core.text_budget import fit_to_budget, split_chunks, estimate_tokens
+from core.failover import call_with_failover, stream_with_failover, get_health
+from core.json_extract import extract_json, validate, JSONExtractError
+from core.telemetry import telemetry
+from contextlib import aclosing
+import asyncio
 import json
-import aiohttp
+import time
+
+SENTIMENTS = ('positive', 'negative', 'neutral')
+
+SCHEDULE_RULES = """- Позитивные новости лучше публиковать утром/днём
+- Негативные - вечером, когда меньше охват
+- Telegram и VK - можно сразу
+- LinkedIn - лучше в рабочие часы (10-16)
+- Пресс-релизы - утро рабочего дня"""
+
+# Схемы ответов для extract_json (формат - см. core/json_extract.py)
+# key_points дальше идут в промпт постов через ', '.join - нужен список строк
+ANALYSIS_SCHEMA = {
+    'type': dict,
+    'required': ('summary', 'sentiment', 'key_points'),
+    'properties': {
+        'summary': {'type': str, 'non_empty': True},
+        'sentiment': str,
+        'key_points': {'type': list, 'items': str},
+        'main_theme': str
+    }
+}
+POST_SCHEMA = {
+    'type': dict,
+    'required': ('content',),
+    'properties': {'content': {'type': str, 'non_empty': True}, 'hashtags': str}
+}
+SCHEDULE_SCHEMA = {'type': dict, 'values': {'type': dict, 'required': ('time_slot',)}}
+CHUNK_SCHEMA = {
+    'type': dict,
+    'required': ('summary',),
+    'properties': {'summary': {'type': str, 'non_empty': True}, 'key_points': {'type': list, 'items': str}}
+}
+
+# Ответ модели на одну часть длинной статьи в map-reduce
+CHUNK_SUMMARY_TOKENS = 400
 
 
 class UniversalAIAnalyzer:
 
-    def __init__(self):
-        self.provider = AI_PROVIDER.lower()
-        self.api_key = AI_API_KEY
-        self.model = AI_MODEL
-
-        if self.provider == 'claude':
-            from anthropic import Anthropic
-            self.client = Anthropic(api_key=self.api_key)
-        elif self.provider == 'gemini':
-            import google.generativeai as genai
-            genai.configure(api_key=self.api_key)
-            self.client = genai.GenerativeModel(self.model)
-        elif self.provider == 'groq':
-            from groq import Groq
-            self.client = Groq(api_key=self.api_key)
-        elif self.provider == 'ollama':
-            self.base_url = "http://localhost:11434"
-
-    async def _call_claude(self, prompt: str, max_tokens: int = 1000) -> str:
-        response = self.client.messages.create(
-            model=self.model,
-            max_tokens=max_tokens,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.content[0].text
-
-    async def _call_gemini(self, prompt: str) -> str:
-        response = self.client.generate_content(prompt)
-        return response.text
-
-    async def _call_groq(self, prompt: str, max_tokens: int = 1000) -> str:
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=max_tokens,
-            temperature=0.7
-        )
-        return response.choices[0].message.content
-
-    async def _call_ollama(self, prompt: str) -> str:
-        # Вызов Ollama (локально)
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                    f"{self.base_url}/api/generate",
-                    json={
-                        "model": self.model,
-                        "prompt": prompt,
-                        "stream": False
-                    }
-            ) as response:
-                result = await response.json()
-                return result['response']
+    def __init__(self, provider: str = None, api_key: str = None, model: str = None):
+        # Явно заданный провайдер - без резервных, иначе цепочка AI_PROVIDER_CHAIN
+        if provider:
+            self.targets = [self._target(provider, api_key, model)]
+        else:
+            self.targets = [self._target(name) for name in AI_PROVIDER_CHAIN]
+        self.provider = self.targets[0]['name']
+        self.model = self.targets[0]['model']
+        self.limiter = self.targets[0]['limiter']
+        self.cache = llm_cache if LLM_CACHE_ENABLED else None
+
+    @staticmethod
+    def _target(name: str, api_key: str = None, model: str = None) -> dict:
+        # Реализации провайдеров общие на процесс (асинхронные: пока ждем ответ модели,
+        # бот обслуживает остальных); SDK импортируется только для провайдеров из цепочки
+        provider = get_provider(name, api_key, model)
+        return {
+            'name': provider_name(name),
+            'model': provider.model,
+            'provider': provider,
+            'limiter': get_limiter(provider_name(name))
+        }
 
-    async def generate(self, prompt: str, max_tokens: int = 1000) -> str:
+    async def generate(self, prompt: str, max_tokens: int = 1000, use_cache: bool = True,
+                       on_text=None, method: str = 'generate') -> str:
+        # use_cache=False - нужен свежий ответ модели, а не сохраненный.
+        # on_text(text) - async-функция, получает накопленный текст ответа по мере генерации.
+        # method - кто вызывает (analyze_article, edit_post, ...), метка для core/telemetry.py
+        key = None
+        if use_cache and self.cache is not None:
+            key = cache_key(self.provider, self.model, prompt, max_tokens)
+            cached = await self.cache.get(key)
+            if cached is not None:
+                telemetry.count('cache_hits', method, self.provider, self.model)
+                if on_text is not None:
+                    await on_text(cached)
+                return cached
+
+        record = telemetry.start(method, self.provider, self.model, prompt)
         try:
-            if self.provider == 'claude':
-                return await self._call_claude(prompt, max_tokens)
-            elif self.provider == 'gemini':
-                return await self._call_gemini(prompt)
-            elif self.provider == 'groq':
-                return await self._call_groq(prompt, max_tokens)
-            elif self.provider == 'ollama':
-                return await self._call_ollama(prompt)
+            if on_text is None:
+                result = await self._call_provider(prompt, max_tokens, record)
             else:
-                raise ValueError(f"Неизвестный провайдер: {self.provider}")
+                result = await self._stream_provider(prompt, max_tokens, on_text, record)
+        except Exception:
+            record.fail()
+            raise
+        record.finish(result)
+
+        if key is not None:
+            await self.cache.put(key, result, self.provider, self.model)
+        return result
+
+    async def forget(self, prompt: str, max_tokens: int = 1000):
+        if self.cache is not None:
+            await self.cache.discard(cache_key(self.provider, self.model, prompt, max_tokens))
+
+    def count_fallback(self, method: str, error: Exception = None):
+        # Вместо ответа модели отдаем заглушку - учитываем в метриках
+        telemetry.fallback(method, self.provider, self.model, error)
+
+    async def _call_provider(self, prompt: str, max_tokens: int, record) -> str:
+        def attempt(target: dict):
+            cost = estimate_cost(prompt, max_tokens, target['name'])
+
+            async def call():
+                started = record.attempt()
+                result = await target['provider'].complete(prompt, max_tokens)
+                get_health(target['name']).record_latency(time.monotonic() - started)
+                record.answered(target, started)
+                record.report_usage(result['usage'])
+                target['limiter'].settle(cost, actual_cost(prompt, result['text'], result['usage'], target['name']))
+                return result['text']
+
+            # Очередь под лимиты провайдера и повторы при 429/5xx
+            return target['limiter'].run(call, cost)
+
+        try:
+            return await call_with_failover(self.targets, attempt)
+        except Exception as e:
+            raise Exception(f"Ошибка AI провайдера {self.provider}: {str(e)}")
+
+    async def _stream_provider(self, prompt: str, max_tokens: int, on_text, record) -> str:
+        def open_stream(target: dict):
+            cost = estimate_cost(prompt, max_tokens, target['name'])
+
+            async def stream():
+                started = record.attempt()
+                received = []
+                usage = None
+                async for chunk in target['provider'].stream(prompt, max_tokens):
+                    if isinstance(chunk, dict):
+                        # Последним провайдер может отдать расход токенов - это не текст
+                        usage = chunk['usage']
+                        record.report_usage(usage)
+                        continue
+                    if not received:
+                        get_health(target['name']).record_latency(time.monotonic() - started, streaming=True)
+                    record.answered(target, started, streaming=True)
+                    received.append(chunk)
+                    yield chunk
+                target['limiter'].settle(cost, actual_cost(prompt, ''.join(received), usage, target['name']))
+
+            return target['limiter'].stream(stream, cost)
+
+        parts = []
+        try:
+            async with aclosing(stream_with_failover(self.targets, open_stream)) as chunks:
+                async for chunk in chunks:
+                    parts.append(chunk)
+                    await on_text(''.join(parts))
         except Exception as e:
             raise Exception(f"Ошибка AI провайдера {self.provider}: {str(e)}")
+        return ''.join(parts)
+
+    async def _prepare_content(self, title: str, content: str) -> str:
+        # Текст статьи для промпта. Вместо первых 3000 символов - самые информативные
+        # предложения в бюджете токенов, а очень длинная статья сначала конспектируется по частям
+        if estimate_tokens(content, self.provider) > AI_MAP_REDUCE_MIN_TOKENS:
+            notes = await self._summarize_chunks(title, content)
+            if notes:
+                return notes
+        return fit_to_budget(content, self.provider, title=title)['text']
+
+    async def _summarize_chunks(self, title: str, content: str) -> str:
+        # Map: части анализируются одновременно, очередь к провайдеру держит ProviderLimiter.
+        # Reduce - обычный анализ, которому вместо текста статьи передаются конспекты частей
+        limit = AI_CHUNK_TOKENS * AI_MAX_CHUNKS
+        text = fit_to_budget(content, self.provider, budget=limit, title=title)['text']
+        chunk_tokens = AI_CHUNK_TOKENS
+        chunks = split_chunks(text, chunk_tokens, self.provider)
+        # Части заполняются не до конца - чуть увеличиваем размер, чтобы уложиться в AI_MAX_CHUNKS
+        while len(chunks) > AI_MAX_CHUNKS:
+            chunk_tokens = int(chunk_tokens * 1.1) + 1
+            chunks = split_chunks(text, chunk_tokens, self.provider)
+        if len(chunks) < 2:
+            return None
+
+        print(f"📚 Длинная статья: {len(chunks)} частей, анализирую параллельно...")
+        notes = await asyncio.gather(*(
+            self._summarize_chunk(title, chunk, i + 1, len(chunks)) for i, chunk in enumerate(chunks)
+        ))
+        return "Конспект статьи по частям:\n\n" + "\n\n".join(notes)
+
+    async def _summarize_chunk(self, title: str, chunk: str, number: int, total: int) -> str:
+        prompt = f"""Это часть {number} из {total} длинной статьи «{title}».
+
+{chunk}
+
+Кратко законспектируй ТОЛЬКО эту часть. Верни JSON:
+{{
+    "summary": "о чем эта часть в 1-2 предложениях",
+    "key_points": ["факт с цифрами и именами", "еще факт"]
+}}
+
+ВАЖНО: Отвечай ТОЛЬКО JSON, без markdown."""
+
+        try:
+            result_text = await self.generate(prompt, max_tokens=CHUNK_SUMMARY_TOKENS, method='summarize_chunk')
+            result = extract_json(result_text, CHUNK_SCHEMA)
+            points = ''.join(f"\n- {point}" for point in result.get('key_points', []))
+            return f"Часть {number}: {result['summary']}{points}"
+        except Exception as e:
+            # Часть не должна выпасть из анализа - берем ее главные предложения
+            await self.forget(prompt, max_tokens=CHUNK_SUMMARY_TOKENS)
+            self.count_fallback('summarize_chunk', e)
+            print(f"⚠️ Не удалось законспектировать часть {number}: {e}")
+            fallback = fit_to_budget(chunk, self.provider, budget=CHUNK_SUMMARY_TOKENS, title=title)
+            return f"Часть {number}: {fallback['text']}"
 
-    async def analyze_article(self, title: str, content: str, brand_info: dict = None) -> dict:
+    async def analyze_article(self, title: str, content: str, brand_info: dict = None,
+                              on_text=None) -> dict:
 
         brand_context = ""
         if brand_info and brand_info.get('brand_name'):
@@ -81,13 +229,14 @@ class UniversalAIAnalyzer:
             if brand_info.get('brand_tone'):
                 brand_context += f"\nТон бренда: {brand_info.get('brand_tone')}"
 
+        text = await self._prepare_content(title, content)
         prompt = f"""Проанализируй эту статью/новость и верни результат СТРОГО в JSON формате.
 {brand_context}
 
 Заголовок: {title}
 
 Содержание:
-{content[:3000]}
+{text}
 
 Верни JSON со следующими полями:
 {{
@@ -101,19 +250,12 @@ class UniversalAIAnalyzer:
 ВАЖНО: Отвечай ТОЛЬКО JSON, без дополнительного текста, без markdown."""
 
         try:
-            result_text = await self.generate(prompt, max_tokens=1000)
+            result_text = await self.generate(prompt, max_tokens=1000, on_text=on_text, method='analyze_article')
+            return extract_json(result_text, ANALYSIS_SCHEMA)
 
-            result_text = result_text.strip()
-            if result_text.startswith('```'):
-                lines = result_text.split('\n')
-                result_text = '\n'.join(lines[1:-1])
-            if result_text.startswith('json'):
-                result_text = result_text[4:].strip()
-
-            result = json.loads(result_text)
-            return result
-
-        except json.JSONDecodeError as e:
+        except JSONExtractError as e:
+            await self.forget(prompt, max_tokens=1000)
+            self.count_fallback('analyze_article', e)
             print(f"Ошибка парсинга JSON: {e}")
             print(f"Получен текст: {result_text[:200]}")
             return {
@@ -124,6 +266,7 @@ class UniversalAIAnalyzer:
                 'main_theme': 'общее'
             }
         except Exception as e:
+            self.count_fallback('analyze_article', e)
             print(f"Ошибка анализа: {e}")
             return {
                 'summary': 'Не удалось проанализировать статью',
@@ -133,17 +276,7 @@ class UniversalAIAnalyzer:
                 'main_theme': 'общее'
             }
 
-    async def generate_posts(self, article_data: dict, platforms: list, brand_info: dict = None) -> dict:
-        from config.settings import PLATFORMS
-
-        print(f"🔍 DEBUG: Генерация постов для платформ: {platforms}")
-
-        brand_context = ""
-        if brand_info and brand_info.get('brand_name'):
-            brand_context = f"Бренд: {brand_info.get('brand_name')}\n"
-            if brand_info.get('brand_tone'):
-                brand_context += f"Тон коммуникации: {brand_info.get('brand_tone')}\n"
-
+    def _platform_requirements(self, platforms: list) -> list:
         platform_requirements = []
         for platform in platforms:
             platform_info = PLATFORMS.get(platform, {})
@@ -154,6 +287,20 @@ class UniversalAIAnalyzer:
             if platform_info.get('emoji'):
                 req += ", можно эмодзи"
             platform_requirements.append(req)
+        return platform_requirements
+
+    async def generate_posts(self, article_data: dict, platforms: list, brand_info: dict = None,
+                             on_text=None) -> dict:
+
+        print(f"🔍 DEBUG: Генерация постов для платформ: {platforms}")
+
+        brand_context = ""
+        if brand_info and brand_info.get('brand_name'):
+            brand_context = f"Бренд: {brand_info.get('brand_name')}\n"
+            if brand_info.get('brand_tone'):
+                brand_context += f"Тон коммуникации: {brand_info.get('brand_tone')}\n"
+
+        platform_requirements = self._platform_requirements(platforms)
 
         sentiment_context = {
             'positive': 'Это ПОЗИТИВНАЯ новость - подчеркни достижения и успехи',
@@ -195,22 +342,16 @@ class UniversalAIAnalyzer:
 ВАЖНО: Отвечай ТОЛЬКО JSON для платформ {', '.join(platforms)}, без markdown, без лишних платформ."""
 
         try:
-            result_text = await self.generate(prompt, max_tokens=2000)
-
-            result_text = result_text.strip()
-            if result_text.startswith('```'):
-                lines = result_text.split('\n')
-                result_text = '\n'.join(lines[1:-1])
-            if result_text.startswith('json'):
-                result_text = result_text[4:].strip()
+            result_text = await self.generate(prompt, max_tokens=2000, on_text=on_text, method='generate_posts')
 
             print(f"🔍 DEBUG: Получен ответ AI:\n{result_text[:500]}")
 
-            posts = json.loads(result_text)
+            posts = extract_json(result_text, dict)
 
             print(f"🔍 DEBUG: Распарсенные платформы: {list(posts.keys())}")
 
-            filtered_posts = {k: v for k, v in posts.items() if k in platforms}
+            # Битый пост одной платформы не должен выбрасывать посты остальных
+            filtered_posts = {k: v for k, v in posts.items() if k in platforms and not validate(v, POST_SCHEMA)}
 
             print(f"🔍 DEBUG: После фильтрации: {list(filtered_posts.keys())}")
 
@@ -225,6 +366,8 @@ class UniversalAIAnalyzer:
             return filtered_posts
 
         except Exception as e:
+            await self.forget(prompt, max_tokens=2000)
+            self.count_fallback('generate_posts', e)
             print(f"❌ Ошибка генерации постов: {e}")
             print(f"Ответ AI: {result_text if 'result_text' in locals() else 'N/A'}")
             simple_post = {
@@ -233,17 +376,142 @@ class UniversalAIAnalyzer:
             }
             return {platform: simple_post for platform in platforms}
 
+    async def analyze_and_generate(self, title: str, content: str, platforms: list,
+                                   brand_info: dict = None, with_schedule: bool = True, on_text=None) -> dict:
+        # Анализ, посты и расписание одним запросом вместо 2 + N последовательных.
+        # None - ответ не прошел проверку, вызывающий идет по обычному пути
+
+        brand_context = ""
+        if brand_info and brand_info.get('brand_name'):
+            brand_context = f"Бренд: {brand_info.get('brand_name')}\n"
+            if brand_info.get('brand_tone'):
+                brand_context += f"Тон коммуникации: {brand_info.get('brand_tone')}\n"
+
+        posts_example = {
+            platform: {"content": "текст поста", "hashtags": "#хештег1 #хештег2"}
+            for platform in platforms
+        }
+        example = {
+            "summary": "краткое содержание статьи в 2-3 предложениях",
+            "sentiment": "positive/negative/neutral",
+            "key_points": ["ключевой момент 1", "ключевой момент 2", "ключевой момент 3"],
+            "relevance_score": 7,
+            "main_theme": "тема",
+            "posts": posts_example
+        }
+        schedule_rules = ""
+        if with_schedule:
+            example["schedule"] = {
+                platform: {"time_slot": "сегодня 14:00", "reason": "почему"} for platform in platforms
+            }
+            schedule_rules = f"""
+Расписание (поле schedule) - время публикации каждого поста. Учти:
+{SCHEDULE_RULES}
+"""
+
+        text = await self._prepare_content(title, content)
+        prompt = f"""{brand_context}
+Проанализируй статью и сразу подготовь посты для соцсетей.
+
+Заголовок: {title}
+
+Содержание:
+{text}
+
+Анализ:
+- summary: краткое содержание в 2-3 предложениях
+- sentiment: positive/negative/neutral - отношение к упоминаемому бренду/компании
+- key_points: 3 ключевых момента
+- relevance_score: число от 1 до 10 (насколько статья важна для бренда)
+- main_theme: основная тема одним словом
+
+Посты (поле posts) ТОЛЬКО для платформ: {', '.join(platforms)}
+{chr(10).join(self._platform_requirements(platforms))}
+- Позитивная новость - подчеркни достижения, негативная - будь осторожен и покажи, как компания
+  работает над проблемой, нейтральная - будь объективным
+- Каждый пост УНИКАЛЬНЫЙ, Telegram и VK живее и с эмодзи, LinkedIn и пресс-релиз - деловой стиль
+- Добавь релевантные хештеги (3-5 штук)
+{schedule_rules}
+Верни JSON:
+{json.dumps(example, ensure_ascii=False, indent=2)}
+
+ВАЖНО: Отвечай ТОЛЬКО JSON, без markdown."""
+
+        max_tokens = 1000 + 700 * len(platforms)
+        error = None
+        try:
+            result_text = await self.generate(prompt, max_tokens=max_tokens, on_text=on_text,
+                                            method='analyze_and_generate')
+            result = self._validate_fused(extract_json(result_text, dict), platforms)
+        except Exception as e:
+            print(f"Ошибка совмещенного запроса: {e}")
+            error = e
+            result = None
+
+        if result is None:
+            await self.forget(prompt, max_tokens=max_tokens)
+            # Ответ без ошибки, но не прошедший _validate_fused - тоже ошибка разбора
+            self.count_fallback('analyze_and_generate', error or JSONExtractError("ответ не прошел проверку"))
+        return result
+
+    def _validate_fused(self, data: dict, platforms: list) -> dict:
+        # Анализ обязателен целиком; посты и расписание - по платформам:
+        # чего не хватает, вызывающий догенерирует отдельно
+        if not isinstance(data, dict):
+            return None
+
+        summary = data.get('summary')
+        sentiment = str(data.get('sentiment', '')).strip().lower()
+        key_points = data.get('key_points')
+        if not isinstance(summary, str) or not summary.strip() or sentiment not in SENTIMENTS:
+            return None
+        if not isinstance(key_points, list):
+            return None
+
+        try:
+            relevance_score = min(10, max(1, int(float(data.get('relevance_score', 5)))))
+        except (TypeError, ValueError):
+            relevance_score = 5
+
+        posts = {}
+        raw_posts = data.get('posts')
+        if isinstance(raw_posts, dict):
+            for platform in platforms:
+                post = raw_posts.get(platform)
+                if isinstance(post, dict) and isinstance(post.get('content'), str) and post['content'].strip():
+                    hashtags = post.get('hashtags')
+                    posts[platform] = {
+                        'content': post['content'],
+                        'hashtags': hashtags if isinstance(hashtags, str) else ''
+                    }
+
+        schedule = {}
+        raw_schedule = data.get('schedule')
+        if isinstance(raw_schedule, dict):
+            for platform in posts:
+                slot = raw_schedule.get(platform)
+                if isinstance(slot, dict) and isinstance(slot.get('time_slot'), str):
+                    schedule[platform] = slot
+
+        return {
+            'analysis': {
+                'summary': summary.strip(),
+                'sentiment': sentiment,
+                'key_points': [str(point) for point in key_points],
+                'relevance_score': relevance_score,
+                'main_theme': str(data.get('main_theme') or 'общее')
+            },
+            'posts': posts,
+            'schedule': schedule
+        }
+
     async def suggest_posting_schedule(self, posts: dict, sentiment: str) -> dict:
 
         prompt = f"""У нас есть посты для публикации на платформах: {', '.join(posts.keys())}
 Тональность новости: {sentiment}
 
 Предложи оптимальное расписание публикации. Учти:
-- Позитивные новости лучше публиковать утром/днём
-- Негативные - вечером, когда меньше охват
-- Telegram и VK - можно сразу
-- LinkedIn - лучше в рабочие часы (10-16)
-- Пресс-релизы - утро рабочего дня
+{SCHEDULE_RULES}
 
 Верни JSON:
 {{
@@ -254,21 +522,12 @@ class UniversalAIAnalyzer:
 ВАЖНО: Отвечай ТОЛЬКО JSON, без markdown."""
 
         try:
-            result_text = await self.generate(prompt, max_tokens=1000)
-
-            result_text = result_text.strip()
-            if result_text.startswith('```'):
-                lines = result_text.split('\n')
-                result_text = '\n'.join(lines[1:-1])
-            if result_text.startswith('json'):
-                result_text = result_text[4:].strip()
-
-            schedule = json.loads(result_text)
-            return schedule
+            result_text = await self.generate(prompt, max_tokens=1000, method='suggest_posting_schedule')
+            return extract_json(result_text, SCHEDULE_SCHEMA)
 
         except Exception as e:
+            await self.forget(prompt, max_tokens=1000)
+            self.count_fallback('suggest_posting_schedule', e)
             print(f"Ошибка планирования: {e}")
             return {platform: {"time_slot": "сегодня 14:00", "priority": i + 1}
                     for i, platform in enumerate(posts.keys())}
-
-AIAnalyzer = UniversalAIAnalyzer
\ No newline at end of file
@@ -0,0 +1,71 @@
+import hashlib
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Параметры, которые точно не меняют содержимое страницы: метки рекламных кампаний
+# и идентификаторы кликов известных систем. from, ref, share, amp и т.п. не трогаем -
+# на части сайтов они выбирают другую страницу или версию текста
+TRACKING_PARAMS = frozenset((
+    'fbclid', 'gclid', 'dclid', 'yclid', 'ysclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid',
+    '_openstat', 'ref_src',
+))
+TRACKING_PREFIXES = ('utm_', '_ga', '_gl', 'pk_', 'hsa_', 'itm_')
+
+MOBILE_HOST_PREFIXES = ('www.', 'm.', 'mobile.', 'amp.')
+AMP_PATH_SUFFIX = re.compile(r'(/amp|\.amp)$', re.IGNORECASE)
+DUPLICATE_SLASHES = re.compile(r'/{2,}')
+
+
+def canonicalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+
+    # http и https, www., m. и amp. версии считаем одной страницей
+    scheme = parts.scheme.lower()
+    if scheme == 'http':
+        scheme = 'https'
+
+    host = (parts.hostname or '').lower().rstrip('.')
+    stripped = True
+    while stripped:
+        stripped = False
+        for prefix in MOBILE_HOST_PREFIXES:
+            if host.startswith(prefix) and host.count('.') > 1:
+                host = host[len(prefix):]
+                stripped = True
+
+    port = parts.port
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    path = DUPLICATE_SLASHES.sub('/', parts.path or '/')
+    path = AMP_PATH_SUFFIX.sub('', path.rstrip('/'))
+    path = path.rstrip('/') or '/'
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+def is_plausible_canonical(canonical_url: str, url: str) -> bool:
+    # rel=canonical и og:url нередко указывают на главную или рубрику - такой адрес
+    # склеил бы все статьи раздела в одну. Рубрика - один сегмент пути, с которого
+    # начинается путь страницы (/economy для /economy/2024/slug). Более короткий адрес
+    # сам по себе не подозрителен: /amp/slug -> /slug, /news/12345-slug -> /12345
+    canonical = _path_segments(canonical_url)
+    if not canonical:
+        return False
+    page = _path_segments(url)
+    return not (len(canonical) == 1 < len(page) and page[0] == canonical[0])
+
+
+def _path_segments(url: str) -> list:
+    path = urlsplit(canonicalize_url(url)).path
+    return [segment for segment in path.split('/') if segment and segment.lower() != 'amp']
+
+
+def url_hash(url: str) -> str:
+    return hashlib.sha256(canonicalize_url(url).encode('utf-8')).hexdigest()
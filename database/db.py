@@ -1,7 +1,8 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, Session
+from datetime import datetime
 from config.settings import DATABASE_URL
-from database.models import Base, Article, Post, UserSettings
+from database.models import Base, Article, Post, UserSettings, DomainProfile, Feed, FeedEntry
 
 engine = create_engine(DATABASE_URL, echo=False)
 
@@ -10,9 +11,24 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    _upgrade_schema()
     print("✅ База данных инициализирована")
 
 
+def _upgrade_schema():
+    # create_all не трогает существующие таблицы - добавляем новые колонки и индексы сами
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+
 def get_db() -> Session:
     db = SessionLocal()
     try:
@@ -21,9 +37,12 @@ def get_db() -> Session:
         pass
 
 def create_article(db: Session, url: str, user_id: int, title: str = None,
-                   content: str = None, summary: str = None, sentiment: str = None):
+                   content: str = None, summary: str = None, sentiment: str = None,
+                   canonical_hash: str = None, content_simhash: str = None):
     article = Article(
         url=url,
+        canonical_hash=canonical_hash,
+        content_simhash=content_simhash,
         user_id=user_id,
         title=title,
         content=content,
@@ -40,6 +59,17 @@ def get_article_by_url(db: Session, url: str):
     return db.query(Article).filter(Article.url == url).first()
 
 
+def get_article_by_canonical_hash(db: Session, canonical_hash: str):
+    return db.query(Article).filter(Article.canonical_hash == canonical_hash).first()
+
+
+def get_recent_fingerprints(db: Session, limit: int):
+    rows = db.query(Article.id, Article.user_id, Article.content_simhash).filter(
+        Article.content_simhash.isnot(None)
+    ).order_by(Article.id.desc()).limit(limit).all()
+    return list(reversed(rows))
+
+
 def create_post(db: Session, article_id: int, platform: str, content: str,
                 hashtags: str = None, scheduled_time=None):
     post = Post(
@@ -83,4 +113,100 @@ def get_scheduled_posts(db: Session):
     return db.query(Post).filter(
         Post.status == PostStatus.SCHEDULED,
         Post.scheduled_time.isnot(None)
-    ).all()
\ No newline at end of file
+    ).all()
+
+
+def get_schedule_load(db: Session, user_id: int, since: datetime, until: datetime) -> dict:
+    # {platform: {час: число постов}} - сколько постов пользователя уже стоит в расписании
+    rows = db.query(Post.platform, Post.scheduled_time).join(Article).filter(
+        Article.user_id == user_id,
+        Post.scheduled_time >= since,
+        Post.scheduled_time < until
+    ).all()
+
+    load = {}
+    for platform, scheduled_time in rows:
+        hour = scheduled_time.replace(minute=0, second=0, microsecond=0)
+        slots = load.setdefault(platform, {})
+        slots[hour] = slots.get(hour, 0) + 1
+    return load
+
+
+def get_domain_profiles(db: Session):
+    return db.query(DomainProfile).all()
+
+
+def save_domain_profile(db: Session, domain: str, strategy: str = None, needs_js: bool = None):
+    profile = db.query(DomainProfile).filter(DomainProfile.domain == domain).first()
+    if not profile:
+        profile = DomainProfile(domain=domain)
+        db.add(profile)
+
+    profile.strategy = strategy
+    if needs_js is not None:
+        profile.needs_js = needs_js
+
+    db.commit()
+    db.refresh(profile)
+    return profile
+
+
+def create_feed(db: Session, user_id: int, url: str, poll_interval: int):
+    feed = db.query(Feed).filter(Feed.user_id == user_id, Feed.url == url).first()
+    if not feed:
+        feed = Feed(user_id=user_id, url=url)
+        db.add(feed)
+
+    feed.active = True
+    feed.poll_interval = poll_interval
+    feed.next_poll_at = datetime.utcnow()
+
+    db.commit()
+    db.refresh(feed)
+    return feed
+
+
+def get_user_feeds(db: Session, user_id: int):
+    return db.query(Feed).filter(Feed.user_id == user_id, Feed.active.is_(True)).order_by(Feed.id).all()
+
+
+def deactivate_feed(db: Session, user_id: int, feed_id: int) -> bool:
+    feed = db.query(Feed).filter(Feed.id == feed_id, Feed.user_id == user_id).first()
+    if not feed:
+        return False
+    feed.active = False
+    db.commit()
+    return True
+
+
+def get_due_feeds(db: Session, now: datetime, limit: int):
+    return db.query(Feed).filter(
+        Feed.active.is_(True),
+        Feed.next_poll_at <= now
+    ).order_by(Feed.next_poll_at).limit(limit).all()
+
+
+def feed_entry_seen(db: Session, feed: Feed, guid: str, canonical_hash: str) -> bool:
+    # Одна и та же новость бывает в нескольких лентах пользователя под разными guid
+    if db.query(FeedEntry.id).filter(FeedEntry.feed_id == feed.id, FeedEntry.guid == guid).first():
+        return True
+    return db.query(FeedEntry.id).join(Feed).filter(
+        Feed.user_id == feed.user_id,
+        FeedEntry.canonical_hash == canonical_hash
+    ).first() is not None
+
+
+def create_feed_entry(db: Session, feed_id: int, guid: str, url: str, canonical_hash: str):
+    entry = FeedEntry(feed_id=feed_id, guid=guid, url=url, canonical_hash=canonical_hash)
+    db.add(entry)
+    db.commit()
+    return entry
+
+
+def create_feed_entries(db: Session, feed_id: int, entries: list):
+    # Пачка записей одним commit; entries - словари с guid, url и canonical_hash
+    db.add_all([
+        FeedEntry(feed_id=feed_id, guid=entry['guid'], url=entry['url'][:500], canonical_hash=entry['canonical_hash'])
+        for entry in entries
+    ])
+    db.commit()
\ No newline at end of file
@@ -1,5 +1,6 @@
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum
+from sqlalchemy import (create_engine, Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum,
+                        UniqueConstraint)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import enum
@@ -22,6 +23,10 @@ class Article(Base):
 
     id = Column(Integer, primary_key=True)
     url = Column(String(500), unique=True, nullable=False)
+    # sha256 канонического адреса - проверка на дубликаты одним запросом по индексу
+    canonical_hash = Column(String(64), unique=True, index=True)
+    # SimHash текста (hex) для поиска перепечаток под другими адресами
+    content_simhash = Column(String(16))
     title = Column(String(500))
     content = Column(Text)
     summary = Column(Text)
@@ -68,4 +73,64 @@ class UserSettings(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __repr__(self):
-        return f"<UserSettings(user_id={self.user_id}, brand='{self.brand_name}')>"
\ No newline at end of file
+        return f"<UserSettings(user_id={self.user_id}, brand='{self.brand_name}')>"
+
+class DomainProfile(Base):
+    __tablename__ = 'domain_profiles'
+
+    id = Column(Integer, primary_key=True)
+    domain = Column(String(255), unique=True, nullable=False)
+    strategy = Column(String(500))
+    # Статический HTML - пустая оболочка, текст появляется только после JavaScript
+    needs_js = Column(Boolean, default=False)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DomainProfile(domain='{self.domain}', strategy='{self.strategy}')>"
+
+
+class Feed(Base):
+    __tablename__ = 'feeds'
+    __table_args__ = (UniqueConstraint('user_id', 'url'),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    url = Column(String(500), nullable=False)
+    title = Column(String(500))
+
+    # Валидаторы для условного запроса и хэш тела - неизменную ленту не разбираем
+    etag = Column(String(200))
+    last_modified = Column(String(100))
+    content_hash = Column(String(64))
+
+    poll_interval = Column(Integer)
+    next_poll_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_polled_at = Column(DateTime)
+    error_count = Column(Integer, default=0)
+    active = Column(Boolean, default=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    entries = relationship("FeedEntry", back_populates="feed", cascade="all, delete-orphan")
+
+    def __repr__(self):
+        return f"<Feed(id={self.id}, url='{self.url}')>"
+
+
+class FeedEntry(Base):
+    __tablename__ = 'feed_entries'
+    __table_args__ = (UniqueConstraint('feed_id', 'guid'),)
+
+    id = Column(Integer, primary_key=True)
+    feed_id = Column(Integer, ForeignKey('feeds.id'), nullable=False)
+    guid = Column(String(500), nullable=False)
+    url = Column(String(500))
+    canonical_hash = Column(String(64), index=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    feed = relationship("Feed", back_populates="entries")
+
+    def __repr__(self):
+        return f"<FeedEntry(feed_id={self.feed_id}, guid='{self.guid}')>"
\ No newline at end of file
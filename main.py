@@ -7,8 +7,14 @@ from config.settings import TELEGRAM_BOT_TOKEN
 from bot.handlers import router
 from bot.edit_handlers import edit_router
 from bot.advanced_handlers import router as advanced_router
+from bot.feed_handlers import feed_router
+from bot.admin_handlers import admin_router
 from database.db import init_db
 from core.scheduler import scheduler
+from core.content_fetcher import content_fetcher
+from core.feed_poller import feed_poller
+from core.providers import warm_up, close_providers
+from core.llm_cache import llm_cache
 
 logging.basicConfig(
     level=logging.INFO,
@@ -21,8 +27,12 @@ async def main():
     logger.info("Инициализация базы данных...")
     init_db()
 
+    logger.info("Подключение AI провайдера...")
+    warm_up()
+
     logger.info("Запуск планировщика...")
     scheduler.start()
+    feed_poller.start()
 
     logger.info("Запуск бота...")
     bot = Bot(token=TELEGRAM_BOT_TOKEN)
@@ -30,8 +40,10 @@ async def main():
     storage = MemoryStorage()
     dp = Dispatcher(storage=storage)
 
+    dp.include_router(admin_router)
     dp.include_router(advanced_router)
     dp.include_router(edit_router)
+    dp.include_router(feed_router)
     dp.include_router(router)
 
     await bot.delete_webhook(drop_pending_updates=True)
@@ -42,6 +54,10 @@ async def main():
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
         scheduler.stop()
+        await feed_poller.stop()
+        await content_fetcher.close()
+        await close_providers()
+        llm_cache.close()
         await bot.session.close()
 
 
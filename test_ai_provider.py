@@ -125,7 +125,8 @@ def get_package_name(provider):
         'gemini': 'google-generativeai',
         'groq': 'groq',
         'claude': 'anthropic',
-        'ollama': 'не требуется (работает локально)'
+        'ollama': 'не требуется (работает локально)',
+        'fake': 'не требуется (тестовый провайдер без сети)'
     }
     return packages.get(provider, 'unknown')
 
@@ -137,7 +138,7 @@ def main():
         print_info("Добавь в .env: AI_PROVIDER=gemini")
         sys.exit(1)
     
-    if AI_PROVIDER != 'ollama' and not AI_API_KEY:
+    if AI_PROVIDER not in ('ollama', 'fake') and not AI_API_KEY:
         print_error("AI_API_KEY не указан в .env файле!")
         print_info(f"Получи ключ и добавь в .env: AI_API_KEY=твой_ключ")
         sys.exit(1)
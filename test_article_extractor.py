@@ -0,0 +1,104 @@
+"""
+Тестовый скрипт для проверки выученной стратегии домена в экстракторе статей:
+повторная загрузка страницы сайта должна давать тот же текст, что и полный разбор
+"""
+from core.article_extractor import extract_article
+
+PARAGRAPH = ("Компания открыла новый завод в Казани, на котором будут выпускать электромобили "
+             "и комплектующие для них, а также аккумуляторы для городского транспорта. ")
+COMMENT = "Комментарий читателя: а когда будут скидки для пенсионеров и многодетных семей? "
+MENU = "Главная Новости Экономика Политика Спорт Культура Технологии Общество Происшествия "
+
+
+def page(number: int) -> bytes:
+    return f"""<html><head><title>Новость {number}</title></head><body>
+<article>
+  <h1>Новость {number}</h1>
+  <p>{PARAGRAPH} Абзац 1 статьи {number}.</p>
+  <p>{PARAGRAPH} Абзац 2 статьи {number}.</p>
+  <div class="comments">
+    <p>{COMMENT} 1</p><p>{COMMENT} 2</p><p>{COMMENT} 3</p><p>{COMMENT} 4</p><p>{COMMENT} 5</p>
+  </div>
+</article>
+</body></html>""".encode()
+
+
+def page_with_menu(number: int) -> bytes:
+    menu = ''.join(f'<li><a href="/section/{i}">{MENU} {i}</a></li>' for i in range(5))
+    return f"""<html><head><title>Новость {number}</title></head><body>
+<div class="container"><ul>{menu}</ul></div>
+<div class="container">
+  <div class="container article-text">
+    <p>{PARAGRAPH} Абзац 1 статьи {number}.</p>
+    <p>{PARAGRAPH} Абзац 2 статьи {number}.</p>
+    <p>{PARAGRAPH} Абзац 3 статьи {number}.</p>
+  </div>
+</div>
+</body></html>""".encode()
+
+
+def page_with_theme_classes(number: int, body_class: str = '', wrapper: str = '') -> bytes:
+    # Классы темы WordPress на body и обертке страницы совпадают с "шумными" подсказками
+    comments = ''.join(f'<div class="item"><p>{COMMENT} {i}</p></div>' for i in range(3))
+    return f"""<html><head><title>Новость {number}</title></head><body{body_class}>
+<div{wrapper}>
+  <div class="entry-content">
+    <p>{PARAGRAPH} Абзац 1 статьи {number}.</p>
+    <p>{PARAGRAPH} Абзац 2 статьи {number}.</p>
+    <p>{PARAGRAPH} Абзац 3 статьи {number}.</p>
+  </div>
+  <div class="comments">{comments}</div>
+</div>
+</body></html>""".encode()
+
+
+def check_learned_strategy_matches_full_pass():
+    """Комментарии внутри <article> не попадают в текст и при выученной стратегии"""
+    first = extract_article(page(1))
+    assert first['strategy'], first
+    assert COMMENT not in first['content']
+
+    full = extract_article(page(2))
+    learned = extract_article(page(2), strategy=first['strategy'])
+    print(f"✅ Стратегия {first['strategy']}: полный разбор {len(full['content'])} симв., "
+          f"по стратегии {len(learned['content'])} симв.")
+    assert learned['strategy'] == first['strategy']
+    assert learned['content'] == full['content']
+    assert COMMENT not in learned['content']
+
+
+def check_generic_class_is_not_learned():
+    """Общий класс container не становится стратегией: его первое совпадение - меню"""
+    first = extract_article(page_with_menu(1))
+    print(f"✅ Стратегия страницы с меню: {first['strategy']}")
+    assert first['strategy'] and 'article-text' in first['strategy'], first['strategy']
+    assert MENU not in first['content']
+
+    learned = extract_article(page_with_menu(2), strategy=first['strategy'])
+    assert MENU not in learned['content']
+    assert "статьи 2" in learned['content']
+
+
+def check_theme_classes_are_not_noise():
+    """Классы single-post/right-sidebar на body и has-comments на обертке не отсекают статью"""
+    plain = extract_article(page_with_theme_classes(1))
+    assert COMMENT not in plain['content']
+    for body_class, wrapper in ((' class="single-post right-sidebar"', ''),
+                                ('', ' id="main-menu-wrapper" class="has-comments"'),
+                                (' class="single-post right-sidebar"', ' id="main-menu-wrapper" class="has-comments"')):
+        result = extract_article(page_with_theme_classes(1, body_class, wrapper))
+        print(f"✅ body{body_class or ''} div{wrapper or ''}: {len(result['content'])} симв.")
+        assert result['content'] == plain['content'], result['content']
+        assert result['strategy'] == plain['strategy']
+
+
+def main():
+    print("Проверка экстрактора статей\n")
+    check_learned_strategy_matches_full_pass()
+    check_generic_class_is_not_learned()
+    check_theme_classes_are_not_noise()
+    print("\n✅ Все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
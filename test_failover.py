@@ -0,0 +1,130 @@
+"""
+Тестовый скрипт для проверки переключения между AI провайдерами и дублирования запросов.
+Работает без сети: провайдеры заменены корутинами с заданной задержкой и ошибками
+"""
+import asyncio
+import time
+
+from core import failover
+from core.failover import call_with_failover, get_health, health_stats
+
+
+class HTTPError(Exception):
+    """Ошибка с кодом ответа, как у SDK провайдеров"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def make_attempt(behaviour: dict, calls: list):
+    """behaviour - {провайдер: (задержка, ошибка или None)}"""
+    async def attempt(target):
+        name = target['name']
+        delay, error = behaviour[name]
+        calls.append(name)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            calls.append(f"{name}:отменен")
+            raise
+        if error is not None:
+            raise error
+        return f"ответ {name}"
+    return attempt
+
+
+async def check_error_failover():
+    """Основной провайдер падает - ответ приходит от резервного"""
+    failover._health.clear()
+    calls = []
+    targets = [{'name': 'groq'}, {'name': 'gemini'}]
+    attempt = make_attempt({'groq': (0.05, Exception('503')), 'gemini': (0.05, None)}, calls)
+
+    result = await call_with_failover(targets, attempt)
+    print(f"Ошибка основного: {result}, вызовы {calls}")
+    assert result == 'ответ gemini'
+
+
+async def check_hedging():
+    """Основной отвечает дольше своего p95 - запрос дублируется, медленный отменяется"""
+    failover._health.clear()
+    health = get_health('groq')
+    for _ in range(20):
+        health.record_latency(0.1)
+    # Длинные потоки в окно обычных ответов не попадают
+    health.record_latency(30.0, streaming=True)
+    assert health.percentile(0.95) == 0.1
+
+    calls = []
+    targets = [{'name': 'groq'}, {'name': 'gemini'}]
+    attempt = make_attempt({'groq': (5.0, None), 'gemini': (0.05, None)}, calls)
+
+    started = time.monotonic()
+    result = await call_with_failover(targets, attempt)
+    elapsed = time.monotonic() - started
+    print(f"Медленный основной: {result} за {elapsed:.2f} с, вызовы {calls}")
+    assert result == 'ответ gemini'
+    assert 'groq:отменен' in calls
+    assert elapsed < 4
+
+
+async def check_circuit():
+    """После нескольких ошибок подряд провайдер пропускается"""
+    failover._health.clear()
+    calls = []
+    targets = [{'name': 'groq'}, {'name': 'gemini'}]
+    attempt = make_attempt({'groq': (0.01, HTTPError(500)), 'gemini': (0.01, None)}, calls)
+
+    for _ in range(failover.AI_CIRCUIT_FAILURES):
+        await call_with_failover(targets, attempt)
+    calls.clear()
+
+    await call_with_failover(targets, attempt)
+    print(f"После {failover.AI_CIRCUIT_FAILURES} ошибок: вызовы {calls}")
+    assert calls == ['gemini']
+    assert not get_health('groq').available()
+
+
+async def check_client_errors():
+    """Ошибки запроса (400, 401) не отключают провайдера"""
+    failover._health.clear()
+    calls = []
+    targets = [{'name': 'groq'}, {'name': 'gemini'}]
+    attempt = make_attempt({'groq': (0.01, HTTPError(400)), 'gemini': (0.01, None)}, calls)
+
+    for _ in range(failover.AI_CIRCUIT_FAILURES + 1):
+        await call_with_failover(targets, attempt)
+    health = get_health('groq')
+    print(f"После {health.failures} ответов 400: ошибок подряд {health.consecutive_failures}")
+    assert health.available() and health.consecutive_failures == 0
+
+
+async def check_all_failed():
+    """Все провайдеры недоступны - ошибка с причинами от каждого"""
+    failover._health.clear()
+    targets = [{'name': 'groq'}, {'name': 'gemini'}]
+    attempt = make_attempt({'groq': (0.01, HTTPError(429)), 'gemini': (0.01, HTTPError(500))}, [])
+
+    try:
+        await call_with_failover(targets, attempt)
+    except Exception as e:
+        print(f"Все недоступны: {e}")
+        assert 'groq' in str(e) and 'gemini' in str(e)
+    else:
+        raise AssertionError('ожидалась ошибка')
+
+
+async def main():
+    print("Проверка переключения провайдеров\n")
+    await check_error_failover()
+    await check_hedging()
+    await check_circuit()
+    await check_client_errors()
+    await check_all_failed()
+    print(f"\nСостояние провайдеров: {health_stats()}")
+    print("\n✅ Все проверки пройдены")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
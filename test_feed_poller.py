@@ -0,0 +1,185 @@
+"""
+Тестовый скрипт для проверки разбора RSS/Atom-лент и опроса лент.
+Работает без сети: ленты отдает локальный HTTP-сервер, вместо ContentGenerator - заглушка,
+база - временный SQLite
+"""
+import asyncio
+import os
+import tempfile
+
+# Настройки читаются при импорте config.settings - окружение задаем до импорта проекта
+os.environ.update({
+    'DATABASE_URL': f"sqlite:///{tempfile.mkdtemp(prefix='newsmaker_feeds_')}/feeds.db",
+    'HTTP_CACHE_ENABLED': 'False',
+    'FEED_INITIAL_ITEMS': '3',
+    'FEED_MAX_ATTEMPTS': '3',
+})
+
+from aiohttp import web
+
+from core.content_fetcher import content_fetcher
+from core.feed_parser import parse_feed, NotAFeedError
+from core.feed_poller import FeedPoller
+from database.db import init_db, get_db, create_feed
+from database.models import FeedEntry
+
+RSS = """<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0"><channel><title>Новости завода</title>
+{items}
+</channel></rss>"""
+RSS_ITEM = "<item><title>Новость {n}</title><link>http://news.test/{n}</link><guid>guid-{n}</guid></item>"
+
+ATOM = """<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Atom-лента</title>
+<entry><title>Запись</title><id>urn:1</id><link rel="alternate" href="http://news.test/atom/1"/></entry>
+</feed>"""
+
+RDF = """<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns="http://purl.org/rss/1.0/">
+<channel rdf:about="http://news.test/"><title>RDF-лента</title></channel>
+<item rdf:about="http://news.test/rdf/1"><title>Запись</title></item>
+</rdf:RDF>"""
+
+HTML = "<!DOCTYPE html><html><head><title>Сайт</title></head><body><p>Главная</p></body></html>"
+
+
+def rss(numbers) -> str:
+    return RSS.format(items=''.join(RSS_ITEM.format(n=n) for n in numbers))
+
+
+def chunks(text: str, size: int = 7) -> list:
+    data = text.encode()
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def check_parse_feed():
+    """RSS, Atom и RDF разбираются по кускам, HTML и пустой ответ - NotAFeedError"""
+    title, entries = parse_feed(chunks(rss(range(3))))
+    assert title == 'Новости завода', title
+    assert [entry['guid'] for entry in entries] == ['guid-0', 'guid-1', 'guid-2'], entries
+    assert entries[0]['url'] == 'http://news.test/0'
+
+    title, entries = parse_feed(chunks(ATOM))
+    assert title == 'Atom-лента' and entries[0]['url'] == 'http://news.test/atom/1', entries
+
+    title, entries = parse_feed(chunks(RDF))
+    assert entries[0]['url'] == 'http://news.test/rdf/1', entries
+    print("✅ RSS 2.0, Atom и RSS 1.0 (RDF) разобраны")
+
+    for name, text in (('HTML-страница', HTML), ('пустой ответ', '')):
+        try:
+            parse_feed(chunks(text))
+        except NotAFeedError as e:
+            print(f"✅ {name}: {e}")
+        else:
+            raise AssertionError(f'{name}: ожидалась NotAFeedError')
+
+
+class StubGenerator:
+    # Вместо ContentGenerator: 1 - уже обработана другим пользователем, 2 - всегда падает
+    def __init__(self):
+        self.calls = []
+
+    async def process_article_url(self, url: str, user_id: int, on_duplicate: str = 'ask') -> dict:
+        self.calls.append(url)
+        if url.endswith('/1'):
+            return {'error': True, 'already_processed': True, 'message': 'Эта статья уже была обработана ранее'}
+        if url.endswith('/2'):
+            return {'error': True, 'message': 'Ошибка обработки: HTTP 404'}
+        return {'success': True}
+
+
+def seen_guids(feed_id: int) -> list:
+    db = get_db()
+    try:
+        return sorted(entry.guid for entry in db.query(FeedEntry).filter(FeedEntry.feed_id == feed_id))
+    finally:
+        db.close()
+
+
+async def poll_and_process(poller: FeedPoller, feed_id: int) -> int:
+    queued = await poller.poll_feed(feed_id)
+    await poller.queue.join()
+    return queued
+
+
+async def check_poller(base_url: str, feed: dict):
+    """Запись отмечается после успеха, дубля или FEED_MAX_ATTEMPTS неудач"""
+    generator = StubGenerator()
+    poller = FeedPoller(generator=generator)
+    poller.queue = asyncio.Queue()
+    worker = asyncio.create_task(poller._worker())
+
+    try:
+        page = await poller.probe(f"{base_url}/page")
+        assert page.get('error') and 'RSS/Atom' in page['message'], page
+        probe = await poller.probe(f"{base_url}/rss")
+        assert probe.get('success') and probe['title'] == 'Новости завода', probe
+        print(f"✅ Проверка адреса: страница отклонена, лента «{probe['title']}» принята")
+
+        db = get_db()
+        try:
+            feed_id = create_feed(db, 1, f"{base_url}/rss", 900).id
+        finally:
+            db.close()
+
+        # Первый опрос: в работу три свежих записи, две старые сразу отмечены
+        assert await poll_and_process(poller, feed_id) == 3
+        assert seen_guids(feed_id) == ['guid-0', 'guid-1', 'guid-3', 'guid-4'], seen_guids(feed_id)
+        print("✅ Первый опрос: успех и дубль отмечены, упавшая запись ждет повтора")
+
+        # Лента без изменений не разбирается и ничего не ставит в очередь
+        assert await poll_and_process(poller, feed_id) == 0
+
+        # Каждое обновление ленты - новая попытка упавшей записи, на третьей она отмечается
+        for attempt, number in ((2, 5), (3, 6)):
+            feed['numbers'].insert(0, number)
+            assert await poll_and_process(poller, feed_id) == 2
+            print(f"✅ Обновление ленты: новая запись {number} и попытка {attempt} для упавшей")
+        assert 'guid-2' in seen_guids(feed_id)
+        assert generator.calls.count('http://news.test/2') == 3
+        assert not poller._attempts and not poller._pending
+
+        feed['numbers'].insert(0, 7)
+        assert await poll_and_process(poller, feed_id) == 1
+        print("✅ После трех неудач запись отмечена и больше не повторяется")
+    finally:
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+
+
+async def start_server(feed: dict):
+    async def handle_rss(request):
+        return web.Response(body=rss(feed['numbers']).encode(), content_type='application/rss+xml')
+
+    async def handle_page(request):
+        return web.Response(text=HTML, content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/rss', handle_rss)
+    app.router.add_get('/page', handle_page)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def main():
+    print("Проверка RSS/Atom-лент\n")
+    check_parse_feed()
+
+    init_db()
+    feed = {'numbers': [0, 1, 2, 3, 4]}
+    runner, base_url = await start_server(feed)
+    try:
+        await check_poller(base_url, feed)
+    finally:
+        await content_fetcher.close()
+        await runner.cleanup()
+    print("\n✅ Все проверки пройдены")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,193 @@
+"""
+Тестовый скрипт для проверки JS-рендера статей
+
+Нужен браузер: playwright install chromium. Без него скрипт завершается с кодом 1
+"""
+import asyncio
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path
+
+from core.article_extractor import MIN_CONTENT_LENGTH
+from core.content_fetcher import ContentFetcher
+from core.http_cache import HttpCache
+from core.js_renderer import JsRenderer
+
+PARAGRAPH = ("Компания представила новую версию сервиса, которая работает заметно быстрее прежней. "
+             "Разработчики переписали ядро и добавили поддержку офлайн-режима для мобильных клиентов. ")
+
+# Текст статьи появляется только после выполнения скрипта, как на SPA-сайтах
+SPA_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Новая версия сервиса</title></head>
+<body><div id="root"></div>
+<img src="/photo.jpg"><img src="https://mc.yandex.ru/watch/1">
+<script>
+  var article = document.createElement('article');
+  for (var i = 0; i < 5; i++) {
+    var p = document.createElement('p');
+    p.textContent = "%s";
+    article.appendChild(p);
+  }
+  document.getElementById('root').appendChild(article);
+</script>
+</body></html>""" % PARAGRAPH
+
+STATIC_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Обычная статья</title></head>
+<body><article>%s</article></body></html>""" % ''.join(f"<p>{PARAGRAPH}</p>" for _ in range(5))
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def start_server(directory: str) -> HTTPServer:
+    server = HTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class FakePage:
+    def __init__(self, crash: bool):
+        self.crash = crash
+
+    async def goto(self, url, **kwargs):
+        if self.crash:
+            raise RuntimeError('Target crashed')
+
+    async def wait_for_load_state(self, *args, **kwargs):
+        pass
+
+    async def content(self):
+        return STATIC_PAGE
+
+    async def close(self):
+        pass
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    async def new_page(self):
+        if self.closed:
+            raise RuntimeError('Context closed')
+        return FakePage(self.browser.crash_next)
+
+    async def route(self, *args):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+        self.crash_next = False
+
+    def is_connected(self):
+        return True
+
+    async def new_context(self, **kwargs):
+        self.contexts.append(FakeContext(self))
+        return self.contexts[-1]
+
+
+async def check_context_recovery():
+    """Контекст после сбоя закрывается и заменяется новым, а не возвращается в пул"""
+    renderer = JsRenderer(contexts=1)
+    browser = FakeBrowser()
+    renderer._browser = browser
+    renderer._pool = asyncio.Queue()
+    renderer._pool.put_nowait(await renderer._new_context())
+    crashed = browser.contexts[0]
+
+    browser.crash_next = True
+    try:
+        await renderer.render('http://example.com/crash')
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError('ожидалась ошибка рендера')
+    assert crashed.closed
+    assert renderer._pool.qsize() == 1
+
+    browser.crash_next = False
+    html = await renderer.render('http://example.com/ok')
+    assert html and len(browser.contexts) == 2 and not browser.contexts[1].closed
+    assert renderer.stats()['recreated_contexts'] == 1
+    print(f"✅ Контекст после сбоя пересоздан: {renderer.stats()}")
+
+
+async def check_renderer(base_url: str, tmp_dir: str):
+    renderer = JsRenderer(contexts=2)
+    fetcher = ContentFetcher(
+        parser_workers=0,
+        cache=HttpCache(path=str(Path(tmp_dir) / 'cache.db')),
+        renderer=renderer
+    )
+    # Без базы данных: профили доменов держим только в памяти
+    fetcher._profiles = {}
+    fetcher._save_profile = lambda *args, **kwargs: None
+
+    try:
+        print("\n1. Статическая страница - браузер не нужен")
+        article = await fetcher.fetch_article(f"{base_url}/static.html")
+        print(f"   Символов: {len(article['content'])}, браузер запущен: {renderer.started}")
+        assert len(article['content']) >= MIN_CONTENT_LENGTH
+        assert not renderer.started, 'браузер запущен ради статической страницы'
+
+        print("\n2. SPA-страница - пустая оболочка, текст после рендера")
+        started = time.perf_counter()
+        article = await fetcher.fetch_article(f"{base_url}/spa.html")
+        print(f"   Символов: {len(article['content'])} за {time.perf_counter() - started:.2f} с")
+        if fetcher.renderer is None:
+            print("❌ Браузер не запустился, выполните: playwright install chromium")
+            return False
+        assert len(article['content']) >= MIN_CONTENT_LENGTH, article['content']
+        assert fetcher._needs_js(article['domain']), 'домен не отмечен как JS'
+        print(f"   Домен отмечен как JS: {fetcher._needs_js(article['domain'])}")
+
+        print("\n3. Параллельные рендеры на прогретом пуле")
+        started = time.perf_counter()
+        results = await asyncio.gather(*(fetcher.fetch_article(f"{base_url}/spa.html?n={i}") for i in range(6)))
+        print(f"   {len(results)} страниц за {time.perf_counter() - started:.2f} с")
+        assert all(len(result['content']) >= MIN_CONTENT_LENGTH for result in results)
+
+        print(f"\n📊 {renderer.stats()}")
+        return True
+    finally:
+        await fetcher.close()
+
+
+async def main():
+    print("=" * 50)
+    print("ТЕСТ JS-РЕНДЕРА")
+    print("=" * 50)
+
+    await check_context_recovery()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        Path(tmp_dir, 'spa.html').write_text(SPA_PAGE, encoding='utf-8')
+        Path(tmp_dir, 'static.html').write_text(STATIC_PAGE, encoding='utf-8')
+
+        server = start_server(tmp_dir)
+        try:
+            rendered = await check_renderer(f"http://127.0.0.1:{server.server_port}", tmp_dir)
+        finally:
+            server.shutdown()
+
+    if not rendered:
+        sys.exit(1)
+    print("\n✅ Все проверки пройдены")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,131 @@
+"""
+Тестовый скрипт для проверки разбора JSON из ответов моделей.
+Работает без сети: ответы - типичные ошибки моделей
+"""
+import json
+
+from core.json_extract import (extract_json, extract_stats, validate, StreamingJSONParser,
+                               JSONExtractError)
+from core.universal_ai_analyzer import ANALYSIS_SCHEMA
+
+ANALYSIS = {
+    "summary": "Компания открыла завод.",
+    "sentiment": "positive",
+    "key_points": ["завод"],
+    "relevance_score": 8,
+    "main_theme": "производство"
+}
+
+RESPONSES = {
+    'чистый JSON': json.dumps(ANALYSIS, ensure_ascii=False),
+    'markdown': "```json\n" + json.dumps(ANALYSIS, ensure_ascii=False, indent=2) + "\n```",
+    'текст до и после': "Конечно! Вот анализ:\n" + json.dumps(ANALYSIS, ensure_ascii=False) +
+                        "\n\nЕсли нужно, могу уточнить.",
+    'запятые перед скобкой': '{"summary": "Компания открыла завод.", "sentiment": "positive", '
+                             '"key_points": ["завод",], "relevance_score": 8, "main_theme": "производство",}',
+    'литералы Python': '{"summary": "Компания открыла завод.", "sentiment": "positive", "key_points": ["завод"], '
+                       '"relevance_score": 8, "main_theme": "производство", "urgent": False}',
+    'перевод строки в строке': '{"summary": "Компания открыла\nзавод.", "sentiment": "positive", '
+                               '"key_points": ["завод"], "relevance_score": 8, "main_theme": "производство"}',
+    'оборван на max_tokens': '{"summary": "Компания открыла завод.", "sentiment": "positive", '
+                             '"key_points": ["завод", "ро',
+    'скобки во вступлении': "Вот результат [JSON]:\n" + json.dumps(ANALYSIS, ensure_ascii=False),
+    'ссылка и фигурные скобки': "Ответ (см. [1]), про {curly} braces: " + json.dumps(ANALYSIS, ensure_ascii=False),
+}
+
+
+def check_responses():
+    """Все типичные ответы разбираются и проходят схему анализа"""
+    for name, text in RESPONSES.items():
+        data = extract_json(text, ANALYSIS_SCHEMA)
+        print(f"✅ {name}: {data['summary']!r}, {data['sentiment']}")
+
+
+def check_brackets_before_json():
+    """Скобки до JSON пропускаются, берется первый кандидат, который разобрался и прошел схему"""
+    cases = [
+        ('Ответ (см. [1]): {"a": 1}', dict, {"a": 1}),
+        ('Note: use {curly} braces. {"a": 1}', None, {"a": 1}),
+        ('Варианты [1], [2]: [{"text": "a"}]', {'type': list, 'items': dict}, [{"text": "a"}]),
+        ('Пример {"b": 2}, ответ: {"a": 1}', {'type': dict, 'required': ['a']}, {"a": 1}),
+        ('Вот [JSON]: {"a": [1, 2', dict, {"a": [1]}),
+    ]
+    for text, schema, expected in cases:
+        data = extract_json(text, schema)
+        assert data == expected, (text, data)
+        print(f"✅ {text!r} -> {data}")
+
+    try:
+        extract_json('Ответ (см. [1]): [2]', dict)
+    except JSONExtractError as e:
+        print(f"✅ Ни один кандидат не подошел: {e}")
+    else:
+        raise AssertionError('ожидалась ошибка схемы')
+
+
+def check_truncated_posts():
+    """Оборванный ответ с постами: чинится корень, а не берется первый целый пост"""
+    telegram = {"content": "Компания открыла завод в Казани.", "hashtags": "#новости #завод"}
+    text = '{"telegram": ' + json.dumps(telegram, ensure_ascii=False) + ', "vk": {"content": "Компания открыла завод'
+    posts = extract_json(text, dict)
+    assert posts.get('telegram') == telegram, posts
+    assert posts['vk']['content'].startswith("Компания открыла"), posts
+    print(f"✅ Оборванные посты: {list(posts)}, telegram целиком")
+
+
+def check_schema():
+    """Ответ не по схеме - ошибка с понятной причиной"""
+    try:
+        extract_json('{"summary": "", "key_points": "не список"}', ANALYSIS_SCHEMA)
+    except JSONExtractError as e:
+        print(f"✅ Не по схеме: {e}")
+    else:
+        raise AssertionError('ожидалась ошибка схемы')
+
+    for broken in ({**ANALYSIS, 'key_points': 'завод'}, {k: v for k, v in ANALYSIS.items() if k != 'key_points'},
+                   {**ANALYSIS, 'key_points': [{'point': 'завод'}]}):
+        assert validate(broken, ANALYSIS_SCHEMA), broken
+    print("✅ Анализ без key_points или не со списком строк не проходит схему")
+
+    assert validate(['a', 'b'], {'type': list, 'items': str}) == []
+    assert validate(['a', 1], {'type': list, 'items': str})
+
+    try:
+        extract_json('Извините, не могу помочь с этим запросом.')
+    except JSONExtractError as e:
+        print(f"✅ Без JSON: {e}")
+    else:
+        raise AssertionError('ожидалась ошибка')
+
+
+def check_streaming():
+    """Каждый префикс ответа дает корректный частичный объект"""
+    text = "```json\n" + json.dumps(ANALYSIS, ensure_ascii=False) + "\n```"
+    parser = StreamingJSONParser()
+    snapshots = 0
+    for char in text:
+        value = parser.feed(char)
+        if value is not None:
+            snapshots += 1
+            assert isinstance(value, dict)
+            for key, field in value.items():
+                assert key in ANALYSIS
+                if isinstance(field, str):
+                    assert ANALYSIS[key].startswith(field)
+    assert parser.complete and parser.value == ANALYSIS
+    print(f"✅ Потоковый разбор: {len(text)} кусков, последний снимок совпал с ответом")
+
+
+def main():
+    print("Проверка разбора JSON\n")
+    check_responses()
+    check_brackets_before_json()
+    check_truncated_posts()
+    check_schema()
+    check_streaming()
+    print(f"\nСчетчики: {extract_stats()}")
+    print("\n✅ Все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Тестовый скрипт для проверки анализа очень длинных статей по частям (map-reduce).
+Работает без сети: модель заменена заглушкой с задержкой 1 с на запрос.
+Запуск: AI_PROVIDER=ollama AI_MAX_IN_FLIGHT=8 python test_map_reduce.py
+"""
+import asyncio
+import json
+import random
+import time
+
+from config.settings import AI_MAX_CHUNKS
+from core.universal_ai_analyzer import UniversalAIAnalyzer
+
+LATENCY = 1.0
+WORDS = "рынок компания выручка рост завод инвестиции регион продажи сотрудники проект экспорт".split()
+
+
+def long_report(sentences: int = 600) -> str:
+    random.seed(3)
+    return ' '.join(
+        f"В разделе {i} отчета {random.choice(WORDS)} и {random.choice(WORDS)} "
+        f"показали изменение на {random.randint(1, 90)} процентов за квартал."
+        for i in range(sentences)
+    )
+
+
+async def fake_model(prompt):
+    """Конспект части или итоговый анализ - в зависимости от промпта"""
+    await asyncio.sleep(LATENCY)
+    if 'Кратко законспектируй' in prompt:
+        return json.dumps({"summary": "Часть про рост выручки.", "key_points": ["выручка +12%"]},
+                          ensure_ascii=False)
+    assert 'Конспект статьи по частям' in prompt
+    return json.dumps({
+        "summary": "Компания отчиталась о росте.",
+        "sentiment": "positive",
+        "key_points": ["выручка +12%"],
+        "relevance_score": 7,
+        "main_theme": "отчет"
+    }, ensure_ascii=False)
+
+
+async def main():
+    print("Проверка map-reduce для длинных статей\n")
+    text = long_report()
+
+    analyzer = UniversalAIAnalyzer()
+    analyzer.cache = None
+    calls = []
+
+    class CountingProvider:
+        async def complete(self, prompt, max_tokens=1000):
+            calls.append(prompt)
+            return {'text': await fake_model(prompt), 'usage': None}
+
+    for target in analyzer.targets:
+        target['provider'] = CountingProvider()
+
+    started = time.monotonic()
+    result = await analyzer.analyze_article("Годовой отчет", text)
+    elapsed = time.monotonic() - started
+
+    chunks = len(calls) - 1
+    print(f"Статья: {len(text)} символов, частей: {chunks}, запросов: {len(calls)}")
+    print(f"Время: {elapsed:.2f} с (последовательно было бы ~{len(calls) * LATENCY:.0f} с)")
+    print(f"Результат: {result}")
+
+    assert result['summary'] == "Компания отчиталась о росте."
+    assert 2 <= chunks <= AI_MAX_CHUNKS
+    assert elapsed < len(calls) * LATENCY
+    print("\n✅ Все проверки пройдены")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
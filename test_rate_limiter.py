@@ -0,0 +1,131 @@
+"""
+Тестовый скрипт для проверки лимитов запросов к AI провайдерам.
+Работает без сети: вызовы провайдера заменены корутинами с задержкой и ошибками
+"""
+import asyncio
+import time
+
+from core import rate_limiter
+from core.rate_limiter import TokenBucket, ProviderLimiter
+
+
+class HTTPError(Exception):
+    """Ошибка с кодом ответа и заголовками, как у SDK провайдеров"""
+
+    def __init__(self, status_code: int, headers: dict = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+async def check_retry_after_pause():
+    """429 с Retry-After останавливает все запросы к провайдеру до конца паузы"""
+    limiter = ProviderLimiter('test', in_flight=0, max_retries=1)
+    started = time.monotonic()
+    first_calls = []
+
+    async def rate_limited():
+        first_calls.append(time.monotonic() - started)
+        if len(first_calls) == 1:
+            raise HTTPError(429, {'Retry-After': '0.3'})
+        return 'ok'
+
+    async def other():
+        return time.monotonic() - started
+
+    first = asyncio.create_task(limiter.run(rate_limited))
+    await asyncio.sleep(0.05)
+    other_at = await limiter.run(other)
+
+    assert await first == 'ok'
+    assert first_calls[1] >= 0.3, first_calls
+    assert other_at >= 0.3, other_at
+    assert limiter.rate_limited == 1 and limiter.retries == 1
+    print(f"✅ Retry-After 0.3 с: повтор через {first_calls[1]:.2f} с, другой запрос через {other_at:.2f} с")
+
+
+async def check_bucket_debt():
+    """Доплата после ответа уводит ведро в долг, и следующий запрос ждет"""
+    bucket = TokenBucket(600)
+    await bucket.acquire(600)
+    bucket.adjust(300)
+    assert -301 < bucket.tokens < -299, bucket.tokens
+    try:
+        await asyncio.wait_for(bucket.acquire(10), timeout=0.2)
+    except asyncio.TimeoutError:
+        print(f"✅ Долг {bucket.tokens:.0f} токенов: следующий запрос ждет")
+    else:
+        raise AssertionError('запрос прошел, несмотря на долг')
+
+    bucket.adjust(-900)
+    assert bucket.tokens <= bucket.capacity
+    await asyncio.wait_for(bucket.acquire(10), timeout=0.2)
+    print("✅ Возврат токенов: запрос проходит сразу, ведро не больше емкости")
+
+
+async def check_retry_refund():
+    """Неудачная попытка возвращает списанные токены - повтор не списывает второй раз"""
+    limiter = ProviderLimiter('test', tpm=60000, in_flight=0, max_retries=3)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise HTTPError(503)
+        return 'ok'
+
+    base_delay = rate_limiter.RETRY_BASE_DELAY
+    rate_limiter.RETRY_BASE_DELAY = 0.01
+    try:
+        assert await limiter.run(flaky, cost=10000) == 'ok'
+    finally:
+        rate_limiter.RETRY_BASE_DELAY = base_delay
+
+    # Три попытки, но списана одна оценка (плюс немного накопилось за время повторов)
+    assert len(attempts) == 3
+    assert 50000 <= limiter.tokens.tokens < 51000, limiter.tokens.tokens
+    print(f"✅ Три попытки по 10000 токенов, в ведре {limiter.tokens.tokens:.0f} из 60000")
+
+    async def failing():
+        raise HTTPError(400)
+
+    try:
+        await limiter.run(failing, cost=10000)
+    except HTTPError:
+        pass
+    assert 50000 <= limiter.tokens.tokens < 51000, limiter.tokens.tokens
+    print("✅ Запрос без повтора (400) тоже вернул токены")
+
+
+async def check_in_flight_cap():
+    """Одновременно к провайдеру идет не больше in_flight запросов"""
+    limiter = ProviderLimiter('test', in_flight=2)
+    active = 0
+    peak = 0
+
+    async def call():
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        return 'ok'
+
+    results = await asyncio.gather(*(limiter.run(call) for _ in range(6)))
+    assert results == ['ok'] * 6
+    assert peak == 2, peak
+    assert limiter.in_flight._value == 2
+    print(f"✅ 6 запросов при in_flight=2: одновременно не больше {peak}")
+
+
+async def main():
+    print("Проверка лимитов запросов\n")
+    await check_retry_after_pause()
+    await check_bucket_debt()
+    await check_retry_refund()
+    await check_in_flight_cap()
+    print("\n✅ Все проверки пройдены")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
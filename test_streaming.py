@@ -0,0 +1,131 @@
+"""
+Тестовый скрипт для проверки потоковой генерации и постепенного обновления сообщения.
+Работает без сети и без Telegram: модель и сообщение заменены заглушками
+"""
+import asyncio
+import json
+import time
+
+from bot.progress import ProgressMessage, render_progress
+from core.json_extract import StreamingJSONParser
+from core.universal_ai_analyzer import UniversalAIAnalyzer
+
+ANALYSIS = {
+    "summary": "Компания открыла новый завод. Производство вырастет вдвое.",
+    "sentiment": "positive",
+    "key_points": ["завод", "рост"],
+    "relevance_score": 8,
+    "main_theme": "производство"
+}
+POSTS = {
+    "telegram": {"content": "🏭 Новый завод открыт! Производство вырастет вдвое.", "hashtags": "#завод"},
+    "linkedin": {"content": "Компания запустила новое производство.", "hashtags": "#industry"}
+}
+
+
+class FakeMessage:
+    """Сообщение Telegram: запоминает правки и время каждой"""
+
+    def __init__(self):
+        self.edits = []
+
+    async def edit_text(self, text, **kwargs):
+        self.edits.append((time.monotonic(), text))
+
+
+class FakeProvider:
+    """Модель: отдает заготовленный ответ кусками"""
+
+    def __init__(self, text: str, chunk_size: int = 8, delay: float = 0.02):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.delay = delay
+
+    async def stream(self, prompt, max_tokens=1000):
+        for i in range(0, len(self.text), self.chunk_size):
+            await asyncio.sleep(self.delay)
+            yield self.text[i:i + self.chunk_size]
+
+
+def use_provider(analyzer, provider):
+    for target in analyzer.targets:
+        target['provider'] = provider
+
+
+async def check_throttling():
+    """Частые обновления не превращаются в частые правки, последняя версия доходит"""
+    message = FakeMessage()
+    progress = ProgressMessage(message, min_interval=0.2)
+
+    for i in range(100):
+        await progress.update(f"версия {i}")
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.3)
+    await progress.finish("готово")
+
+    times = [moment for moment, _ in message.edits]
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    print(f"✅ 100 обновлений -> {len(message.edits)} правок, минимальный интервал {min(gaps):.2f} с")
+    assert len(message.edits) < 10
+    assert min(gaps) >= 0.19
+    assert message.edits[-2][1] == "версия 99"
+    assert message.edits[-1][1] == "готово"
+
+
+async def check_pipeline_streaming():
+    """Краткое содержание появляется задолго до конца генерации"""
+    analyzer = UniversalAIAnalyzer()
+    analyzer.cache = None
+    analysis_text = json.dumps(ANALYSIS, ensure_ascii=False)
+    posts_text = json.dumps(POSTS, ensure_ascii=False)
+
+    started = time.monotonic()
+    first_summary = None
+    parser = StreamingJSONParser()
+
+    async def on_text(text):
+        nonlocal first_summary
+        summary = (parser.update(text) or {}).get('summary')
+        if summary and first_summary is None:
+            first_summary = time.monotonic() - started
+
+    use_provider(analyzer, FakeProvider(analysis_text))
+    analysis = await analyzer.analyze_article("Завод", "Текст статьи", on_text=on_text)
+    total = time.monotonic() - started
+
+    assert analysis == ANALYSIS
+    print(f"✅ Анализ: первый текст через {first_summary:.2f} с, весь ответ за {total:.2f} с")
+    assert first_summary < total / 2
+
+    use_provider(analyzer, FakeProvider(posts_text))
+    message = FakeMessage()
+    progress = ProgressMessage(message, min_interval=0.1)
+    state = {'stage': 'posts', 'title': 'Завод', 'summary': analysis['summary'], 'posts': {}}
+    posts_parser = StreamingJSONParser()
+
+    async def on_posts(text):
+        value = posts_parser.update(text) or {}
+        for platform in POSTS:
+            content = value.get(platform, {}).get('content')
+            if content:
+                state['posts'][platform] = content
+        await progress.update(render_progress(state))
+
+    posts = await analyzer.generate_posts(
+        {'title': 'Завод', 'summary': analysis['summary'], 'key_points': [], 'sentiment': 'positive'},
+        list(POSTS), on_text=on_posts
+    )
+    await progress.finish()
+    assert posts == POSTS
+    print(f"✅ Посты: {len(message.edits)} правок сообщения, последняя:\n{message.edits[-1][1]}")
+
+
+async def main():
+    print("Проверка потоковой генерации\n")
+    await check_throttling()
+    await check_pipeline_streaming()
+    print("\n✅ Все проверки пройдены")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
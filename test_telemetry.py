@@ -0,0 +1,108 @@
+"""
+Тестовый скрипт для проверки метрик вызовов LLM.
+Работает без сети: модель заменена заглушкой.
+Запуск: AI_PROVIDER=ollama LLM_CACHE_ENABLED=False python test_telemetry.py
+"""
+import asyncio
+import json
+import random
+
+from core.telemetry import telemetry, Histogram
+from core.universal_ai_analyzer import UniversalAIAnalyzer
+from bot.admin_handlers import format_row
+
+ANALYSIS = {
+    "summary": "Компания открыла завод.",
+    "sentiment": "positive",
+    "key_points": ["завод"],
+    "relevance_score": 8,
+    "main_theme": "производство"
+}
+
+
+USAGE = {'prompt_tokens': 321, 'completion_tokens': 45}
+
+
+class FakeProvider:
+    """Модель: отвечает с задержкой, по запросу - мусором вместо JSON и без расхода токенов"""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.broken = False
+
+    async def complete(self, prompt, max_tokens=1000):
+        await asyncio.sleep(self.delay)
+        if self.broken:
+            return {'text': "Извините, не могу.", 'usage': None}
+        return {'text': json.dumps(ANALYSIS, ensure_ascii=False), 'usage': USAGE}
+
+    async def stream(self, prompt, max_tokens=1000):
+        result = await self.complete(prompt, max_tokens)
+        text = result['text']
+        for i in range(0, len(text), 10):
+            await asyncio.sleep(self.delay)
+            yield text[i:i + 10]
+        if result['usage']:
+            yield {'usage': result['usage']}
+
+
+def check_histogram():
+    """Перцентили по корзинам близки к точным"""
+    random.seed(1)
+    values = [random.expovariate(1 / 3) for _ in range(10000)]
+    histogram = Histogram((0.5, 1, 2, 3, 5, 8, 13, 20, 30))
+    for value in values:
+        histogram.observe(value)
+    values.sort()
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(q * len(values)) - 1]
+        estimate = histogram.percentile(q)
+        print(f"✅ p{int(q * 100)}: точно {exact:.2f}, по корзинам {estimate:.2f}")
+        assert abs(estimate - exact) / exact < 0.25
+
+
+async def check_calls():
+    """Вызовы размечены методом, заглушки и ошибки разбора посчитаны"""
+    telemetry.reset()
+    analyzer = UniversalAIAnalyzer()
+    analyzer.cache = None
+    provider = FakeProvider()
+    for target in analyzer.targets:
+        target['provider'] = provider
+
+    for i in range(5):
+        await analyzer.analyze_article(f"Завод {i}", "Текст статьи")
+    await analyzer.analyze_article("Поток", "Текст статьи", on_text=lambda text: asyncio.sleep(0))
+    provider.broken = True
+    await analyzer.analyze_article("Сломанный ответ", "Текст статьи")
+
+    rows = telemetry.snapshot(method='analyze_article')
+    assert len(rows) == 1
+    row = rows[0]
+    counters, histograms = row['counters'], row['histograms']
+    assert counters['calls'] == 7
+    assert counters['fallbacks'] == 1 and counters['parse_failures'] == 1
+    assert histograms['total']['count'] == 7
+    assert histograms['ttft']['count'] == 1
+    assert histograms['ttft']['p50'] < histograms['latency']['max']
+    # Токены - из ответа API, оценка по тексту только для ответа без usage
+    assert histograms['prompt_tokens']['max'] == USAGE['prompt_tokens']
+    assert histograms['completion_tokens']['max'] == USAGE['completion_tokens']
+    assert counters['estimated_usage'] == 1
+    print(f"✅ Сводка /stats:\n{format_row(row)}")
+
+    export = telemetry.export()
+    assert 'newsmaker_llm_total_count{method="analyze_article"' in export
+    assert 'newsmaker_llm_parse_failures_total' in export
+    print(f"✅ Выгрузка Prometheus: {len(export.splitlines())} строк")
+
+
+async def main():
+    print("Проверка метрик LLM\n")
+    check_histogram()
+    await check_calls()
+    print("\n✅ Все проверки пройдены")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
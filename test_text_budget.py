@@ -0,0 +1,64 @@
+"""
+Тестовый скрипт для проверки сокращения длинных статей перед отправкой модели
+"""
+import random
+import time
+
+from core.text_budget import fit_to_budget, estimate_tokens, budget_stats
+
+FACTS = [
+    "Компания «Ромашка» открыла новый завод в Казани стоимостью 12 млрд рублей.",
+    "Завод будет выпускать 40 тысяч электромобилей в год, первые машины сойдут с конвейера весной.",
+    "На предприятии будут работать 2500 человек, половину наберут из выпускников местных вузов.",
+]
+FILLER = [
+    "Подписывайтесь на наш канал, чтобы не пропустить новости.",
+    "Читайте также: десять советов для путешественников.",
+    "Редакция благодарит читателей за внимание.",
+    "Фото: пресс-служба.",
+    "Погода в городе в этот день была солнечной, температура поднялась до двадцати градусов.",
+    "Мероприятие прошло в торжественной обстановке, гостей встречал оркестр.",
+]
+
+
+def long_article(paragraphs: int = 200) -> str:
+    random.seed(7)
+    body = [FACTS[0]]
+    for i in range(paragraphs):
+        body.append(random.choice(FILLER) + f" Абзац номер {i}.")
+        if i == paragraphs // 2:
+            body.append(FACTS[1])
+    body.append(FACTS[2])
+    return '\n'.join(body)
+
+
+def main():
+    print("Проверка бюджета токенов\n")
+
+    short = "Короткая новость. " * 5
+    result = fit_to_budget(short, 'groq', budget=1200)
+    assert not result['compressed'] and result['text'] == short
+    print(f"✅ Короткий текст не трогаем: {result['tokens']} токенов")
+
+    text = long_article()
+    started = time.perf_counter()
+    result = fit_to_budget(text, 'groq', budget=300, title="Ромашка открыла завод электромобилей")
+    elapsed = time.perf_counter() - started
+
+    print(f"Длинная статья: {len(text)} символов, {result['original_tokens']} -> {result['tokens']} токенов "
+          f"за {elapsed * 1000:.1f} мс")
+    print(f"Выбрано:\n{result['text']}\n")
+    assert result['tokens'] <= 300
+    for fact in FACTS:
+        assert fact in result['text'], fact
+    print("✅ Все ключевые факты попали в бюджет")
+
+    for provider in ('groq', 'gemini', 'claude'):
+        print(f"   {provider}: {estimate_tokens(text, provider)} токенов")
+
+    print(f"\nСчетчики: {budget_stats()}")
+    print("\n✅ Все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()
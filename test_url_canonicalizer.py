@@ -0,0 +1,51 @@
+"""
+Тестовый скрипт для проверки нормализации адресов статей и выбора канонического адреса
+"""
+from core.url_canonicalizer import canonicalize_url, is_plausible_canonical
+
+
+def check_tracking_params():
+    """Отбрасываются только известные метки, остальные параметры выбирают страницу"""
+    url = "https://www.example.ru/news/123/?utm_source=tg&fbclid=abc&yclid=1&gclid=2"
+    assert canonicalize_url(url) == "https://example.ru/news/123"
+
+    for param in ('from=rss', 'ref=main', 'share=1', 'amp=1', 'page=2'):
+        url = f"https://example.ru/news/123?{param}"
+        assert canonicalize_url(url) == url, canonicalize_url(url)
+    print("✅ Метки utm_*, fbclid, gclid, yclid отброшены; from, ref, share, amp, page сохранены")
+
+
+def check_canonical_sanity():
+    """Каноническим не становится главная или рубрика"""
+    article = "https://example.ru/economy/2024/zavod-v-kazani"
+    cases = [
+        ("https://example.ru/", False),
+        ("https://example.ru/economy/", False),
+        ("https://example.ru/economy/2024/zavod-v-kazani-otkryt", True),
+        ("https://m.example.ru/economy/2024/zavod-v-kazani/", True),
+        ("https://partner.ru/news/economy/2024/zavod-v-kazani", True),
+        ("https://example.ru/amp/", False),
+        # Короткий адрес по идентификатору статьи
+        ("https://example.ru/12345", True),
+    ]
+    for canonical, expected in cases:
+        assert is_plausible_canonical(canonical, article) is expected, canonical
+        print(f"✅ {canonical}: {'принят' if expected else 'отклонен'}")
+
+    # AMP-версия ссылается на обычную: /amp в конце или в начале пути
+    assert is_plausible_canonical(article, article + "/amp")
+    assert is_plausible_canonical("https://example.ru/zavod-v-kazani", "https://example.ru/amp/zavod-v-kazani")
+    assert is_plausible_canonical("https://example.ru/zavod-v-kazani", "https://example.ru/zavod-v-kazani/amp")
+    assert not is_plausible_canonical("https://example.ru/news/", "https://example.ru/news/12345-zavod")
+    print("✅ AMP-страницы и короткие адреса приняты, рубрика /news отклонена")
+
+
+def main():
+    print("Проверка нормализации адресов\n")
+    check_tracking_params()
+    check_canonical_sanity()
+    print("\n✅ Все проверки пройдены")
+
+
+if __name__ == "__main__":
+    main()